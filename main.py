@@ -1,14 +1,62 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI, Request, status
 from fastapi.responses import HTMLResponse , RedirectResponse
 from fastapi.exceptions import RequestValidationError, HTTPException
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
-from routes import auth_router, frontend_router, user_account_router, admin_panel_router
+from routes import auth_router, frontend_router, user_account_router, admin_panel_router, catalog_api_router
 from routes.products import router as products_router 
-
-app = FastAPI()
+from settings import api_config, dispose_engines
+from tools.assets import PrecompressedStaticFiles
+from tools import counters, rollups
+from tools.cart_store import cart_store
+from tools.facets import facet_index
+from tools.idempotency import idempotency_store
+from tools.middleware import AuthStateMiddleware
+from tools.page_cache import page_cache_channel
+from tools.passwords import password_hasher
+from tools.popularity import popularity_feed
+from tools.stock import stock_reservations
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    facets_task = asyncio.create_task(facet_index.run(api_config.FACET_REBUILD_INTERVAL))
+    popularity_task = asyncio.create_task(popularity_feed.run(api_config.POPULAR_REFRESH_INTERVAL))
+    cart_task = asyncio.create_task(cart_store.run(api_config.CART_PURGE_INTERVAL))
+    reservations_task = asyncio.create_task(stock_reservations.run(api_config.RESERVATION_SWEEP_INTERVAL))
+    idempotency_task = asyncio.create_task(idempotency_store.run(api_config.IDEMPOTENCY_PURGE_INTERVAL))
+    counters_task = asyncio.create_task(counters.run(api_config.COUNTERS_RECONCILE_INTERVAL))
+    rollups_task = asyncio.create_task(rollups.run(api_config.ROLLUP_INTERVAL))
+    page_cache_task = asyncio.create_task(page_cache_channel.run())
+    yield
+    facets_task.cancel()
+    popularity_task.cancel()
+    cart_task.cancel()
+    reservations_task.cancel()
+    idempotency_task.cancel()
+    counters_task.cancel()
+    rollups_task.cancel()
+    page_cache_task.cancel()
+    await cart_store.close()
+    await page_cache_channel.close()
+    # Перегляди, що не встигли записатися
+    try:
+        await popularity_feed.flush_views()
+    except Exception as exc:
+        logger.warning("Product views flush failed: %r", exc)
+    password_hasher.shutdown()
+    await dispose_engines()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(AuthStateMiddleware)
 
 # Импортируем шаблоны
 templates = Jinja2Templates(directory="templates")
@@ -18,7 +66,8 @@ templates = Jinja2Templates(directory="templates")
 app.include_router(admin_panel_router, tags=["admin"])
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(user_account_router, prefix="/account", tags=["account"])
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
+app.include_router(catalog_api_router, prefix="/api", tags=["catalog api"])
 app.include_router(products_router, prefix="", tags=["products"]) 
 app.include_router(frontend_router, prefix="", tags=["frontend"])  
 
@@ -138,6 +187,7 @@ async def api_root():
         "endpoints": {
             "auth": "/auth",
             "account": "/account",
+            "products": "/api/products",
             "frontend": "/"
         }
     }
@@ -4,11 +4,16 @@ from alembic import context
 from sqlalchemy import engine_from_config, pool
 
 from models.models import Base
+from settings import api_config
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
+# URL бази береться з налаштувань застосунку (DATABASE_URL / DATABASE_NAME),
+# async-драйвер замінюється синхронним (aiosqlite -> pysqlite, asyncpg -> psycopg2)
+config.set_main_option("sqlalchemy.url", api_config.uri_sync().replace("%", "%%"))
+
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -21,6 +26,16 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Повнотекстовий пошук (products_fts та її службові таблиці, GIN-індекс
+    # ix_products_search) створюється міграцією вручну і в моделях не описаний
+    if type_ == "table" and name.startswith("products_fts"):
+        return False
+    if type_ == "index" and name == "ix_products_search":
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -45,6 +60,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -65,7 +81,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
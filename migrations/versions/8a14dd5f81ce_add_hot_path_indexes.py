@@ -0,0 +1,70 @@
+"""add hot path indexes
+
+Revision ID: 8a14dd5f81ce
+Revises: ec9ed3489ff0
+Create Date: 2026-10-17 10:12:41.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a14dd5f81ce'
+down_revision: Union[str, Sequence[str], None] = 'ec9ed3489ff0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=False)
+
+    op.create_index(op.f('ix_repair_requests_user_id'), 'repair_requests', ['user_id'], unique=False)
+    op.create_index(op.f('ix_repair_requests_admin_id'), 'repair_requests', ['admin_id'], unique=False)
+    op.create_index(op.f('ix_repair_requests_created_at'), 'repair_requests', ['created_at'], unique=False)
+    op.create_index('ix_repair_requests_status_created_at', 'repair_requests', ['status', 'created_at'], unique=False)
+
+    op.create_index(op.f('ix_admin_messages_request_id'), 'admin_messages', ['request_id'], unique=False)
+    op.create_index(op.f('ix_admin_messages_admin_id'), 'admin_messages', ['admin_id'], unique=False)
+
+    op.create_index(op.f('ix_orders_created_at'), 'orders', ['created_at'], unique=False)
+    op.create_index('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at'], unique=False)
+    op.create_index(op.f('ix_orders_status'), 'orders', ['status'], unique=False)
+
+    op.create_index(op.f('ix_order_items_order_id'), 'order_items', ['order_id'], unique=False)
+    op.create_index(op.f('ix_order_items_product_id'), 'order_items', ['product_id'], unique=False)
+
+    op.create_index('ix_notifications_user_id_is_read_created_at', 'notifications', ['user_id', 'is_read', 'created_at'], unique=False)
+    op.create_index(op.f('ix_notifications_repair_request_id'), 'notifications', ['repair_request_id'], unique=False)
+    op.create_index(op.f('ix_notifications_order_id'), 'notifications', ['order_id'], unique=False)
+
+    op.create_index('ix_products_category_price', 'products', ['category', 'price'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_category_price', table_name='products')
+
+    op.drop_index(op.f('ix_notifications_order_id'), table_name='notifications')
+    op.drop_index(op.f('ix_notifications_repair_request_id'), table_name='notifications')
+    op.drop_index('ix_notifications_user_id_is_read_created_at', table_name='notifications')
+
+    op.drop_index(op.f('ix_order_items_product_id'), table_name='order_items')
+    op.drop_index(op.f('ix_order_items_order_id'), table_name='order_items')
+
+    op.drop_index(op.f('ix_orders_status'), table_name='orders')
+    op.drop_index('ix_orders_user_id_created_at', table_name='orders')
+    op.drop_index(op.f('ix_orders_created_at'), table_name='orders')
+
+    op.drop_index(op.f('ix_admin_messages_admin_id'), table_name='admin_messages')
+    op.drop_index(op.f('ix_admin_messages_request_id'), table_name='admin_messages')
+
+    op.drop_index('ix_repair_requests_status_created_at', table_name='repair_requests')
+    op.drop_index(op.f('ix_repair_requests_created_at'), table_name='repair_requests')
+    op.drop_index(op.f('ix_repair_requests_admin_id'), table_name='repair_requests')
+    op.drop_index(op.f('ix_repair_requests_user_id'), table_name='repair_requests')
+
+    op.drop_index(op.f('ix_users_username'), table_name='users')
@@ -7,7 +7,6 @@ Create Date: 2025-12-18 11:15:00.000000
 """
 from alembic import op
 import sqlalchemy as sa
-from sqlalchemy import text
 
 
 # revision identifiers, used by Alembic.
@@ -21,8 +20,7 @@ def upgrade() -> None:
     # ### commands auto generated by Alembic - please adjust! ###
     # Check if the old table exists before renaming
     connection = op.get_bind()
-    result = connection.execute(text("SELECT name FROM sqlite_master WHERE type='table' AND name='rewiews';"))
-    if result.fetchone():
+    if sa.inspect(connection).has_table('rewiews'):
         op.rename_table('rewiews', 'reviews')
     # ### end Alembic commands ###
 
@@ -31,7 +29,6 @@ def downgrade() -> None:
     # ### commands auto generated by Alembic - please adjust! ###
     # Check if the new table exists before renaming back
     connection = op.get_bind()
-    result = connection.execute(text("SELECT name FROM sqlite_master WHERE type='table' AND name='reviews';"))
-    if result.fetchone():
+    if sa.inspect(connection).has_table('reviews'):
         op.rename_table('reviews', 'rewiews')
     # ### end Alembic commands ###
\ No newline at end of file
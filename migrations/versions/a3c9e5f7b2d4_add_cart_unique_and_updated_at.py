@@ -0,0 +1,45 @@
+"""add cart unique and updated_at
+
+Revision ID: a3c9e5f7b2d4
+Revises: f2b8d4e6a1c7
+Create Date: 2026-10-17 16:11:48.290536
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e5f7b2d4'
+down_revision: Union[str, Sequence[str], None] = 'f2b8d4e6a1c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('carts', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_carts_updated_at'), 'carts', ['updated_at'], unique=False)
+
+    # Дублікати (user_id, product_id) зливаються в один рядок перед унікальним індексом
+    op.execute(
+        "UPDATE carts SET quantity = ("
+        "SELECT SUM(c.quantity) FROM carts c "
+        "WHERE c.user_id = carts.user_id AND c.product_id = carts.product_id)"
+    )
+    op.execute(
+        "DELETE FROM carts WHERE id NOT IN ("
+        "SELECT MIN(id) FROM carts GROUP BY user_id, product_id)"
+    )
+    op.execute("UPDATE carts SET updated_at = CURRENT_TIMESTAMP")
+    op.create_index('ux_carts_user_id_product_id', 'carts', ['user_id', 'product_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_carts_user_id_product_id', table_name='carts')
+    op.drop_index(op.f('ix_carts_updated_at'), table_name='carts')
+    with op.batch_alter_table('carts', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
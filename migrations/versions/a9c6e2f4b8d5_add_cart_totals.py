@@ -0,0 +1,52 @@
+"""add cart totals
+
+Revision ID: a9c6e2f4b8d5
+Revises: f8b5d1e3a7c4
+Create Date: 2026-10-17 21:12:09.604417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c6e2f4b8d5'
+down_revision: Union[str, Sequence[str], None] = 'f8b5d1e3a7c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('carts', sa.Column('price_cents', sa.Integer(), nullable=True))
+    op.create_table('cart_totals',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total_cents', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index(op.f('ix_cart_totals_updated_at'), 'cart_totals', ['updated_at'], unique=False)
+
+    # Наявні кошики фіксують поточну ціну товару та отримують суму
+    op.execute(
+        "UPDATE carts SET price_cents = ("
+        "SELECT CAST(ROUND(products.price * 100) AS INTEGER) FROM products "
+        "WHERE products.id = carts.product_id)"
+    )
+    op.execute(
+        "INSERT INTO cart_totals (user_id, total_cents, updated_at) "
+        "SELECT user_id, COALESCE(SUM(quantity * price_cents), 0), "
+        "COALESCE(MAX(updated_at), CURRENT_TIMESTAMP) "
+        "FROM carts GROUP BY user_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_cart_totals_updated_at'), table_name='cart_totals')
+    op.drop_table('cart_totals')
+    with op.batch_alter_table('carts', schema=None) as batch_op:
+        batch_op.drop_column('price_cents')
@@ -0,0 +1,43 @@
+"""add stock reservations
+
+Revision ID: b4d1f6a8c3e9
+Revises: a3c9e5f7b2d4
+Create Date: 2026-10-17 17:24:06.518342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d1f6a8c3e9'
+down_revision: Union[str, Sequence[str], None] = 'a3c9e5f7b2d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stock_reservations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_stock_reservations_expires_at'), 'stock_reservations', ['expires_at'], unique=False)
+    op.create_index('ix_stock_reservations_product_id_expires_at', 'stock_reservations', ['product_id', 'expires_at', 'quantity', 'user_id'], unique=False)
+    op.create_index('ux_stock_reservations_user_id_product_id', 'stock_reservations', ['user_id', 'product_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_stock_reservations_user_id_product_id', table_name='stock_reservations')
+    op.drop_index('ix_stock_reservations_product_id_expires_at', table_name='stock_reservations')
+    op.drop_index(op.f('ix_stock_reservations_expires_at'), table_name='stock_reservations')
+    op.drop_table('stock_reservations')
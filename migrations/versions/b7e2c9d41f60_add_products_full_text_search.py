@@ -0,0 +1,86 @@
+"""add products full text search
+
+Revision ID: b7e2c9d41f60
+Revises: 8a14dd5f81ce
+Create Date: 2026-10-17 11:03:27.540912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2c9d41f60'
+down_revision: Union[str, Sequence[str], None] = '8a14dd5f81ce'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# FTS5 з зовнішнім вмістом: текст зберігається лише в products, індекс
+# синхронізують тригери. Апострофи (', ’, ʼ) — роздільники токенів.
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE products_fts USING fts5(
+        name, description,
+        content='products', content_rowid='id',
+        tokenize="unicode61 remove_diacritics 2 separators 'ʼ’'",
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS products_fts_au",
+    "DROP TRIGGER IF EXISTS products_fts_ad",
+    "DROP TRIGGER IF EXISTS products_fts_ai",
+    "DROP TABLE IF EXISTS products_fts",
+]
+
+# Вираз має збігатися з tools.search.PG_DOCUMENT_SQL
+POSTGRES_UPGRADE = [
+    """
+    CREATE INDEX ix_products_search ON products
+    USING gin (to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, '')))
+    """,
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_products_search",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    statements = SQLITE_UPGRADE if op.get_bind().dialect.name == "sqlite" else POSTGRES_UPGRADE
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    statements = SQLITE_DOWNGRADE if op.get_bind().dialect.name == "sqlite" else POSTGRES_DOWNGRADE
+    for statement in statements:
+        op.execute(sa.text(statement))
@@ -0,0 +1,41 @@
+"""add keyset pagination indexes
+
+Revision ID: c3f8a6e2d915
+Revises: b7e2c9d41f60
+Create Date: 2026-10-17 12:21:08.774310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a6e2d915'
+down_revision: Union[str, Sequence[str], None] = 'b7e2c9d41f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_products_created_at'), 'products', ['created_at'], unique=False)
+    op.create_index('ix_products_category_created_at', 'products', ['category', 'created_at'], unique=False)
+
+    # (status, created_at) покриває і фільтр за статусом, і сортування сторінки
+    op.drop_index(op.f('ix_orders_status'), table_name='orders')
+    op.create_index('ix_orders_status_created_at', 'orders', ['status', 'created_at'], unique=False)
+
+    op.create_index('ix_notifications_user_id_created_at', 'notifications', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notifications_user_id_created_at', table_name='notifications')
+
+    op.drop_index('ix_orders_status_created_at', table_name='orders')
+    op.create_index(op.f('ix_orders_status'), 'orders', ['status'], unique=False)
+
+    op.drop_index('ix_products_category_created_at', table_name='products')
+    op.drop_index(op.f('ix_products_created_at'), table_name='products')
@@ -0,0 +1,29 @@
+"""add product version
+
+Revision ID: d5a0b7c3e8f4
+Revises: c3f8a6e2d915
+Create Date: 2026-10-17 13:40:52.106383
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a0b7c3e8f4'
+down_revision: Union[str, Sequence[str], None] = 'c3f8a6e2d915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Без batch-режиму: перестворення таблиці в SQLite знищило б тригери products_fts
+    op.drop_column('products', 'version')
@@ -0,0 +1,33 @@
+"""add admin counters
+
+Revision ID: d6f3b8c1e5a2
+Revises: c5e2a7b9d4f1
+Create Date: 2026-10-17 18:41:52.603117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6f3b8c1e5a2'
+down_revision: Union[str, Sequence[str], None] = 'c5e2a7b9d4f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Значення заповнює звіряння при старті застосунку (або python -m tools.counters)
+    op.create_table('admin_counters',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('admin_counters')
@@ -0,0 +1,54 @@
+"""add product recommendations
+
+Revision ID: e1f4c2a9b6d3
+Revises: d5a0b7c3e8f4
+Create Date: 2026-10-17 14:25:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f4c2a9b6d3'
+down_revision: Union[str, Sequence[str], None] = 'd5a0b7c3e8f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Як RECOMMENDATIONS_MAX_ORDER_PRODUCTS за замовчуванням; для іншого значення
+# пари перебудовуються командою python -m tools.recommendations
+MAX_ORDER_PRODUCTS = 20
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('product_recommendations',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('recommended_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['recommended_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'recommended_id')
+    )
+    op.create_index('ix_product_recommendations_product_id_score', 'product_recommendations', ['product_id', 'score', 'recommended_id'], unique=False)
+
+    # Пари з уже оформлених замовлень
+    op.execute(sa.text(
+        "INSERT INTO product_recommendations (product_id, recommended_id, score, updated_at) "
+        "SELECT a.product_id, b.product_id, COUNT(DISTINCT a.order_id), CURRENT_TIMESTAMP "
+        "FROM order_items a JOIN order_items b "
+        "ON b.order_id = a.order_id AND b.product_id != a.product_id "
+        "WHERE a.order_id IN ("
+        "SELECT order_id FROM order_items GROUP BY order_id "
+        "HAVING COUNT(DISTINCT product_id) <= :max_products) "
+        "GROUP BY a.product_id, b.product_id"
+    ).bindparams(max_products=MAX_ORDER_PRODUCTS))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_product_recommendations_product_id_score', table_name='product_recommendations')
+    op.drop_table('product_recommendations')
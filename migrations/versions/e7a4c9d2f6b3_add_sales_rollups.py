@@ -0,0 +1,69 @@
+"""add sales rollups
+
+Revision ID: e7a4c9d2f6b3
+Revises: d6f3b8c1e5a2
+Create Date: 2026-10-17 19:20:14.872031
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a4c9d2f6b3'
+down_revision: Union[str, Sequence[str], None] = 'd6f3b8c1e5a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ORDER_STATUSES = ('NEW', 'PROCESSING', 'CONFIRMED', 'PREPARING', 'READY', 'ON_THE_WAY', 'DELIVERED', 'CANCELLED')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Тип order_status уже існує (таблиця orders)
+    order_status = sa.Enum(*ORDER_STATUSES, name='order_status').with_variant(
+        postgresql.ENUM(*ORDER_STATUSES, name='order_status', create_type=False), 'postgresql'
+    )
+
+    op.create_table('daily_product_sales',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('day', 'product_id')
+    )
+    op.create_table('daily_customer_sales',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('day', 'user_id')
+    )
+    op.create_table('daily_order_status',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', order_status, nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status')
+    )
+    op.create_table('rollup_state',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('high_water', sa.DateTime(), nullable=True),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_index(op.f('ix_orders_updated_at'), 'orders', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_orders_updated_at'), table_name='orders')
+    op.drop_table('rollup_state')
+    op.drop_table('daily_order_status')
+    op.drop_table('daily_customer_sales')
+    op.drop_table('daily_product_sales')
@@ -0,0 +1,34 @@
+"""add hourly metrics
+
+Revision ID: f8b5d1e3a7c4
+Revises: e7a4c9d2f6b3
+Create Date: 2026-10-17 20:05:43.291864
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f8b5d1e3a7c4'
+down_revision: Union[str, Sequence[str], None] = 'e7a4c9d2f6b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('hourly_metrics',
+    sa.Column('hour', sa.DateTime(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('repairs', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('hour')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('hourly_metrics')
@@ -6,7 +6,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from werkzeug.security import generate_password_hash
 from models.models import User, Product, ProductCategory
-from settings import async_session, async_engine, Base
+from settings import async_session, async_engine, Base, dispose_engines
 
 
 async def insert_data():
@@ -155,6 +155,8 @@ async def main():
         print(f"❌ Помилка: {type(e).__name__}: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        await dispose_engines()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,9 @@
 import datetime as dt
 from enum import Enum
 
-from sqlalchemy import Boolean, DateTime
+from sqlalchemy import Boolean, Date, DateTime
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy import ForeignKey, String, Text, func
+from sqlalchemy import ForeignKey, Index, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from settings import Base
@@ -22,7 +22,7 @@ class User(Base):
     __tablename__ = "users"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    username: Mapped[str] = mapped_column(String(50), nullable=False)
+    username: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
     email: Mapped[str] = mapped_column(String(50), unique=True, nullable=False)
     password: Mapped[str] = mapped_column(
         String(255), nullable=False
@@ -64,6 +64,9 @@ class User(Base):
 
 class RepairRequest(Base):
     __tablename__ = "repair_requests"
+    __table_args__ = (
+        Index("ix_repair_requests_status_created_at", "status", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     description: Mapped[str] = mapped_column(Text, nullable=False)
@@ -75,13 +78,13 @@ class RepairRequest(Base):
         default=RequestStatus.NEW.value
     )
 
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=func.now())
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=func.now(), index=True)
     updated_at: Mapped[dt.datetime] = mapped_column(
         DateTime, default=func.now(), onupdate=func.now()
     )
 
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
-    admin_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    admin_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=True, index=True)
 
     user: Mapped["User"] = relationship(
         "User",
@@ -125,9 +128,9 @@ class AdminMessage(Base):
     )
 
     request_id: Mapped[int] = mapped_column(
-        ForeignKey("repair_requests.id"), nullable=False
+        ForeignKey("repair_requests.id"), nullable=False, index=True
     )
-    admin_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    admin_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
 
     # зв’язки
     repair_request: Mapped["RepairRequest"] = relationship(
@@ -165,6 +168,10 @@ class ProductCategory(str, Enum):
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_category_price", "category", "price"),
+        Index("ix_products_category_created_at", "category", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
@@ -176,7 +183,11 @@ class Product(Base):
     )
     image_url: Mapped[str] = mapped_column(String(255), nullable=True)
     stock_quantity: Mapped[int] = mapped_column(default=0)
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=func.now())
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=func.now(), index=True)
+    # Версія рядка: збільшується при кожному UPDATE, з неї будуються ETag-и API
+    version: Mapped[int] = mapped_column(nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
     def __str__(self):
         return f"<Product> {self.name} - {self.price} грн"
@@ -184,17 +195,56 @@ class Product(Base):
 
 class Cart(Base):
     __tablename__ = "carts"
+    __table_args__ = (
+        # Один рядок на товар у кошику: додавання — upsert з quantity + n
+        Index("ux_carts_user_id_product_id", "user_id", "product_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False)
     quantity: Mapped[int] = mapped_column(default=1)
     added_at: Mapped[dt.datetime] = mapped_column(DateTime, default=func.now())
+    # Остання зміна кошика (для TTL); пишеться з Python, щоб порівнювати в одному часовому поясі
+    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, nullable=True, index=True)
+    # Ціна за одиницю на момент додавання (копійки): з неї рахується сума кошика
+    price_cents: Mapped[int] = mapped_column(nullable=True)
 
     user: Mapped["User"] = relationship("User", backref="cart_items")
     product: Mapped["Product"] = relationship("Product")
 
 
+class CartTotal(Base):
+    """Сума кошика користувача (копійки), оновлюється тими ж запитами, що й carts"""
+    __tablename__ = "cart_totals"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    total_cents: Mapped[int] = mapped_column(nullable=False, default=0)
+    # Як carts.updated_at: остання зміна кошика, пишеться з Python
+    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+
+class StockReservation(Base):
+    """Тимчасове утримання товару з кошика: доступно = stock_quantity - живі утримання"""
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        # Одне утримання на товар у кошику користувача; кількість — абсолютна
+        Index("ux_stock_reservations_user_id_product_id", "user_id", "product_id", unique=True),
+        # Сума живих утримань товару — діапазон індексу без звернення до таблиці
+        Index(
+            "ix_stock_reservations_product_id_expires_at",
+            "product_id", "expires_at", "quantity", "user_id",
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    quantity: Mapped[int] = mapped_column(nullable=False)
+    # Пишеться з Python, як і carts.updated_at; прострочені рядки видаляє sweeper
+    expires_at: Mapped[dt.datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+
 class OrderStatus(str, Enum):
     NEW = "Новий"
     PROCESSING = "В обробці"
@@ -208,6 +258,13 @@ class OrderStatus(str, Enum):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_user_id_created_at", "user_id", "created_at"),
+        Index("ix_orders_status_created_at", "status", "created_at"),
+    )
+    # created_at/updated_at повертаються з INSERT/UPDATE (RETURNING): tools.counters
+    # бачить день замовлення так само, як func.date(created_at) у звірянні
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
@@ -222,9 +279,10 @@ class Order(Base):
     shipping_address: Mapped[str] = mapped_column(Text, nullable=False)
     notes: Mapped[str] = mapped_column(Text, nullable=True)
 
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=func.now())
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=func.now(), index=True)
+    # Індекс — high-water mark для tools.rollups
     updated_at: Mapped[dt.datetime] = mapped_column(
-        DateTime, default=func.now(), onupdate=func.now()
+        DateTime, default=func.now(), onupdate=func.now(), index=True
     )
 
     user: Mapped["User"] = relationship("User", backref="orders")
@@ -248,8 +306,8 @@ class OrderItem(Base):
     __tablename__ = "order_items"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id"), nullable=False)
-    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False)
+    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id"), nullable=False, index=True)
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False, index=True)
     quantity: Mapped[int] = mapped_column(default=1)
     price: Mapped[float] = mapped_column(nullable=False)  # Цена на момент покупки
 
@@ -260,6 +318,103 @@ class OrderItem(Base):
         return f"<OrderItem {self.product_id} x{self.quantity}>"
 
 
+class ProductRecommendation(Base):
+    """Товари, які купували разом: score — кількість спільних замовлень"""
+    __tablename__ = "product_recommendations"
+    __table_args__ = (
+        # Топ-N для сторінки товару — один діапазон індексу в порядку score
+        Index("ix_product_recommendations_product_id_score", "product_id", "score", "recommended_id"),
+    )
+
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    recommended_id: Mapped[int] = mapped_column(ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    score: Mapped[int] = mapped_column(nullable=False, default=0)
+    updated_at: Mapped[dt.datetime] = mapped_column(
+        DateTime, nullable=False, server_default=func.now(), onupdate=func.now()
+    )
+
+
+class ProductView(Base):
+    """Перегляди сторінки товару за день (накопичуються в пам'яті й записуються пачками)"""
+    __tablename__ = "product_views"
+
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[dt.date] = mapped_column(Date, primary_key=True, index=True)
+    views: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+class IdempotencyRecord(Base):
+    """Відповідь на POST з ключем ідемпотентності: повтор отримує її без повторного виконання"""
+    __tablename__ = "idempotency_records"
+
+    # sha256(scope, user_id, ключ клієнта)
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # sha256 полів форми: той самий ключ з іншими даними — помилка клієнта
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int] = mapped_column(nullable=True)
+    location: Mapped[str] = mapped_column(Text, nullable=True)
+    expires_at: Mapped[dt.datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+
+class AdminCounter(Base):
+    """Лічильники адмін-панелі (tools.counters): оновлюються у транзакції зміни рядків"""
+    __tablename__ = "admin_counters"
+
+    # users, orders_new, ... або orders:2026-10-17 для лічильників за день
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    value: Mapped[float] = mapped_column(nullable=False, default=0)
+
+
+class DailyProductSales(Base):
+    """Продажі товару за день створення замовлення (tools.rollups)"""
+    __tablename__ = "daily_product_sales"
+
+    day: Mapped[dt.date] = mapped_column(Date, primary_key=True)
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    quantity: Mapped[int] = mapped_column(nullable=False, default=0)
+    revenue: Mapped[float] = mapped_column(nullable=False, default=0)
+
+
+class DailyCustomerSales(Base):
+    """Замовлення та витрати покупця за день (tools.rollups)"""
+    __tablename__ = "daily_customer_sales"
+
+    day: Mapped[dt.date] = mapped_column(Date, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    orders: Mapped[int] = mapped_column(nullable=False, default=0)
+    revenue: Mapped[float] = mapped_column(nullable=False, default=0)
+
+
+class DailyOrderStatus(Base):
+    """Замовлення за день створення і поточним статусом (tools.rollups)"""
+    __tablename__ = "daily_order_status"
+
+    day: Mapped[dt.date] = mapped_column(Date, primary_key=True)
+    status: Mapped[OrderStatus] = mapped_column(SQLEnum(OrderStatus, name="order_status"), primary_key=True)
+    orders: Mapped[int] = mapped_column(nullable=False, default=0)
+    revenue: Mapped[float] = mapped_column(nullable=False, default=0)
+
+
+class HourlyMetric(Base):
+    """Замовлення, дохід і заявки за годину створення (tools.rollups, графіки адмін-панелі)"""
+    __tablename__ = "hourly_metrics"
+
+    hour: Mapped[dt.datetime] = mapped_column(DateTime, primary_key=True)
+    orders: Mapped[int] = mapped_column(nullable=False, default=0)
+    revenue: Mapped[float] = mapped_column(nullable=False, default=0)
+    repairs: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+class RollupState(Base):
+    """High-water mark фонового оновлення зведених таблиць"""
+    __tablename__ = "rollup_state"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    # Найбільший orders.updated_at (для hourly — created_at), уже врахований у зведеннях
+    high_water: Mapped[dt.datetime] = mapped_column(DateTime, nullable=True)
+    refreshed_at: Mapped[dt.datetime] = mapped_column(DateTime, nullable=True)
+
+
 class NotificationType(str, Enum):
     REPAIR_UPDATE = "Оновлення по ремонту"
     ORDER_UPDATE = "Оновлення замовлення"
@@ -269,6 +424,10 @@ class NotificationType(str, Enum):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_id_is_read_created_at", "user_id", "is_read", "created_at"),
+        Index("ix_notifications_user_id_created_at", "user_id", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
@@ -282,10 +441,10 @@ class Notification(Base):
     
     # Додаткові поля для зв'язку з іншими моделями
     repair_request_id: Mapped[int] = mapped_column(
-        ForeignKey("repair_requests.id"), nullable=True
+        ForeignKey("repair_requests.id"), nullable=True, index=True
     )
     order_id: Mapped[int] = mapped_column(
-        ForeignKey("orders.id"), nullable=True
+        ForeignKey("orders.id"), nullable=True, index=True
     )
     admin_message_id: Mapped[int] = mapped_column(
         ForeignKey("admin_messages.id"), nullable=True
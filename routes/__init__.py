@@ -3,6 +3,7 @@ from .frontend import router as frontend_router
 from .user_account import router as user_account_router
 from .products import router as products_router
 from .admin_panel import router as admin_panel_router
+from .catalog_api import router as catalog_api_router
 
 
 print("Routes imported:")
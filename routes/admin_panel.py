@@ -1,18 +1,31 @@
-from fastapi import APIRouter, Depends, Request, Form, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, Request, Form, HTTPException, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import raiseload, selectinload
 from datetime import datetime, date, timedelta
 from typing import Optional
 
 from routes.auth import require_admin
-from settings import get_db
+from settings import get_db, get_read_db
+from tools import counters, idempotency, images, rollups
+from tools.cart_store import cart_store
+from tools.facets import facet_index
+from tools.identity_cache import identity_cache
+from tools.idempotency import idempotency_store
+from tools.page_cache import page_cache, page_cache_channel
+from tools.loaders import load_identity, users_with_repairs_count
+from tools.pagination import paginate
+from tools.passwords import password_hasher
+from tools.popularity import popularity_feed
+from tools.stock import stock_reservations
 from models.models import User, RepairRequest, RequestStatus, AdminMessage, Order, OrderStatus, OrderItem, Product, ProductCategory
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 templates = Jinja2Templates(directory="templates")
+images.install(templates)
+idempotency.install(templates)
 
 
 @router.get("/")
@@ -20,48 +33,26 @@ async def admin_dashboard(request: Request, db: AsyncSession = Depends(get_db)):
     """Адміністративна панель"""
     current_user = await require_admin(request, db)
     
-    # Статистика користувачів
-    users_count = await db.execute(select(User))
-    users_count = len(users_count.scalars().all())
-    
-    # Статистика заявок
-    repairs_count = await db.execute(select(RepairRequest))
-    repairs_count = len(repairs_count.scalars().all())
-    
-    new_repairs_count = await db.execute(select(RepairRequest).where(RepairRequest.status == RequestStatus.NEW))
-    new_repairs_count = len(new_repairs_count.scalars().all())
-    
-    # Статистика замовлень
-    orders_count = await db.execute(select(Order))
-    orders_count = len(orders_count.scalars().all())
-    
-    new_orders_count = await db.execute(select(Order).where(Order.status == OrderStatus.NEW))
-    new_orders_count = len(new_orders_count.scalars().all())
-    
-    # Загальний дохід
-    total_revenue_result = await db.execute(select(func.sum(Order.total_amount)))
-    total_revenue = total_revenue_result.scalar() or 0
-    
-    # Замовлення за сьогодні
+    # Кількості та дохід — одне читання таблиці лічильників за первинним ключем
     today = date.today()
-    today_start = datetime(today.year, today.month, today.day)
-    today_end = datetime(today.year, today.month, today.day, 23, 59, 59)
-    
-    today_orders_stmt = select(func.count(Order.id)).where(
-        Order.created_at.between(today_start, today_end)
-    )
-    today_orders_result = await db.execute(today_orders_stmt)
-    today_orders = today_orders_result.scalar() or 0
-    
-    today_revenue_stmt = select(func.sum(Order.total_amount)).where(
-        Order.created_at.between(today_start, today_end)
-    )
-    today_revenue_result = await db.execute(today_revenue_stmt)
-    today_revenue = today_revenue_result.scalar() or 0
+    today_orders_key = counters.day_key("orders", today)
+    today_revenue_key = counters.day_key("revenue", today)
+    values = await counters.read(db, (*counters.TOTALS, today_orders_key, today_revenue_key))
+
+    users_count = int(values["users"])
+    repairs_count = int(values["repairs"])
+    new_repairs_count = int(values["repairs_new"])
+    orders_count = int(values["orders"])
+    new_orders_count = int(values["orders_new"])
+    total_revenue = values["revenue"]
+
+    # Замовлення за сьогодні
+    today_orders = int(values[today_orders_key])
+    today_revenue = values[today_revenue_key]
     
     # Останні 5 замовлень
     latest_orders_stmt = select(Order)\
-        .options(selectinload(Order.user))\
+        .options(load_identity(Order.user), raiseload("*"))\
         .order_by(Order.created_at.desc())\
         .limit(5)
     latest_orders_result = await db.execute(latest_orders_stmt)
@@ -69,7 +60,7 @@ async def admin_dashboard(request: Request, db: AsyncSession = Depends(get_db)):
     
     # Останні 5 заявок
     latest_repairs_stmt = select(RepairRequest)\
-        .options(selectinload(RepairRequest.user))\
+        .options(load_identity(RepairRequest.user), raiseload("*"))\
         .order_by(RepairRequest.created_at.desc())\
         .limit(5)
     latest_repairs_result = await db.execute(latest_repairs_stmt)
@@ -98,6 +89,7 @@ async def admin_dashboard(request: Request, db: AsyncSession = Depends(get_db)):
 async def admin_repairs_list(
     request: Request, 
     new: bool = False,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
     """Перегляд всіх заявок або тільки нових"""
@@ -109,18 +101,20 @@ async def admin_repairs_list(
     else:
         stmt = select(RepairRequest)
     
-    stmt = stmt.options(selectinload(RepairRequest.user))
-    stmt = stmt.order_by(RepairRequest.created_at.desc())
+    stmt = stmt.options(load_identity(RepairRequest.user), raiseload("*"))
     
-    result = await db.execute(stmt)
-    repairs = result.scalars().all()
+    page = await paginate(
+        db, stmt, (RepairRequest.created_at, RepairRequest.id), cursor,
+        key=lambda repair: (repair.created_at, repair.id),
+    )
     
     return templates.TemplateResponse(
         "admin/repairs.html",
         {
             "request": request,
             "current_user": current_user,
-            "repairs": repairs,
+            "repairs": page.items,
+            "page": page,
             "show_new_only": new
         }
     )
@@ -196,7 +190,7 @@ async def admin_assigned_repairs(
     # Отримати заявки, призначені поточному адміну
     stmt = select(RepairRequest)\
         .where(RepairRequest.admin_id == current_user["id"])\
-        .options(selectinload(RepairRequest.user))\
+        .options(load_identity(RepairRequest.user), raiseload("*"))\
         .order_by(RepairRequest.created_at.desc())
     
     result = await db.execute(stmt)
@@ -272,22 +266,27 @@ async def add_comment_to_repair(
 @router.get("/users", response_class=HTMLResponse)
 async def admin_users_list(
     request: Request,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
     """Перегляд всіх користувачів"""
     current_user = await require_admin(request, db)
     
-    # Простой запрос без поиска
-    stmt = select(User).order_by(User.id.desc())
-    result = await db.execute(stmt)
-    users = result.scalars().all()
+    # Лише колонки ідентичності та кількість заявок, без завантаження зв'язків.
+    # У users немає created_at, тому ключ сторінок — лише id
+    page = await paginate(
+        db, users_with_repairs_count(), (User.id,), cursor,
+        key=lambda user: (user.id,),
+        scalars=False,
+    )
     
     return templates.TemplateResponse(
         "admin/users.html",
         {
             "request": request,
             "current_user": current_user,
-            "users": users
+            "users": page.items,
+            "page": page
         }
     )
 
@@ -296,17 +295,15 @@ async def admin_users_list(
 async def admin_orders_list(
     request: Request,
     status: Optional[str] = None,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
     """Перегляд всіх замовлень"""
     current_user = await require_admin(request, db)
     
-    # Базовый запрос
+    # Базовый запрос: у списку потрібна лише кількість позицій, не самі товари
     stmt = select(Order)\
-        .options(
-            selectinload(Order.user),
-            selectinload(Order.items).selectinload(OrderItem.product)
-        )
+        .options(load_identity(Order.user), raiseload("*"))
     
     # Фильтр по статусу
     if status and status != "all":
@@ -316,17 +313,29 @@ async def admin_orders_list(
         except ValueError:
             pass
     
-    stmt = stmt.order_by(Order.created_at.desc())
+    page = await paginate(
+        db, stmt, (Order.created_at, Order.id), cursor,
+        key=lambda order: (order.created_at, order.id),
+    )
     
-    result = await db.execute(stmt)
-    orders = result.scalars().all()
+    # Кількість позицій лише для замовлень поточної сторінки
+    items_counts = {order.id: 0 for order in page.items}
+    if items_counts:
+        counts = await db.execute(
+            select(OrderItem.order_id, func.count(OrderItem.id))
+            .where(OrderItem.order_id.in_(items_counts))
+            .group_by(OrderItem.order_id)
+        )
+        items_counts.update(counts.all())
     
     return templates.TemplateResponse(
         "admin/orders.html",
         {
             "request": request,
             "current_user": current_user,
-            "orders": orders,
+            "orders": page.items,
+            "items_counts": items_counts,
+            "page": page,
             "statuses": list(OrderStatus),
             "selected_status": status
         }
@@ -396,6 +405,7 @@ async def update_order_status(
 async def admin_products_list(
     request: Request,
     category: Optional[str] = None,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
     """Управління товарами"""
@@ -412,17 +422,18 @@ async def admin_products_list(
         except ValueError:
             pass
     
-    stmt = stmt.order_by(Product.created_at.desc())
-    
-    result = await db.execute(stmt)
-    products = result.scalars().all()
+    page = await paginate(
+        db, stmt, (Product.created_at, Product.id), cursor,
+        key=lambda product: (product.created_at, product.id),
+    )
     
     return templates.TemplateResponse(
         "admin/products.html",
         {
             "request": request,
             "current_user": current_user,
-            "products": products,
+            "products": page.items,
+            "page": page,
             "categories": list(ProductCategory),
             "selected_category": category
         }
@@ -450,6 +461,7 @@ async def admin_create_product_page(
 @router.post("/product/create")
 async def admin_create_product(
     request: Request,
+    background_tasks: BackgroundTasks,
     name: str = Form(...),
     description: str = Form(...),
     price: float = Form(...),
@@ -460,8 +472,18 @@ async def admin_create_product(
 ):
     """Створити новий товар"""
     current_user = await require_admin(request, db)
+
+    # Повторне надсилання форми (заголовок Idempotency-Key або поле idempotency_key)
+    key = await idempotency_store.key(request, "admin_create_product", current_user["id"])
+    replay = await idempotency_store.replay(db, key)
+    if replay is not None:
+        return replay
     
     try:
+        replay = await idempotency_store.claim(db, key)
+        if replay is not None:
+            return replay
+
         product = Product(
             name=name,
             description=description,
@@ -472,12 +494,18 @@ async def admin_create_product(
         )
         
         db.add(product)
-        await db.commit()
-        
-        return RedirectResponse(
+        response = RedirectResponse(
             url=f"/admin/products?message=Товар+{name}+створено+успішно",
             status_code=303
         )
+        await idempotency_store.remember(db, key, response)
+        await db.commit()
+        # Зменшені WebP-копії локального зображення
+        background_tasks.add_task(images.image_derivatives.generate_async, image_url)
+        
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=400, detail=f"Помилка створення товару: {str(e)}")
@@ -510,6 +538,7 @@ async def admin_edit_product_page(
 @router.post("/product/{product_id}/edit")
 async def admin_update_product(
     request: Request,
+    background_tasks: BackgroundTasks,
     product_id: int,
     name: str = Form(...),
     description: str = Form(...),
@@ -536,6 +565,8 @@ async def admin_update_product(
             product.image_url = image_url
         
         await db.commit()
+        if image_url:
+            background_tasks.add_task(images.image_derivatives.generate_async, image_url)
         
         return RedirectResponse(
             url=f"/admin/products?message=Товар+{name}+оновлено+успішно",
@@ -584,28 +615,29 @@ async def admin_delete_product(
 
 
 @router.get("/statistics", response_class=HTMLResponse)
+@router.get("/orders/statistics", response_class=HTMLResponse)
 async def admin_statistics(
     request: Request,
-    db: AsyncSession = Depends(get_db)
+    period: Optional[str] = Query(None),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Статистика"""
     current_user = await require_admin(request, db)
-    
-    # Общая статистика по заказам
-    total_orders = await db.execute(select(func.count(Order.id)))
-    total_orders = total_orders.scalar() or 0
-    
-    total_revenue = await db.execute(select(func.sum(Order.total_amount)))
-    total_revenue = total_revenue.scalar() or 0
-    
-    # Статистика по статусам заказов
-    orders_by_status = await db.execute(
-        select(
-            Order.status,
-            func.count(Order.id).label('count')
-        ).group_by(Order.status)
-    )
-    orders_by_status = orders_by_status.all()
+
+    # Швидкі періоди з головної сторінки; явні дати мають пріоритет
+    today = date.today()
+    if date_from is None and date_to is None:
+        if period == "day":
+            date_from = today
+        elif period == "month":
+            date_from = today.replace(day=1)
+        elif period == "year":
+            date_from = today.replace(month=1, day=1)
+
+    # Замовлення, статуси, топ товарів і клієнтів — зі щоденних зведень (tools.rollups)
+    summary = await rollups.sales_summary(db, date_from, date_to)
     
     # Статистика по категориям товаров
     products_by_category = await db.execute(
@@ -617,49 +649,73 @@ async def admin_statistics(
     )
     products_by_category = products_by_category.all()
     
-    # Топ товаров по продажам
-    top_products = await db.execute(
-        select(
-            Product.name,
-            func.sum(OrderItem.quantity).label('sold_quantity'),
-            func.sum(OrderItem.quantity * OrderItem.price).label('revenue')
-        )
-        .join(OrderItem, OrderItem.product_id == Product.id)
-        .group_by(Product.id, Product.name)
-        .order_by(func.sum(OrderItem.quantity * OrderItem.price).desc())
-        .limit(5)
-    )
-    top_products = top_products.all()
-    
-    # Топ клиентов
-    top_customers = await db.execute(
-        select(
-            User.username,
-            func.count(Order.id).label('orders_count'),
-            func.sum(Order.total_amount).label('total_spent')
-        )
-        .join(Order, Order.user_id == User.id)
-        .group_by(User.id, User.username)
-        .order_by(func.sum(Order.total_amount).desc())
-        .limit(5)
-    )
-    top_customers = top_customers.all()
-    
     return templates.TemplateResponse(
         "admin/statistics.html",
         {
             "request": request,
             "current_user": current_user,
-            "total_orders": total_orders,
-            "total_revenue": total_revenue,
-            "orders_by_status": orders_by_status,
+            **summary,
             "products_by_category": products_by_category,
-            "top_products": top_products,
-            "top_customers": top_customers
+            "date_from": date_from,
+            "date_to": date_to
         }
     )
 
 
+@router.get("/api/metrics")
+async def admin_metrics(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """Метрики внутрішніх кешів та сервісів (JSON)"""
+    await require_admin(request, db)
+
+    return {
+        "cart_store": cart_store.stats(),
+        "facet_index": facet_index.stats(),
+        "identity_cache": identity_cache.stats(),
+        "idempotency_store": idempotency_store.stats(),
+        "page_cache": {**page_cache.stats(), **page_cache_channel.stats()},
+        "password_hasher": password_hasher.stats(),
+        "popularity_feed": popularity_feed.stats(),
+        "stock_reservations": stock_reservations.stats(),
+        "image_derivatives": images.image_derivatives.stats()
+    }
+
+
+@router.get("/api/timeseries")
+async def admin_timeseries(
+    request: Request,
+    bucket: str = Query("day"),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Замовлення, дохід і заявки по годинах, днях або тижнях (JSON для графіків)"""
+    await require_admin(request, db)
+
+    if bucket not in rollups.BUCKETS:
+        raise HTTPException(status_code=400, detail="bucket: hour, day або week")
+    # Дати поблизу date.max/date.min не повинні переповнювати межі ряду
+    date_to = min(date_to or date.today(), rollups.LAST_DAY)
+    date_from = date_from or date.fromordinal(max(1, date_to.toordinal() - 29))
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from пізніше за date_to")
+    max_days = rollups.MAX_SPAN_DAYS[bucket]
+    if (date_to - date_from).days >= max_days:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Ряд з кроком {bucket} — не більше {max_days} днів"
+        )
+
+    return {
+        "bucket": bucket,
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "points": await rollups.timeseries(db, bucket, date_from, date_to)
+    }
+
+
 @router.get("/settings", response_class=HTMLResponse)
 async def admin_settings(
     request: Request,
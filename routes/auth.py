@@ -6,12 +6,13 @@ from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from werkzeug.security import check_password_hash, generate_password_hash
 
 from models.models import User
 from schemas.user import UserInput, UserOut
 from settings import api_config, get_db
-from tools.auth import create_access_token, decode_access_token
+from tools.auth import create_access_token, resolve_user
+from tools.loaders import user_select
+from tools.passwords import password_hasher
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
@@ -21,30 +22,18 @@ async def get_current_user_from_cookies(
     request: Request, 
     db: AsyncSession = Depends(get_db)
 ) -> Optional[dict]:
-    """Отримання поточного користувача з cookies"""
-    access_token = request.cookies.get("access_token")
-    if not access_token:
-        return None
-    
-    try:
-        payload = decode_access_token(access_token)
-        # Отримуємо повну інформацію про користувача з БД
-        stmt = select(User).where(User.id == int(payload.get("sub")))
-        result = await db.execute(stmt)
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            return None
-        
-        return {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "is_admin": user.is_admin
-        }
-    except Exception as e:
-        print(f"Error getting user from cookies: {e}")
-        return None
+    """Отримання поточного користувача з cookies.
+
+    AuthStateMiddleware вже визначає користувача один раз на запит і кладе його
+    в request.state, тому повторні виклики (залежність + шаблон) не декодують
+    токен і не звертаються до БД.
+    """
+    if hasattr(request.state, "current_user"):
+        return request.state.current_user
+
+    user_data = await resolve_user(request.cookies.get("access_token"), db)
+    request.state.current_user = user_data
+    return user_data
 
 
 # Функція для залежностей Depends()
@@ -79,7 +68,7 @@ async def require_admin(
 
 async def authenticate_user(username: str, password: str, db: AsyncSession) -> Optional[User]:
     """Аутентифікація користувача"""
-    stmt = select(User).where(
+    stmt = user_select().where(
         (User.username == username) | (User.email == username)
     )
     result = await db.execute(stmt)
@@ -88,8 +77,14 @@ async def authenticate_user(username: str, password: str, db: AsyncSession) -> O
     if not user:
         return None
     
-    if not check_password_hash(user.password, password):
+    if not await password_hasher.verify(user.password, password):
         return None
+
+    # Прозоро переводимо старі хеші на поточні параметри
+    if password_hasher.needs_rehash(user.password):
+        user.password = await password_hasher.hash(password)
+        password_hasher.rehashed += 1
+        await db.commit()
     
     return user
 
@@ -179,7 +174,7 @@ async def register_form_submit(
             {"request": request, "error": ". ".join(errors), "now": datetime.now()}
         )
     
-    stmt = select(User).where(User.email == email)
+    stmt = select(User.id).where(User.email == email)
     result = await db.execute(stmt)
     existing_user = result.scalar_one_or_none()
     
@@ -189,7 +184,7 @@ async def register_form_submit(
             {"request": request, "error": "Користувач з таким email вже існує", "now": datetime.now()}
         )
     
-    stmt = select(User).where(User.username == username)
+    stmt = select(User.id).where(User.username == username)
     result = await db.execute(stmt)
     existing_username = result.scalar_one_or_none()
     
@@ -202,12 +197,12 @@ async def register_form_submit(
     new_user = User(
         username=username, 
         email=email,
-        password=generate_password_hash(password)
+        password=await password_hasher.hash(password)
     )
     
     db.add(new_user)
     await db.commit()
-    await db.refresh(new_user)
+    await db.refresh(new_user, ["id", "is_admin"])
     
     data_payload = {
         "sub": str(new_user.id), 
@@ -264,7 +259,7 @@ async def generate_token(
 
 @router.post("/api/register", response_model=UserOut)
 async def register_user_api(user: UserInput, db: AsyncSession = Depends(get_db)):
-    stmt = select(User).where(User.email == user.email)
+    stmt = select(User.id).where(User.email == user.email)
     result = await db.execute(stmt)
     existing_user = result.scalar_one_or_none()
     
@@ -277,12 +272,12 @@ async def register_user_api(user: UserInput, db: AsyncSession = Depends(get_db))
     new_user = User(
         username=user.username,
         email=user.email,
-        password=generate_password_hash(user.password)
+        password=await password_hasher.hash(user.password)
         )
 
     db.add(new_user)
     await db.commit()
-    await db.refresh(new_user)
+    await db.refresh(new_user, ["id", "is_admin"])
     return new_user
 
 
@@ -0,0 +1,125 @@
+import hashlib
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+
+from models.models import Product
+from settings import get_read_db
+from tools.catalog import catalog_filters, catalog_page
+
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Поля, доступні через fields=
+PRODUCT_FIELDS = (
+    "id", "name", "description", "price", "category",
+    "image_url", "stock_quantity", "created_at", "version",
+)
+# Завантажуються завжди: id та version для ETag, created_at для курсора
+REQUIRED_FIELDS = ("id", "created_at", "version")
+
+# Клієнти та проксі можуть зберігати відповідь, але мають перевіряти її через If-None-Match
+CACHE_CONTROL = "no-cache"
+
+
+def parse_fields(fields: Optional[str]) -> Optional[tuple[str, ...]]:
+    """Список полів з fields=; None, якщо є невідомі поля"""
+    if not fields:
+        return PRODUCT_FIELDS
+    selected = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    if not selected or any(name not in PRODUCT_FIELDS for name in selected):
+        return None
+    return selected
+
+
+def load_fields(selected: tuple[str, ...]):
+    """load_only лише для потрібних колонок"""
+    names = dict.fromkeys((*REQUIRED_FIELDS, *selected))
+    return load_only(*(getattr(Product, name) for name in names))
+
+
+def serialize(product: Product, selected: tuple[str, ...]) -> dict:
+    return {name: getattr(product, name) for name in selected}
+
+
+def make_etag(*parts) -> str:
+    """Сильний ETag з версій рядків і параметрів, що впливають на представлення"""
+    digest = hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match використовує слабке порівняння (RFC 9110), тому префікс W/ ігнорується"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def conditional_response(request: Request, etag: str, content: dict):
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return ORJSONResponse(content, headers=headers)
+
+
+def unknown_fields_response() -> ORJSONResponse:
+    return ORJSONResponse(
+        {"detail": f"Невідомі поля. Доступні: {', '.join(PRODUCT_FIELDS)}"},
+        status_code=400,
+    )
+
+
+@router.get("/products")
+async def api_products(
+    request: Request,
+    category: Optional[str] = None,
+    min_price: Optional[str] = None,
+    max_price: Optional[str] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Список товарів (JSON) з тими ж фільтрами та пагінацією, що й HTML-каталог"""
+    selected = parse_fields(fields)
+    if selected is None:
+        return unknown_fields_response()
+
+    filters = catalog_filters(category, min_price, max_price, search)
+    page, _ = await catalog_page(db, filters, cursor, options=(load_fields(selected),), page_size=limit)
+
+    etag = make_etag(
+        ",".join(selected), page.next_cursor,
+        *(f"{product.id}:{product.version}" for product in page.items),
+    )
+    return conditional_response(request, etag, {
+        "items": [serialize(product, selected) for product in page.items],
+        "next_cursor": page.next_cursor,
+    })
+
+
+@router.get("/products/{product_id}")
+async def api_product(
+    request: Request,
+    product_id: int,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Один товар (JSON)"""
+    selected = parse_fields(fields)
+    if selected is None:
+        return unknown_fields_response()
+
+    stmt = select(Product).options(load_fields(selected)).where(Product.id == product_id)
+    product = (await db.execute(stmt)).scalar_one_or_none()
+    if product is None:
+        return ORJSONResponse({"detail": "Товар не знайдено"}, status_code=404)
+
+    etag = make_etag("product", product.id, product.version, ",".join(selected))
+    return conditional_response(request, etag, serialize(product, selected))
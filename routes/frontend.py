@@ -5,13 +5,16 @@ from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from routes.auth import get_current_user_from_cookies
-from settings import get_db
+from settings import get_read_db
+from tools import images
+from tools.popularity import popularity_feed
 
 templates = Jinja2Templates(directory="templates")
+images.install(templates)
 router = APIRouter(include_in_schema=False)
 
 @router.get("/")
-async def home(request: Request, error: str | None = None, db: AsyncSession = Depends(get_db)):
+async def home(request: Request, error: str | None = None, db: AsyncSession = Depends(get_read_db)):
     # Отримуємо поточного користувача з cookies
     current_user = await get_current_user_from_cookies(request, db)
     
@@ -23,13 +26,14 @@ async def home(request: Request, error: str | None = None, db: AsyncSession = De
             "current_user": current_user,
             "is_authenticated": current_user is not None,
             "now": datetime.now(),
-            "popular_products": []  # Тимчасово пустий список
+            # Рейтинг з пам'яті воркера, оновлюється фоновою задачею
+            "popular_products": popularity_feed.products
         }
     )
 
 
 @router.get("/{full_path:path}")
-async def catch_all(request: Request, full_path: str, db: AsyncSession = Depends(get_db)):
+async def catch_all(request: Request, full_path: str, db: AsyncSession = Depends(get_read_db)):
     protected_paths = ["api/", "auth/", "account/", "admin/"]
     for path in protected_paths:
         if full_path.startswith(path):
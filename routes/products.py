@@ -3,19 +3,88 @@ from typing import List
 from fastapi import APIRouter, Depends, Query, Request, HTTPException, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy import select
+from starlette.datastructures import URL
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import raiseload, selectinload
 
 from models.models import Product, ProductCategory, Order, OrderItem, OrderStatus
-from settings import get_db
+from settings import get_db, get_read_db, read_session
 from routes.auth import get_current_user_from_cookies
+from tools.facets import facet_index
+from tools.page_cache import page_cache
+from tools.catalog import catalog_filters, catalog_page, filter_params, price_param
+from tools.pagination import decode_cursor, paginate
+from tools import idempotency, images, recommendations
+from tools.cart_store import cart_store
+from tools.idempotency import idempotency_store
+from tools.popularity import popularity_feed
+from tools.search import search_ids_select
+from tools.stock import decrement_stock, stock_reservations
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
-
-# Простая корзина в памяти (для демо)
-cart_store = {}
+images.install(templates)
+idempotency.install(templates)
+
+async def render_catalog(request: Request, filters: dict, cursor, is_authenticated: bool):
+    """Рендер страницы каталога в собственной сессии (используется и для фонового обновления кэша)"""
+
+    # Фильтры, поиск и keyset-пагинация общие с JSON API (tools.catalog)
+    async with read_session() as db:
+        page, highlights = await catalog_page(db, filters, cursor)
+
+        # Фасеты из индекса в памяти; при поиске нужны только id найденных товаров
+        facets = None
+        if await facet_index.ensure_loaded():
+            ids = None
+            ids_stmt = search_ids_select(filters["search"])
+            if ids_stmt is not None:
+                ids = (await db.execute(ids_stmt)).scalars().all()
+            facets = {
+                # Счетчики категорий учитывают все фильтры, кроме самой категории,
+                # гистограмма цен — все, кроме цены
+                "categories": facet_index.category_counts(filters["min_price"], filters["max_price"], ids),
+                "prices": facet_index.price_histogram(filters["category"], ids),
+            }
+    products = page.items
+
+    # Ссылки пагинации строятся из нормализованных фильтров, а не из исходного URL
+    params = filter_params(filters)
+    if page.cursor:
+        params["cursor"] = page.cursor
+
+    # Ссылки диапазонов гистограммы: текущие фильтры с новыми границами цены
+    if facets is not None:
+        base_url = URL("/products").include_query_params(**{
+            name: value for name, value in params.items() if name in ("category", "search")
+        })
+        for bucket in facets["prices"]:
+            bounds = {"min_price": price_param(bucket["min"])}
+            if bucket["max"] is not None:
+                # Фильтр max_price включительный, диапазон гистограммы — нет
+                bounds["max_price"] = price_param(bucket["max"] - 0.01)
+            bucket["url"] = str(base_url.include_query_params(**bounds))
+
+    body = templates.get_template("products/catalog.html").render({
+        "request": request,
+        "is_authenticated": is_authenticated,
+        "products": products,
+        "categories": list(ProductCategory),
+        "selected_category": params.get("category"),
+        "search_query": params.get("search"),
+        "highlights": highlights,
+        "facets": facets,
+        "page": page,
+        "page_url": URL("/products").include_query_params(**params),
+        "min_price": params.get("min_price"),
+        "max_price": params.get("max_price"),
+        "now": datetime.now()
+    })
+
+    # Страница сбрасывается при изменении любого товара на ней или каталога целиком
+    tags = {"catalog", *(f"product:{product.id}" for product in products)}
+    return body.encode(), tags
 
 
 @router.get("/products", response_class=HTMLResponse)
@@ -25,76 +94,33 @@ async def products_page(
         min_price: str = Query(None),
         max_price: str = Query(None),
         search: str = Query(None),
-        db: AsyncSession = Depends(get_db)
+        cursor: str = Query(None),
+        db: AsyncSession = Depends(get_read_db)
 ):
     """Страница каталога товаров"""
 
     # Получаем текущего пользователя для шаблона
     current_user = await get_current_user_from_cookies(request, db)
+    is_authenticated = current_user is not None
 
-    # Базовый запрос
-    stmt = select(Product)
-
-    # Применяем фильтры
-    if category and category != "None":
-        # Преобразуем строку в Enum значение
-        try:
-            category_enum = ProductCategory(category)
-            stmt = stmt.where(Product.category == category_enum)
-        except ValueError:
-            # Если категория не найдена, игнорируем фильтр
-            pass
-
-    # Преобразуем цену из строки в float
-    min_price_float = None
-    max_price_float = None
-
-    if min_price and min_price != "None":
-        try:
-            min_price_float = float(min_price)
-            stmt = stmt.where(Product.price >= min_price_float)
-        except ValueError:
-            pass
-
-    if max_price and max_price != "None":
-        try:
-            max_price_float = float(max_price)
-            stmt = stmt.where(Product.price <= max_price_float)
-        except ValueError:
-            pass
-
-    if search and search != "None":
-        stmt = stmt.where(
-            Product.name.ilike(f"%{search}%") |
-            Product.description.ilike(f"%{search}%")
-        )
+    filters = catalog_filters(category, min_price, max_price, search)
+    # Битый курсор означает первую страницу и не должен плодить записи в кэше
+    if decode_cursor(cursor, 2) is None:
+        cursor = None
 
-    # Выполняем запрос
-    result = await db.execute(stmt)
-    products = result.scalars().all()
-
-    return templates.TemplateResponse(
-        "products/catalog.html",
-        {
-            "request": request,
-            "current_user": current_user,
-            "is_authenticated": current_user is not None,
-            "products": products,
-            "categories": list(ProductCategory),
-            "selected_category": category,
-            "search_query": search,
-            "min_price": min_price,
-            "max_price": max_price,
-            "now": datetime.now()
-        }
+    # Страница зависит от пользователя только через кнопку "Кабинет"/"Войти"
+    key = ("catalog", "auth" if is_authenticated else "anon", *filters.values(), cursor)
+    body, state = await page_cache.get_or_render(
+        key, lambda: render_catalog(request, filters, cursor, is_authenticated)
     )
+    return HTMLResponse(body, headers={"X-Cache": state})
 
 
 @router.get("/product/{product_id}", response_class=HTMLResponse)
 async def product_detail(
         request: Request,
         product_id: int,
-        db: AsyncSession = Depends(get_db)
+        db: AsyncSession = Depends(get_read_db)
 ):
     """Страница деталей товара"""
 
@@ -118,14 +144,13 @@ async def product_detail(
             status_code=404
         )
 
-    # Находим похожие товары
-    similar_stmt = select(Product).where(
-        Product.category == product.category,
-        Product.id != product.id
-    ).limit(4)
+    popularity_feed.record_view(product.id)
 
-    similar_result = await db.execute(similar_stmt)
-    similar_products = similar_result.scalars().all()
+    # Доступно = залишок мінус живі утримання інших покупців (один агрегат по індексу)
+    available = await stock_reservations.available(db, product, current_user["id"] if current_user else None)
+
+    # Похожие товары: чаще всего покупаемые вместе, остальные — из той же категории
+    similar_products = await recommendations.similar_products(db, product)
 
     return templates.TemplateResponse(
         "products/detail.html",
@@ -134,6 +159,7 @@ async def product_detail(
             "current_user": current_user,
             "is_authenticated": current_user is not None,
             "product": product,
+            "available": available,
             "similar_products": similar_products,
             "now": datetime.now()
         }
@@ -148,8 +174,6 @@ async def add_to_cart(
         db: AsyncSession = Depends(get_db)
 ):
     """Добавить товар в корзину"""
-    from routes.auth import get_current_user_from_cookies
-
     user_data = await get_current_user_from_cookies(request, db)
 
     if not user_data:
@@ -163,36 +187,21 @@ async def add_to_cart(
     if not product:
         return RedirectResponse(url="/products", status_code=303)
 
-    # Проверяем наличие на складе
-    if product.stock_quantity < quantity:
+    # Удерживаем всё количество товара в корзине с учетом чужих удержаний
+    in_cart = sum(
+        item["quantity"] for item in await cart_store.items(user_data["id"])
+        if item["product_id"] == product_id
+    )
+    if quantity < 1 or await stock_reservations.hold(db, user_data["id"], {product_id: in_cart + quantity}):
+        await db.rollback()
         return RedirectResponse(
             url=f"/product/{product_id}?error=Недостатня+кількість+на+складі",
             status_code=303
         )
+    await db.commit()
 
-    # Простая логика корзины (в памяти)
-    user_id = str(user_data["id"])
-    if user_id not in cart_store:
-        cart_store[user_id] = []
-
-    # Проверяем, есть ли уже такой товар в корзине
-    found = False
-    for item in cart_store[user_id]:
-        if item["product_id"] == product_id:
-            item["quantity"] += quantity
-            found = True
-            break
-
-    # Если товара нет в корзине, добавляем
-    if not found:
-        cart_store[user_id].append({
-            "product_id": product_id,
-            "name": product.name,
-            "price": float(product.price),
-            "quantity": quantity,
-            "image_url": product.image_url,
-            "stock_quantity": product.stock_quantity
-        })
+    # Корзина в общем хранилище (CART_BACKEND): если товар уже есть, количество суммируется
+    await cart_store.add(user_data["id"], product, quantity)
 
     return RedirectResponse(
         url=f"/product/{product_id}?message=Товар+додано+до+кошика",
@@ -206,18 +215,13 @@ async def view_cart(
         db: AsyncSession = Depends(get_db)
 ):
     """Просмотр корзины"""
-    from routes.auth import get_current_user_from_cookies
-
     user_data = await get_current_user_from_cookies(request, db)
 
     if not user_data:
         return RedirectResponse(url="/auth/login", status_code=303)
 
-    user_id = str(user_data["id"])
-    cart_items = cart_store.get(user_id, [])
-
-    # Рассчитываем общую сумму
-    total = sum(item["price"] * item["quantity"] for item in cart_items)
+    cart_items = await cart_store.items(user_data["id"])
+    total = await cart_store.total(user_data["id"])
 
     return templates.TemplateResponse(
         "cart.html",
@@ -239,21 +243,14 @@ async def remove_from_cart(
         db: AsyncSession = Depends(get_db)
 ):
     """Удалить товар из корзины"""
-    from routes.auth import get_current_user_from_cookies
-
     user_data = await get_current_user_from_cookies(request, db)
 
     if not user_data:
         return RedirectResponse(url="/auth/login", status_code=303)
 
-    user_id = str(user_data["id"])
-
-    if user_id in cart_store:
-        # Удаляем товар из корзины
-        cart_store[user_id] = [
-            item for item in cart_store[user_id]
-            if item["product_id"] != product_id
-        ]
+    await cart_store.remove(user_data["id"], product_id)
+    await stock_reservations.release(db, user_data["id"], [product_id])
+    await db.commit()
 
     return RedirectResponse(url="/cart", status_code=303)
 
@@ -264,17 +261,14 @@ async def clear_cart(
         db: AsyncSession = Depends(get_db)
 ):
     """Очистить корзину"""
-    from routes.auth import get_current_user_from_cookies
-
     user_data = await get_current_user_from_cookies(request, db)
 
     if not user_data:
         return RedirectResponse(url="/auth/login", status_code=303)
 
-    user_id = str(user_data["id"])
-
-    if user_id in cart_store:
-        cart_store[user_id] = []
+    await cart_store.clear(user_data["id"])
+    await stock_reservations.release(db, user_data["id"])
+    await db.commit()
 
     return RedirectResponse(url="/cart", status_code=303)
 
@@ -285,28 +279,29 @@ async def checkout_page(
         db: AsyncSession = Depends(get_db)
 ):
     """Страница оформления заказа"""
-    from routes.auth import get_current_user_from_cookies
-
     user_data = await get_current_user_from_cookies(request, db)
 
     if not user_data:
         return RedirectResponse(url="/auth/login", status_code=303)
 
-    user_id = str(user_data["id"])
-    cart_items = cart_store.get(user_id, [])
+    cart_items = await cart_store.items(user_data["id"])
 
     if not cart_items:
         return RedirectResponse(url="/cart", status_code=303)
 
-    # Проверяем наличие товаров на складе
-    for item in cart_items:
-        if item["stock_quantity"] < item["quantity"]:
-            return RedirectResponse(
-                url=f"/cart?error=Товар+{item['name']}+недоступний+в+потрібній+кількості",
-                status_code=303
-            )
+    # Продлеваем удержания на время оформления; истекшие удерживаются заново, если товар еще есть
+    quantities = {item["product_id"]: item["quantity"] for item in cart_items}
+    unavailable = await stock_reservations.hold(db, user_data["id"], quantities)
+    if unavailable:
+        await db.rollback()
+        name = next(item["name"] for item in cart_items if item["product_id"] in unavailable)
+        return RedirectResponse(
+            url=f"/cart?error=Товар+{name}+недоступний+в+потрібній+кількості",
+            status_code=303
+        )
+    await db.commit()
 
-    total = sum(item["price"] * item["quantity"] for item in cart_items)
+    total = await cart_store.total(user_data["id"])
 
     return templates.TemplateResponse(
         "checkout.html",
@@ -331,26 +326,32 @@ async def process_checkout(
         db: AsyncSession = Depends(get_db)
 ):
     """Обработка оформления заказа"""
-    from routes.auth import get_current_user_from_cookies
-
     user_data = await get_current_user_from_cookies(request, db)
 
     if not user_data:
         return RedirectResponse(url="/auth/login", status_code=303)
 
-    user_id = str(user_data["id"])
-    cart_items = cart_store.get(user_id, [])
+    # Повторная отправка формы (двойной клик, ретрай браузера) получает уже созданный заказ
+    key = await idempotency_store.key(request, "checkout", user_data["id"])
+    replay = await idempotency_store.replay(db, key)
+    if replay is not None:
+        return replay
+
+    cart_items = await cart_store.items(user_data["id"])
 
     if not cart_items:
         return RedirectResponse(url="/cart", status_code=303)
 
-    # Проверяем наличие товаров на складе
-    for item in cart_items:
-        stmt = select(Product).where(Product.id == item["product_id"])
-        result = await db.execute(stmt)
-        product = result.scalar_one()
+    # Все товары корзины одним запросом
+    quantities = {item["product_id"]: item["quantity"] for item in cart_items}
+    result = await db.execute(select(Product).where(Product.id.in_(quantities)))
+    products = {product.id: product for product in result.scalars()}
+    reserved = await stock_reservations.reserved(db, quantities, exclude_user=user_data["id"])
 
-        if product.stock_quantity < item["quantity"]:
+    # Предварительная проверка наличия без чужих удержаний (окончательная — условным UPDATE ниже)
+    for item in cart_items:
+        product = products.get(item["product_id"])
+        if product is None or product.stock_quantity - reserved.get(product.id, 0) < item["quantity"]:
             return RedirectResponse(
                 url=f"/cart?error=Товар+{item['name']}+недоступний+в+потрібній+кількості",
                 status_code=303
@@ -359,7 +360,22 @@ async def process_checkout(
     # Рассчитываем общую сумму
     total = sum(item["price"] * item["quantity"] for item in cart_items)
 
-    # Создаем заказ в БД
+    # Всё ниже — одна транзакция: ключ идемпотентности, списание, заказ, позиции,
+    # рекомендации, снятие удержаний. Параллельный дубль ждет здесь и получает ответ первого
+    replay = await idempotency_store.claim(db, key)
+    if replay is not None:
+        return replay
+
+    unavailable = await decrement_stock(db, quantities, holder=user_data["id"])
+    if unavailable:
+        # Товар успели купить параллельно
+        await db.rollback()
+        name = next(item["name"] for item in cart_items if item["product_id"] in unavailable)
+        return RedirectResponse(
+            url=f"/cart?error=Товар+{name}+недоступний+в+потрібній+кількості",
+            status_code=303
+        )
+
     new_order = Order(
         user_id=user_data["id"],
         total_amount=total,
@@ -369,38 +385,38 @@ async def process_checkout(
         shipping_address=shipping_address,
         notes=notes
     )
-
     db.add(new_order)
-    await db.commit()
-    await db.refresh(new_order)
-
-    # Добавляем товары в заказ
-    for cart_item in cart_items:
-        order_item = OrderItem(
-            order_id=new_order.id,
-            product_id=cart_item["product_id"],
-            quantity=cart_item["quantity"],
-            price=cart_item["price"]
-        )
-        db.add(order_item)
 
-    # Обновляем количество товаров на складе
-    for cart_item in cart_items:
-        stmt = select(Product).where(Product.id == cart_item["product_id"])
-        result = await db.execute(stmt)
-        product = result.scalar_one()
-        product.stock_quantity = max(0, product.stock_quantity - cart_item["quantity"])
+    # Пары "покупали вместе" обновляются в той же транзакции, что и заказ
+    await recommendations.record_order(db, quantities)
+    await stock_reservations.release(db, user_data["id"])
+
+    # Id заказа нужен для позиций и для ответа, который сохраняется в той же транзакции
+    await db.flush()
+
+    # Позиции — одна вставка пачкой (executemany), без RETURNING на каждую строку
+    await db.execute(insert(OrderItem), [
+        {
+            "order_id": new_order.id,
+            "product_id": cart_item["product_id"],
+            "quantity": cart_item["quantity"],
+            "price": cart_item["price"]
+        }
+        for cart_item in cart_items
+    ])
+    response = RedirectResponse(
+        url=f"/order/confirmation/{new_order.id}",
+        status_code=303
+    )
+    await idempotency_store.remember(db, key, response)
 
     await db.commit()
 
     # Очищаем корзину
-    cart_store[user_id] = []
+    await cart_store.clear(user_data["id"])
 
     # Перенаправляем на страницу подтверждения
-    return RedirectResponse(
-        url=f"/order/confirmation/{new_order.id}",
-        status_code=303
-    )
+    return response
 
 
 @router.get("/order/confirmation/{order_id}", response_class=HTMLResponse)
@@ -410,8 +426,6 @@ async def order_confirmation(
         db: AsyncSession = Depends(get_db)
 ):
     """Страница подтверждения заказа"""
-    from routes.auth import get_current_user_from_cookies
-
     user_data = await get_current_user_from_cookies(request, db)
 
     if not user_data:
@@ -445,32 +459,32 @@ async def order_confirmation(
 @router.get("/orders", response_class=HTMLResponse)
 async def user_orders(
         request: Request,
+        cursor: str = Query(None),
         db: AsyncSession = Depends(get_db)
 ):
     """Страница заказов пользователя"""
-    from routes.auth import get_current_user_from_cookies
-
     user_data = await get_current_user_from_cookies(request, db)
 
     if not user_data:
         return RedirectResponse(url="/auth/login", status_code=303)
 
-    # Получаем заказы пользователя
+    # Получаем заказы пользователя постранично (позиции в списке не нужны)
     stmt = select(Order).where(
         Order.user_id == user_data["id"]
-    ).options(
-        selectinload(Order.items).selectinload(OrderItem.product)
-    ).order_by(Order.created_at.desc())
+    ).options(raiseload("*"))
 
-    result = await db.execute(stmt)
-    orders = result.scalars().all()
+    page = await paginate(
+        db, stmt, (Order.created_at, Order.id), cursor,
+        key=lambda order: (order.created_at, order.id),
+    )
 
     return templates.TemplateResponse(
         "user_orders.html",
         {
             "request": request,
             "current_user": user_data,
-            "orders": orders,
+            "orders": page.items,
+            "page": page,
             "now": datetime.now()
         }
     )
@@ -483,8 +497,6 @@ async def order_detail(
         db: AsyncSession = Depends(get_db)
 ):
     """Детали заказа"""
-    from routes.auth import get_current_user_from_cookies
-
     user_data = await get_current_user_from_cookies(request, db)
 
     if not user_data:
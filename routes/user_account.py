@@ -5,14 +5,20 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.models import RepairRequest, User, Notification, Order, OrderStatus
-from routes.auth import get_current_user, require_admin
+from routes.auth import get_current_user, get_current_user_from_cookies, require_admin
 from settings import get_db
 from datetime import datetime
-from tools.file_upload import generate_file_url, save_file
+from typing import Optional
+from tools import idempotency
+from tools.file_upload import save_file
+from tools.idempotency import idempotency_store
+from tools.images import image_derivatives
+from tools.pagination import paginate
 
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
+idempotency.install(templates)
 
 
 """
@@ -34,7 +40,6 @@ async def dashboard_page(
 ):
     """Страница кабинета пользователя (HTML)"""
     # Получаем текущего пользователя
-    from routes.auth import get_current_user_from_cookies
     user_data = await get_current_user_from_cookies(request, db)
     
     if not user_data:
@@ -79,24 +84,26 @@ async def dashboard_page(
 @router.get("/notifications", response_class=HTMLResponse)
 async def user_notifications(
     request: Request,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
     """Страница уведомлений пользователя"""
-    from routes.auth import get_current_user_from_cookies
     user_data = await get_current_user_from_cookies(request, db)
     
     if not user_data:
         return RedirectResponse(url="/auth/login", status_code=303)
     
-    # Получить все уведомления
+    # Получить уведомления постранично
     stmt = select(Notification)\
-        .where(Notification.user_id == user_data["id"])\
-        .order_by(Notification.created_at.desc())
+        .where(Notification.user_id == user_data["id"])
     
-    result = await db.execute(stmt)
-    notifications = result.scalars().all()
+    page = await paginate(
+        db, stmt, (Notification.created_at, Notification.id), cursor,
+        key=lambda notification: (notification.created_at, notification.id),
+    )
+    notifications = page.items
     
-    # Отметить все как прочитанные
+    # Отметить показанные как прочитанные
     for notification in notifications:
         if not notification.is_read:
             notification.is_read = True
@@ -109,6 +116,7 @@ async def user_notifications(
             "request": request,
             "user": user_data,
             "notifications": notifications,
+            "page": page,
             "now": datetime.now()
         }
     )
@@ -121,7 +129,6 @@ async def mark_notification_read(
     db: AsyncSession = Depends(get_db)
 ):
     """Пометить уведомление как прочитанное"""
-    from routes.auth import get_current_user_from_cookies
     user_data = await get_current_user_from_cookies(request, db)
     
     if not user_data:
@@ -152,7 +159,6 @@ async def mark_all_notifications_read(
     db: AsyncSession = Depends(get_db)
 ):
     """Пометить все уведомления как прочитанные"""
-    from routes.auth import get_current_user_from_cookies
     user_data = await get_current_user_from_cookies(request, db)
     
     if not user_data:
@@ -183,7 +189,6 @@ async def user_me_data(
     db: AsyncSession = Depends(get_db),
 ):
     """API endpoint для получения данных пользователя (JSON)"""
-    from routes.auth import get_current_user_from_cookies
     user_data = await get_current_user_from_cookies(request, db)
     
     if not user_data:
@@ -199,7 +204,6 @@ async def user_repairs_page(
     db: AsyncSession = Depends(get_db)
 ):
     """Страница с заявками пользователя"""
-    from routes.auth import get_current_user_from_cookies
     user_data = await get_current_user_from_cookies(request, db)
     
     if not user_data:
@@ -227,7 +231,6 @@ async def add_repair_page(
     db: AsyncSession = Depends(get_db)
 ):
     """Страница создания заявки"""
-    from routes.auth import get_current_user_from_cookies
     user_data = await get_current_user_from_cookies(request, db)
     
     if not user_data:
@@ -253,7 +256,6 @@ async def create_repair_request(
     required_time: datetime = Form(None)
 ):
     """Создание новой заявки"""
-    from routes.auth import get_current_user_from_cookies
     user_data = await get_current_user_from_cookies(request, db)
     
     if not user_data:
@@ -261,11 +263,25 @@ async def create_repair_request(
     
     user_id = user_data["id"]
     image_url = None
+
+    # Повторная отправка формы возвращает ответ первой, не создавая вторую заявку
+    key = await idempotency_store.key(request, "repair_request", user_id)
+    replay = await idempotency_store.replay(db, key)
+    if replay is not None:
+        return replay
     
-    if image:
-        from tools.file_upload import generate_repair_file_url
-        image_url = await generate_repair_file_url(image.filename)
-        bgt.add_task(save_file, image, image_url)
+    if image is not None and image.filename:
+        # Файл записывается на диск (с fsync) до коммита заявки
+        image_url = await save_file(image)
+
+    # Ключ занимается после загрузки файла: запись в БД не ждет диска.
+    # Файл дубля совпадает по хешу с файлом первой заявки
+    replay = await idempotency_store.claim(db, key)
+    if replay is not None:
+        return replay
+
+    if image_url:
+        bgt.add_task(image_derivatives.generate_async, image_url)
 
     new_req = RepairRequest(
         user_id=int(user_id),
@@ -275,11 +291,14 @@ async def create_repair_request(
     )
 
     db.add(new_req)
+
+    # Перенаправляем на страницу заявок
+    response = RedirectResponse(url="/account/repairs", status_code=303)
+    await idempotency_store.remember(db, key, response)
     await db.commit()
     await db.refresh(new_req)
-    
-    # Перенаправляем на страницу заявок
-    return RedirectResponse(url="/account/repairs", status_code=303)
+
+    return response
 
 
 @router.get("/repair/{repair_id}", response_class=HTMLResponse)
@@ -289,7 +308,6 @@ async def get_repair_request(
     db: AsyncSession = Depends(get_db)
 ):
     """Просмотр конкретной заявки"""
-    from routes.auth import get_current_user_from_cookies
     user_data = await get_current_user_from_cookies(request, db)
     
     if not user_data:
@@ -325,7 +343,6 @@ async def update_repair_request(
     db: AsyncSession = Depends(get_db)
 ):
     """Обновление заявки"""
-    from routes.auth import get_current_user_from_cookies
     user_data = await get_current_user_from_cookies(request, db)
     
     if not user_data:
@@ -341,7 +358,6 @@ async def delete_repair_request(
     db: AsyncSession = Depends(get_db)
 ):
     """Удаление заявки"""
-    from routes.auth import get_current_user_from_cookies
     user_data = await get_current_user_from_cookies(request, db)
     
     if not user_data:
@@ -357,7 +373,6 @@ async def user_orders_page(
     db: AsyncSession = Depends(get_db)
 ):
     """Страница с заказами пользователя"""
-    from routes.auth import get_current_user_from_cookies
     user_data = await get_current_user_from_cookies(request, db)
     
     if not user_data:
@@ -386,7 +401,6 @@ async def delete_order(
     db: AsyncSession = Depends(get_db)
 ):
     """Удаление заказа"""
-    from routes.auth import get_current_user_from_cookies
     user_data = await get_current_user_from_cookies(request, db)
     
     if not user_data:
@@ -418,7 +432,6 @@ async def get_order(
     db: AsyncSession = Depends(get_db)
 ):
     """Просмотр конкретного заказа"""
-    from routes.auth import get_current_user_from_cookies
     user_data = await get_current_user_from_cookies(request, db)
     
     if not user_data:
@@ -446,7 +459,6 @@ async def update_order(
     db: AsyncSession = Depends(get_db)
 ):
     """Обновление заказа"""
-    from routes.auth import get_current_user_from_cookies
     user_data = await get_current_user_from_cookies(request, db)
     
     if not user_data:
@@ -0,0 +1,158 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Налаштування читаються під час імпорту settings, тому окрема база задається до нього
+ROOT = Path(__file__).resolve().parent.parent
+TMP_DIR = Path(tempfile.mkdtemp(prefix="repairhub-tests-"))
+DB_PATH = TMP_DIR / "test.db"
+TEMPLATE_PATH = TMP_DIR / "template.db"
+os.environ["DATABASE_NAME"] = str(DB_PATH)
+os.environ["DATABASE_URL"] = ""
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["CART_BACKEND"] = "db"
+os.environ["SQLITE_SINGLE_WRITER"] = "false"
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from werkzeug.security import generate_password_hash
+
+sys.path.insert(0, str(ROOT))
+
+from models.models import (
+    Notification,
+    NotificationType,
+    Order,
+    OrderItem,
+    Product,
+    ProductCategory,
+    RepairRequest,
+    User,
+)
+from settings import api_config, async_engine, dispose_engines
+from tools.auth import create_access_token
+
+USERS = {
+    "admin": {"id": 1, "email": "admin@example.com", "password": "admin123", "is_admin": True},
+    "user": {"id": 2, "email": "user@example.com", "password": "user123", "is_admin": False},
+}
+
+
+def _build_template() -> None:
+    """Схема з міграцій (разом з FTS-тригерами та індексами) і невеликий набір даних"""
+    env = dict(os.environ, DATABASE_NAME=str(TEMPLATE_PATH))
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=ROOT, env=env, check=True, capture_output=True,
+    )
+
+    engine = create_engine(f"sqlite:///{TEMPLATE_PATH}")
+    with Session(engine) as session:
+        for username, user in USERS.items():
+            session.add(User(
+                id=user["id"], username=username, email=user["email"], is_admin=user["is_admin"],
+                password=generate_password_hash(user["password"], api_config.PASSWORD_HASH_METHOD),
+            ))
+        categories = list(ProductCategory)
+        for number in range(1, 9):
+            session.add(Product(
+                id=number, name=f"Товар {number}", description=f"Опис товару {number}",
+                price=100.0 * number, category=categories[number % len(categories)],
+                stock_quantity=10,
+            ))
+        session.flush()
+
+        order = Order(
+            user_id=2, total_amount=300.0, customer_name="Покупець", customer_phone="0500000000",
+            customer_email="user@example.com", shipping_address="Київ",
+            items=[OrderItem(product_id=1, quantity=1, price=100.0), OrderItem(product_id=2, quantity=1, price=200.0)],
+        )
+        repair = RepairRequest(user_id=2, description="Не вмикається", admin_id=1)
+        session.add_all([order, repair])
+        session.flush()
+        session.add(Notification(
+            user_id=2, notification_type=NotificationType.ORDER_UPDATE,
+            title="Замовлення", message="Замовлення прийнято", order_id=order.id,
+        ))
+        session.commit()
+    engine.dispose()
+
+
+def pytest_sessionstart(session) -> None:
+    _build_template()
+
+
+def pytest_sessionfinish(session, exitstatus) -> None:
+    from tools.passwords import password_hasher
+
+    password_hasher.shutdown()
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+async def _reset_state() -> None:
+    """Кеші процесу під нову копію бази; фасети будуються, як при старті lifespan"""
+    from tools.facets import facet_index
+    from tools.identity_cache import identity_cache
+    from tools.page_cache import page_cache
+
+    identity_cache.clear()
+    page_cache.clear()
+    await facet_index.rebuild()
+
+
+@pytest.fixture
+async def engine():
+    """Рушій застосунку (aiosqlite) над свіжою копією тестової бази"""
+    await dispose_engines()
+    for suffix in ("-wal", "-shm"):
+        Path(f"{DB_PATH}{suffix}").unlink(missing_ok=True)
+    shutil.copyfile(TEMPLATE_PATH, DB_PATH)
+    await _reset_state()
+    yield async_engine
+    await dispose_engines()
+
+
+@pytest.fixture
+async def client(engine):
+    """HTTP-клієнт до застосунку без lifespan (фонові завдання не запускаються)"""
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+def token_for(username: str, user_id: int | None = None, is_admin: bool | None = None) -> str:
+    """Підписаний access_token, як після входу"""
+    user = USERS.get(username, {})
+    user_id = user_id or user["id"]
+    return create_access_token({
+        "sub": str(user_id),
+        "username": username,
+        "email": user.get("email", f"{username}@example.com"),
+        "is_admin": user.get("is_admin", False) if is_admin is None else is_admin,
+    })
+
+
+def login(client: httpx.AsyncClient, username: str, **kwargs) -> httpx.AsyncClient:
+    client.cookies.set("access_token", token_for(username, **kwargs))
+    return client
+
+
+@pytest.fixture
+def statements(engine):
+    """SQL-запити, виконані рушієм застосунку під час тесту (без PRAGMA з'єднання)"""
+    executed: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith("PRAGMA"):
+            executed.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
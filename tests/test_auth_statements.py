@@ -0,0 +1,75 @@
+"""Кількість SQL-запитів на шляхах автентифікації та списку користувачів"""
+from models.models import RepairRequest, User
+from routes.auth import authenticate_user
+from settings import async_session
+from tests.conftest import login, token_for
+from tools.auth import resolve_user
+
+
+def _touched_tables(statements: list[str]) -> str:
+    return " ".join(statements).lower()
+
+
+async def test_resolve_user_reads_identity_columns_once(statements):
+    user = await resolve_user(token_for("user"))
+
+    assert user == {"id": 2, "username": "user", "email": "user@example.com", "is_admin": False}
+    # Одна проєкція колонок users, без selectin-каскаду repair_requests/notifications
+    assert len(statements) == 1
+    assert "repair_requests" not in _touched_tables(statements)
+    assert "notifications" not in _touched_tables(statements)
+
+
+async def test_resolve_user_cache_hit_emits_no_statements(statements):
+    await resolve_user(token_for("user"))
+    statements.clear()
+
+    assert await resolve_user(token_for("user")) is not None
+    assert statements == []
+
+
+async def test_authenticate_user_emits_single_select(statements):
+    async with async_session() as db:
+        user = await authenticate_user("user", "user123", db)
+
+    assert user is not None and user.id == 2
+    assert len(statements) == 1
+    assert "repair_requests" not in _touched_tables(statements)
+
+
+async def test_login_form_emits_single_select(client, statements):
+    response = await client.post("/auth/login", data={"username": "user@example.com", "password": "user123"})
+
+    assert response.status_code == 303
+    assert len(statements) == 1
+
+
+async def test_authenticated_page_resolves_user_once(client, statements):
+    login(client, "user")
+    response = await client.get("/auth/login")
+
+    assert response.status_code == 200
+    # Middleware визначає користувача один раз; сторінка входу БД більше не читає
+    assert len(statements) == 1
+
+
+async def test_admin_users_list_statement_count_does_not_grow_with_users(client, statements):
+    login(client, "admin")
+    assert (await client.get("/admin/users")).status_code == 200
+    baseline = len(statements)
+
+    async with async_session() as db:
+        for number in range(20):
+            user = User(username=f"extra{number}", email=f"extra{number}@example.com", password="x")
+            user.repair_requests = [RepairRequest(description="Ремонт"), RepairRequest(description="Ремонт")]
+            db.add(user)
+        await db.commit()
+
+    statements.clear()
+    response = await client.get("/admin/users")
+
+    assert response.status_code == 200
+    assert "extra19" in response.text
+    # Кількість заявок — підзапит у тому ж SELECT; кеш ідентичності прибирає запит користувача
+    assert len(statements) <= baseline
+    assert not any(statement.lstrip().upper().startswith("SELECT repair_requests") for statement in statements)
@@ -0,0 +1,130 @@
+"""Бекенди кошика: сума ведеться разом з рядками кошика"""
+import asyncio
+import datetime as dt
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy import update
+
+from models.models import Cart, CartTotal, Product
+from settings import async_session
+from tools.cart_store import CartStore, DatabaseCartStore, MemoryCartStore, RedisCartStore
+
+
+def _redis_store(ttl: int) -> RedisCartStore:
+    store = RedisCartStore(ttl, "redis://fake", "repairhub:test:cart:")
+    store._client = FakeRedis(decode_responses=True)
+    return store
+
+
+@pytest.fixture(params=["db", "memory", "redis"])
+async def store(request, engine):
+    if request.param == "db":
+        store = DatabaseCartStore(ttl=3600)
+    elif request.param == "memory":
+        store = MemoryCartStore(ttl=3600)
+    else:
+        store = _redis_store(ttl=3600)
+    yield store
+    await store.close()
+
+
+async def _product(product_id: int) -> Product:
+    async with async_session() as db:
+        return await db.get(Product, product_id)
+
+
+def test_cart_store_is_abstract():
+    with pytest.raises(TypeError):
+        CartStore(ttl=60)
+
+
+async def test_total_follows_add_remove_and_clear(store):
+    await store.add(2, await _product(1), 2)
+    await store.add(2, await _product(3), 1)
+    await store.add(2, await _product(1), 1)
+    assert await store.total(2) == 600.0
+
+    await store.remove(2, 1)
+    assert await store.total(2) == 300.0
+    assert [(item["product_id"], item["quantity"]) for item in await store.items(2)] == [(3, 1)]
+
+    await store.remove(2, 1)
+    assert await store.total(2) == 300.0
+
+    await store.clear(2)
+    assert await store.total(2) == 0.0
+    assert await store.items(2) == []
+
+
+async def test_total_keeps_price_at_add_time(store):
+    await store.add(2, await _product(2), 1)
+    async with async_session() as db:
+        await db.execute(update(Product).where(Product.id == 2).values(price=999.0))
+        await db.commit()
+    await store.add(2, await _product(2), 1)
+
+    items = await store.items(2)
+    assert [(item["price"], item["quantity"]) for item in items] == [(200.0, 2)]
+    assert await store.total(2) == 400.0
+    await store.remove(2, 2)
+    assert await store.total(2) == 0.0
+
+
+async def test_concurrent_changes_keep_total_in_sync(store):
+    products = {product_id: await _product(product_id) for product_id in (1, 2, 3)}
+
+    await asyncio.gather(*(
+        store.add(2, products[product_id], 1) for product_id in (1, 2, 3) for _ in range(5)
+    ))
+    assert await store.total(2) == 5 * (100.0 + 200.0 + 300.0)
+
+    await asyncio.gather(store.remove(2, 2), store.add(2, products[1], 2), store.add(2, products[3], 1))
+    items = await store.items(2)
+    assert {item["product_id"]: item["quantity"] for item in items} == {1: 7, 3: 6}
+    assert await store.total(2) == sum(item["price"] * item["quantity"] for item in items)
+
+
+async def test_redis_changes_refresh_ttl(engine):
+    store = _redis_store(ttl=3600)
+    keys = store._keys(2)
+    await store.add(2, await _product(1), 1)
+    await store.add(2, await _product(2), 1)
+    for key in keys:
+        await store.client.expire(key, 5)
+
+    await store.remove(2, 2)
+    assert [await store.client.ttl(key) for key in keys] == [3600] * 3
+    for key in keys:
+        await store.client.expire(key, 5)
+    await store.add(2, await _product(3), 1)
+    assert [await store.client.ttl(key) for key in keys] == [3600] * 3
+    assert await store.total(2) == 400.0
+    await store.close()
+
+
+async def test_database_total_is_a_single_primary_key_read(engine, statements):
+    store = DatabaseCartStore(ttl=3600)
+    await store.add(2, await _product(1), 1)
+    statements.clear()
+
+    assert await store.total(2) == 100.0
+    assert len(statements) == 1
+    assert "FROM cart_totals" in statements[0] and "JOIN" not in statements[0]
+
+
+async def test_expired_database_cart_starts_over(engine):
+    store = DatabaseCartStore(ttl=3600)
+    await store.add(2, await _product(1), 3)
+    expired = dt.datetime.now() - dt.timedelta(hours=2)
+    async with async_session() as db:
+        await db.execute(update(Cart).values(updated_at=expired))
+        await db.execute(update(CartTotal).values(updated_at=expired))
+        await db.commit()
+
+    assert await store.total(2) == 0.0
+    assert await store.items(2) == []
+
+    await store.add(2, await _product(2), 1)
+    assert await store.total(2) == 200.0
+    assert await store.purge_expired() == 0
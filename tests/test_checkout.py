@@ -0,0 +1,97 @@
+"""Оформлення замовлення: одна транзакція та умовне списання залишку"""
+import asyncio
+
+import httpx
+from sqlalchemy import func, select, update
+
+from models.models import Order, OrderItem, Product, User
+from settings import async_session
+from tests.conftest import login, token_for
+from tools.cart_store import cart_store
+
+CHECKOUT_FORM = {
+    "customer_name": "Покупець",
+    "customer_phone": "0500000000",
+    "customer_email": "buyer@example.com",
+    "shipping_address": "Київ",
+}
+
+
+async def _set_stock(product_id: int, quantity: int) -> None:
+    async with async_session() as db:
+        await db.execute(update(Product).where(Product.id == product_id).values(stock_quantity=quantity))
+        await db.commit()
+
+
+async def _fill_cart(user_id: int, quantities: dict[int, int]) -> None:
+    async with async_session() as db:
+        for product_id, quantity in quantities.items():
+            await cart_store.add(user_id, await db.get(Product, product_id), quantity)
+
+
+async def _sold(product_id: int) -> tuple[int, int]:
+    """(залишок, продано за позиціями замовлень)"""
+    async with async_session() as db:
+        stock = (await db.execute(select(Product.stock_quantity).where(Product.id == product_id))).scalar_one()
+        sold = (await db.execute(
+            select(func.coalesce(func.sum(OrderItem.quantity), 0)).where(OrderItem.product_id == product_id)
+        )).scalar_one()
+    return stock, sold
+
+
+async def test_concurrent_buyers_do_not_oversell(client):
+    buyers, stock = 12, 5
+    await _set_stock(3, stock)
+    async with async_session() as db:
+        users = [User(username=f"buyer{number}", email=f"buyer{number}@example.com", password="x") for number in range(buyers)]
+        db.add_all(users)
+        await db.commit()
+    for user in users:
+        await _fill_cart(user.id, {3: 1})
+
+    async def checkout(user: User) -> str:
+        cookies = {"access_token": token_for(user.username, user_id=user.id)}
+        async with httpx.AsyncClient(transport=client._transport, base_url="http://test", cookies=cookies) as buyer:
+            response = await buyer.post("/checkout", data=CHECKOUT_FORM)
+        assert response.status_code == 303
+        return response.headers["location"]
+
+    locations = await asyncio.gather(*(checkout(user) for user in users))
+
+    confirmed = [location for location in locations if location.startswith("/order/confirmation/")]
+    assert len(confirmed) == stock
+    assert all(location.startswith("/cart?error=") for location in locations if location not in confirmed)
+    assert await _sold(3) == (0, stock)
+
+
+async def test_failed_decrement_rolls_back_the_whole_order(client):
+    login(client, "user")
+    await _fill_cart(2, {4: 2, 5: 1})
+    # Товар розкупили після того, як він потрапив у кошик
+    await _set_stock(5, 0)
+
+    response = await client.post("/checkout", data=CHECKOUT_FORM)
+
+    assert response.status_code == 303
+    assert response.headers["location"].startswith("/cart?error=")
+    assert await _sold(4) == (10, 0)
+    async with async_session() as db:
+        assert (await db.execute(select(func.count(Order.id)))).scalar_one() == 1
+
+
+async def _checkout_statements(client, statements, user_id: int, quantities: dict[int, int]) -> int:
+    await _fill_cart(user_id, quantities)
+    statements.clear()
+    response = await client.post("/checkout", data=CHECKOUT_FORM)
+    assert response.headers["location"].startswith("/order/confirmation/")
+    return len(statements)
+
+
+async def test_checkout_statement_count_does_not_grow_with_cart_lines(client, statements):
+    login(client, "user")
+    one_line = await _checkout_statements(client, statements, 2, {1: 1})
+    five_lines = await _checkout_statements(client, statements, 2, {1: 1, 2: 2, 3: 1, 4: 3, 5: 1})
+
+    # Товари — один IN, списання — один UPDATE, позиції — одна вставка пачкою
+    assert five_lines == one_line
+    assert await _sold(4) == (7, 3)
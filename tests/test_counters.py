@@ -0,0 +1,85 @@
+"""Лічильники адмінки: день береться з created_at, звіряння не губить паралельних змін"""
+import asyncio
+import datetime as dt
+
+from sqlalchemy import select
+
+from models.models import AdminCounter, Order
+from settings import async_session
+from tools import counters
+
+PAST = dt.datetime(2025, 1, 2, 23, 30)
+
+
+def _order(amount: float, created_at: dt.datetime | None = None) -> Order:
+    return Order(
+        user_id=2, total_amount=amount, created_at=created_at,
+        customer_name="Покупець", customer_phone="0500000000",
+        customer_email="buyer@example.com", shipping_address="Київ",
+    )
+
+
+async def _reconciled() -> None:
+    async with async_session() as db:
+        await counters.reconcile(db)
+        await db.commit()
+
+
+async def _stored() -> dict[str, float]:
+    async with async_session() as db:
+        rows = await db.execute(select(AdminCounter.name, AdminCounter.value))
+    return {name: value for name, value in rows if value}
+
+
+async def test_order_is_counted_on_its_created_at_day(engine):
+    await _reconciled()
+    names = [
+        "orders",
+        counters.day_key("orders", PAST.date()),
+        counters.day_key("revenue", PAST.date()),
+    ]
+    async with async_session() as db:
+        before = await counters.read(db, names)
+        db.add_all([_order(10), _order(5, created_at=PAST)])
+        await db.commit()
+        after = await counters.read(db, names)
+
+    assert [after[name] - before[name] for name in names] == [2, 1, 5]
+
+
+async def test_deleting_expired_order_decrements_its_day(engine):
+    await _reconciled()
+    async with async_session() as db:
+        order = _order(5, created_at=PAST)
+        db.add(order)
+        await db.commit()
+    before = await _stored()
+
+    async with async_session() as db:
+        order = await db.get(Order, order.id)
+        db.expire(order)
+        await db.delete(order)
+        await db.commit()
+
+    after = await _stored()
+    assert counters.day_key("orders", PAST.date()) not in after
+    assert after["orders"] == before["orders"] - 1
+    assert after["revenue"] == before["revenue"] - 5
+    await _reconciled()
+    assert await _stored() == after
+
+
+async def test_reconcile_during_inserts_loses_nothing(engine):
+    await _reconciled()
+
+    async def insert(number: int) -> None:
+        async with async_session() as db:
+            db.add(_order(number))
+            await db.commit()
+
+    await asyncio.gather(*(insert(number) for number in range(1, 21)), *(_reconciled() for _ in range(5)))
+
+    incremental = await _stored()
+    await _reconciled()
+    assert incremental == await _stored()
+    assert incremental["revenue"] >= sum(range(1, 21))
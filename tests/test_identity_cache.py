@@ -0,0 +1,50 @@
+"""Кеш ідентичності: запис скидається лише після коміту зміни користувача"""
+from models.models import User
+from settings import async_session
+from tests.conftest import token_for
+from tools.auth import resolve_user
+from tools.identity_cache import identity_cache
+
+
+async def test_user_change_evicts_cache_after_commit(engine):
+    await resolve_user(token_for("user"))
+    assert identity_cache.get(2)["is_admin"] is False
+
+    async with async_session() as db:
+        user = await db.get(User, 2)
+        user.is_admin = True
+        await db.flush()
+        # Між flush і комітом інший запит бачить старий рядок — кеш ще не скинуто
+        assert identity_cache.get(2) is not None
+        await db.commit()
+
+    assert identity_cache.get(2) is None
+    assert (await resolve_user(token_for("user")))["is_admin"] is True
+
+
+async def test_rolled_back_change_keeps_cache_entry(engine):
+    await resolve_user(token_for("user"))
+
+    async with async_session() as db:
+        user = await db.get(User, 2)
+        user.username = "renamed"
+        await db.flush()
+        await db.rollback()
+
+    assert identity_cache.get(2)["username"] == "user"
+
+
+async def test_deleted_user_is_evicted(engine):
+    async with async_session() as db:
+        user = User(username="temp", email="temp@example.com", password="x")
+        db.add(user)
+        await db.commit()
+    await resolve_user(token_for("temp", user_id=user.id))
+    assert identity_cache.get(user.id) is not None
+
+    async with async_session() as db:
+        await db.delete(await db.get(User, user.id))
+        await db.commit()
+
+    assert identity_cache.get(user.id) is None
+    assert await resolve_user(token_for("temp", user_id=user.id)) is None
@@ -0,0 +1,96 @@
+"""Кеш сторінок: обмеження віку без каналу та інвалідація між воркерами через Redis"""
+import asyncio
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from models.models import Product
+from settings import async_session
+from tools import page_cache as page_cache_module
+from tools.page_cache import InvalidationChannel, PageCache
+
+
+def test_max_age_caps_ttl_and_stale_ttl():
+    cache = PageCache(max_bytes=1024, ttl=60, stale_ttl=300, max_age=90)
+    assert (cache.ttl, cache.stale_ttl) == (60, 30)
+
+    cache = PageCache(max_bytes=1024, ttl=600, stale_ttl=300, max_age=90)
+    assert (cache.ttl, cache.stale_ttl) == (90, 0)
+
+    cache = PageCache(max_bytes=1024, ttl=60, stale_ttl=300)
+    assert (cache.ttl, cache.stale_ttl) == (60, 300)
+
+
+def _channel(cache: PageCache, server: FakeServer) -> InvalidationChannel:
+    channel = InvalidationChannel(cache, "redis://fake", "repairhub:test:pages")
+    channel._client = FakeRedis(server=server, decode_responses=True)
+    return channel
+
+
+@pytest.fixture
+async def other_worker(engine, monkeypatch):
+    """Кеш і підписка «іншого воркера»; цей процес публікує в той самий канал"""
+    server = FakeServer()
+    publisher = _channel(page_cache_module.page_cache, server)
+    monkeypatch.setattr(page_cache_module, "page_cache_channel", publisher)
+
+    cache = PageCache(max_bytes=1024 * 1024, ttl=60, stale_ttl=60)
+    subscriber = _channel(cache, server)
+    task = asyncio.create_task(subscriber.run(retry_interval=0.01))
+    for _ in range(100):
+        if await publisher.client.pubsub_numsub(subscriber.channel) == [(subscriber.channel, 1)]:
+            break
+        await asyncio.sleep(0.01)
+    yield cache, subscriber
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await subscriber.close()
+    await publisher.close()
+
+
+async def _wait_for(condition) -> bool:
+    for _ in range(100):
+        if condition():
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+async def test_commit_invalidates_other_worker(other_worker):
+    cache, subscriber = other_worker
+    cache.set("product:1", b"<html>1</html>", ["product:1"])
+    cache.set("product:2", b"<html>2</html>", ["product:2"])
+    cache.set("catalog", b"<html>catalog</html>", ["catalog"])
+
+    async with async_session() as db:
+        product = await db.get(Product, 1)
+        product.stock_quantity = 3
+        await db.commit()
+
+    assert await _wait_for(lambda: subscriber.received == 1)
+    assert set(cache._items) == {"product:2", "catalog"}
+
+    async with async_session() as db:
+        product = await db.get(Product, 2)
+        product.price = 1.0
+        await db.commit()
+
+    assert await _wait_for(lambda: subscriber.received == 2)
+    assert set(cache._items) == {"product:2"}
+
+
+async def test_rolled_back_change_is_not_published(other_worker):
+    cache, subscriber = other_worker
+    cache.set("product:1", b"<html>1</html>", ["product:1"])
+
+    async with async_session() as db:
+        product = await db.get(Product, 1)
+        product.stock_quantity = 3
+        await db.flush()
+        await db.rollback()
+    await asyncio.sleep(0.05)
+
+    assert subscriber.received == 0
+    assert set(cache._items) == {"product:1"}
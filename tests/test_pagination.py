@@ -0,0 +1,80 @@
+"""Keyset-пагінація: кожен рядок рівно один раз, хоч би як було записано created_at"""
+import datetime as dt
+
+import pytest
+from sqlalchemy import select
+
+from models.models import Product
+from settings import async_session
+from tools.catalog import catalog_page
+from tools.pagination import paginate
+
+NO_FILTERS = {"category": None, "min_price": None, "max_price": None, "search": None}
+
+
+async def _seed() -> set[int]:
+    """Товари шаблону (CURRENT_TIMESTAMP, без мікросекунд) і записані з Python"""
+    async with async_session() as db:
+        template_time = (await db.execute(select(Product.created_at).limit(1))).scalar_one()
+        times = [
+            template_time,  # та сама секунда, що й у CURRENT_TIMESTAMP, але з ".000000"
+            template_time,
+            template_time + dt.timedelta(microseconds=1),
+            template_time - dt.timedelta(microseconds=1),
+            template_time + dt.timedelta(seconds=1),
+            template_time - dt.timedelta(seconds=1),
+        ]
+        times += [template_time + dt.timedelta(minutes=number, microseconds=number * 7919) for number in range(9)]
+        db.add_all(
+            Product(name=f"Новий {number}", description="Опис", price=50.0, category="Смартфони",
+                    stock_quantity=1, created_at=created_at)
+            for number, created_at in enumerate(times)
+        )
+        await db.commit()
+        return set((await db.execute(select(Product.id))).scalars())
+
+
+async def _walk(fetch) -> list[int]:
+    visited, cursor = [], None
+    for _ in range(50):
+        page = await fetch(cursor)
+        visited += [product.id for product in page.items]
+        if not page.has_next:
+            return visited
+        cursor = page.next_cursor
+    pytest.fail("пагінація не закінчилась")
+
+
+async def test_catalog_visits_every_product_once(engine):
+    ids = await _seed()
+
+    async def fetch(cursor):
+        async with async_session() as db:
+            page, _ = await catalog_page(db, NO_FILTERS, cursor, page_size=5)
+        return page
+
+    visited = await _walk(fetch)
+    assert len(ids) == 23
+    assert sorted(visited) == sorted(ids)
+
+
+@pytest.mark.parametrize("descending", [True, False])
+async def test_keyset_order_matches_full_sort(engine, descending):
+    ids = await _seed()
+
+    async def fetch(cursor):
+        async with async_session() as db:
+            return await paginate(
+                db, select(Product), (Product.created_at, Product.id), cursor,
+                key=lambda product: (product.created_at, product.id),
+                descending=descending, page_size=4,
+            )
+
+    async with async_session() as db:
+        products = (await db.execute(select(Product))).scalars().all()
+    expected = [product.id for product in sorted(
+        products, key=lambda product: (product.created_at, product.id), reverse=descending
+    )]
+    visited = await _walk(fetch)
+    assert visited == expected
+    assert set(visited) == ids
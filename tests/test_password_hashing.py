@@ -0,0 +1,99 @@
+"""Хешування паролів у пулі процесів: прозорий rehash і затримки під час шторму входів"""
+import asyncio
+import statistics
+import time
+
+import pytest
+from sqlalchemy import select
+from werkzeug.security import generate_password_hash
+
+from models.models import User
+from settings import api_config, async_session
+from tools.passwords import PasswordHasher, password_hasher
+
+LOGINS = 24
+
+
+def test_needs_rehash_compares_normalized_method():
+    hasher = PasswordHasher("scrypt", workers=1, concurrency=1)
+
+    assert hasher.method_prefix.startswith("scrypt:")
+    assert not hasher.needs_rehash(generate_password_hash("secret", "scrypt"))
+    assert not hasher.needs_rehash(generate_password_hash("secret", hasher.method_prefix))
+    assert hasher.needs_rehash(generate_password_hash("secret", "pbkdf2:sha256:1000"))
+
+
+async def test_login_rehashes_legacy_hash_once(client):
+    async with async_session() as db:
+        user = await db.get(User, 2)
+        user.password = generate_password_hash("user123", "pbkdf2:sha256:1000")
+        await db.commit()
+    rehashed = password_hasher.rehashed
+
+    for _ in range(2):
+        response = await client.post("/auth/login", data={"username": "user", "password": "user123"})
+        assert response.status_code == 303
+
+    async with async_session() as db:
+        stored = (await db.execute(select(User.password).where(User.id == 2))).scalar_one()
+    assert stored.split("$", 1)[0] == password_hasher.method_prefix
+    assert password_hasher.rehashed == rehashed + 1
+
+
+async def _probe_during_login_storm(client, interval: float = 0.01) -> tuple[list[float], float]:
+    """Затримки GET /auth/login (без хешування), поки LOGINS входів виконуються паралельно.
+
+    Запити йдуть за розкладом кожні interval секунд, а затримка рахується від
+    запланованого моменту: заблокований event loop не може «не помітити» черги.
+    """
+
+    async def log_in():
+        response = await client.post("/auth/login", data={"username": "user", "password": "user123"})
+        assert response.status_code == 303
+
+    async def probe(scheduled: float) -> float:
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        response = await client.get("/auth/login")
+        assert response.status_code == 200
+        return time.perf_counter() - scheduled
+
+    started = time.perf_counter()
+    storm = asyncio.gather(*(log_in() for _ in range(LOGINS)))
+    probes = []
+    scheduled = started
+    while not storm.done():
+        probes.append(asyncio.create_task(probe(scheduled)))
+        scheduled += interval
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+    await storm
+    elapsed = time.perf_counter() - started
+    return list(await asyncio.gather(*probes)), elapsed
+
+
+def _p99(latencies: list[float]) -> float:
+    return statistics.quantiles(latencies, n=100, method="inclusive")[98] if len(latencies) > 1 else latencies[0]
+
+
+@pytest.mark.benchmark
+async def test_login_storm_does_not_stall_other_routes(client, monkeypatch):
+    # Прогрів: процеси пулу та шаблони створюються до вимірювань
+    await client.post("/auth/login", data={"username": "user", "password": "user123"})
+    await client.get("/auth/login")
+
+    pooled, pooled_total = await _probe_during_login_storm(client)
+
+    async def run_inline(func, *args):
+        return func(*args)
+
+    # Як до зміни: хеш рахується прямо в event loop
+    monkeypatch.setattr(password_hasher, "_run", run_inline)
+    inline, inline_total = await _probe_during_login_storm(client)
+
+    print(
+        f"\n{LOGINS} входів ({api_config.PASSWORD_HASH_METHOD}): "
+        f"пул — {pooled_total:.2f} с, p99 інших запитів {_p99(pooled) * 1000:.1f} мс ({len(pooled)} запитів); "
+        f"в event loop — {inline_total:.2f} с, p99 {_p99(inline) * 1000:.1f} мс ({len(inline)} запитів)"
+    )
+    # У пулі loop вільний: інші запити не чекають у черзі за хешами
+    assert _p99(pooled) < _p99(inline)
+    assert _p99(pooled) < inline_total / LOGINS
@@ -0,0 +1,115 @@
+"""EXPLAIN QUERY PLAN для запитів маршрутів: жодного повного сканування таблиці"""
+import re
+import sqlite3
+from contextlib import closing
+
+import pytest
+from sqlalchemy import event
+
+from tests.conftest import DB_PATH, login
+
+ANONYMOUS_PAGES = [
+    "/",
+    "/products",
+    "/products?category=Смартфони&min_price=100&max_price=900",
+    "/products?search=Товар",
+    "/product/1",
+    "/categories",
+    "/api/products",
+    "/api/products?category=Смартфони&fields=id,name",
+    "/api/products/1",
+]
+
+USER_PAGES = [
+    "/cart",
+    "/orders",
+    "/order/1",
+    "/account/dashboard",
+    "/account/notifications",
+    "/account/repairs",
+]
+
+ADMIN_PAGES = [
+    "/admin/",
+    "/admin/users",
+    "/admin/orders",
+    "/admin/orders?status=Новий",
+    "/admin/order/1",
+    "/admin/repairs",
+    "/admin/repairs?new=true",
+    "/admin/repair/1",
+    "/admin/self/repairs",
+    "/admin/statistics?date_from=2026-01-01&date_to=2026-01-31",
+    "/admin/api/timeseries?bucket=day",
+]
+
+# Підзапити, CTE та FTS5 (MATCH іде індексом віртуальної таблиці) — не сканування таблиць
+_NOT_A_TABLE = re.compile(r"^SCAN (\(subquery-\d+\)|CONSTANT ROW|\w+ VIRTUAL TABLE)")
+
+
+@pytest.fixture
+def selects(engine):
+    """SELECT-и маршрутів разом з параметрами, для повторного виконання з EXPLAIN"""
+    captured: dict[str, tuple] = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.setdefault(statement, parameters)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield captured
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+def full_scans(statement: str, parameters) -> list[str]:
+    """Кроки плану, що читають таблицю повністю (SCAN без індексу)"""
+    with closing(sqlite3.connect(DB_PATH)) as conn:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    scans = []
+    for *_, detail in plan:
+        if not detail.startswith("SCAN ") or " USING " in detail or _NOT_A_TABLE.match(detail):
+            continue
+        table = detail.split()[1]
+        # Keyset-сторінка за первинним ключем: обхід rowid з LIMIT, а не вся таблиця
+        if re.search(rf"ORDER BY {table}\.id( DESC)?\s+LIMIT", statement):
+            continue
+        scans.append(detail)
+    return scans
+
+
+async def _visit(client, pages: list[str]) -> None:
+    for page in pages:
+        response = await client.get(page)
+        assert response.status_code == 200, page
+
+
+async def test_route_queries_use_indexes(client, selects):
+    await _visit(client, ANONYMOUS_PAGES)
+    await _visit(login(client, "user"), USER_PAGES)
+    await _visit(login(client, "admin"), ADMIN_PAGES)
+
+    assert len(selects) > 30
+    problems = {
+        " ".join(statement.split())[:200]: scans
+        for statement, parameters in selects.items()
+        if (scans := full_scans(statement, parameters))
+    }
+    assert problems == {}
+
+
+@pytest.mark.parametrize("statement, index", [
+    ("SELECT id FROM repair_requests WHERE user_id = 2", "ix_repair_requests_user_id"),
+    ("SELECT id FROM repair_requests WHERE admin_id = 1", "ix_repair_requests_admin_id"),
+    ("SELECT id FROM repair_requests WHERE status = 'NEW' ORDER BY created_at DESC",
+     "ix_repair_requests_status_created_at"),
+    ("SELECT id FROM orders WHERE user_id = 2 ORDER BY created_at DESC", "ix_orders_user_id_created_at"),
+    ("SELECT id FROM orders WHERE status = 'NEW'", "ix_orders_status_created_at"),
+    ("SELECT id FROM notifications WHERE user_id = 2 AND is_read = 0 ORDER BY created_at DESC",
+     "ix_notifications_user_id_is_read_created_at"),
+    ("SELECT order_id FROM order_items WHERE product_id = 1", "ix_order_items_product_id"),
+    ("SELECT id FROM products WHERE category = 'SMARTPHONE' ORDER BY price", "ix_products_category_price"),
+])
+async def test_hot_path_indexes_are_used(engine, statement, index):
+    with closing(sqlite3.connect(DB_PATH)) as conn:
+        plan = " | ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}"))
+    assert index in plan
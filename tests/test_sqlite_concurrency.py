@@ -0,0 +1,125 @@
+"""SQLite під конкурентними записами: PRAGMA з'єднань і порівняння пропускної здатності"""
+import asyncio
+import shutil
+import time
+
+import pytest
+from sqlalchemy import event, func, select, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models.models import Notification, NotificationType, Product
+from settings import api_config, apply_sqlite_pragmas
+from tests.conftest import TEMPLATE_PATH, TMP_DIR
+
+WRITERS = 8
+READERS = 4
+TRANSACTIONS = 25
+
+
+async def test_connections_apply_pragmas(engine):
+    async with engine.connect() as conn:
+        async def pragma(name: str):
+            return await conn.scalar(text(f"PRAGMA {name}"))
+
+        assert (await pragma("journal_mode")).lower() == api_config.SQLITE_JOURNAL_MODE.lower()
+        assert await pragma("synchronous") == 1  # NORMAL
+        assert await pragma("busy_timeout") == api_config.SQLITE_BUSY_TIMEOUT_MS
+        assert await pragma("cache_size") == -api_config.SQLITE_CACHE_SIZE_KB
+
+
+def _engine(name: str, pragmas: bool, single_connection: bool = False, copy: bool = True):
+    path = TMP_DIR / f"{name}.db"
+    if copy:
+        shutil.copyfile(TEMPLATE_PATH, path)
+    url = f"sqlite+aiosqlite:///{path}"
+    if not pragmas:
+        # Як до зміни: параметри aiosqlite за замовчуванням, журнал відкату
+        return create_async_engine(url)
+    engine = create_async_engine(url, **api_config.engine_options(url, single_connection=single_connection))
+    event.listen(engine.sync_engine, "connect", apply_sqlite_pragmas)
+    return engine
+
+
+async def _run_workload(engine, read_engine=None) -> dict:
+    """WRITERS задач комітять по TRANSACTIONS записів (сповіщення + залишок), READERS читають"""
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    read_session_factory = async_sessionmaker(read_engine or engine, expire_on_commit=False)
+    errors = 0
+    reads = 0
+    writing = True
+
+    async def writer(number: int) -> None:
+        nonlocal errors
+        for _ in range(TRANSACTIONS):
+            try:
+                async with session_factory() as db:
+                    db.add(Notification(
+                        user_id=2, notification_type=NotificationType.SYSTEM,
+                        title=f"Запис {number}", message="Навантаження",
+                    ))
+                    await db.execute(
+                        update(Product).where(Product.id == number % 8 + 1)
+                        .values(stock_quantity=Product.stock_quantity + 1)
+                    )
+                    await db.commit()
+            except OperationalError:
+                errors += 1
+
+    async def reader() -> None:
+        nonlocal reads, errors
+        while writing:
+            try:
+                async with read_session_factory() as db:
+                    await db.execute(select(func.count(Notification.id)))
+                reads += 1
+            except OperationalError:
+                errors += 1
+            await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    readers = [asyncio.create_task(reader()) for _ in range(READERS)]
+    await asyncio.gather(*(writer(number) for number in range(WRITERS)))
+    elapsed = time.perf_counter() - started
+    writing = False
+    await asyncio.gather(*readers)
+
+    async with session_factory() as db:
+        written = (await db.execute(
+            select(func.count(Notification.id)).where(Notification.message == "Навантаження")
+        )).scalar_one()
+    await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
+    return {
+        "written": written,
+        "errors": errors,
+        "writes_per_s": written / elapsed,
+        "reads_per_s": reads / elapsed,
+    }
+
+
+@pytest.mark.benchmark
+async def test_concurrent_writers_throughput():
+    results = {
+        "до (журнал відкату)": await _run_workload(_engine("before", pragmas=False)),
+        "WAL + PRAGMA": await _run_workload(_engine("wal", pragmas=True)),
+        # Як SQLITE_SINGLE_WRITER: записи через одне з'єднання, читання окремим пулом
+        "WAL, один записувач": await _run_workload(
+            _engine("single", pragmas=True, single_connection=True),
+            _engine("single", pragmas=True, copy=False),
+        ),
+    }
+
+    print()
+    for name, result in results.items():
+        print(
+            f"{name}: {result['writes_per_s']:.0f} записів/с, {result['reads_per_s']:.0f} читань/с, "
+            f"помилок {result['errors']}"
+        )
+
+    before, wal, single = results.values()
+    for result in (wal, single):
+        assert result["errors"] == 0
+        assert result["written"] == WRITERS * TRANSACTIONS
+    assert wal["writes_per_s"] > before["writes_per_s"]
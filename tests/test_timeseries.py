@@ -0,0 +1,52 @@
+"""Ряд /admin/api/timeseries: межі довжини за кроком і дати на краях календаря"""
+import datetime as dt
+
+import pytest
+
+from settings import async_session
+from tests.conftest import login
+from tools import rollups
+
+URL = "/admin/api/timeseries"
+
+
+@pytest.mark.parametrize("bucket", rollups.BUCKETS)
+async def test_span_is_capped_per_bucket(client, bucket):
+    login(client, "admin")
+    date_to = dt.date(2026, 6, 30)
+    max_days = rollups.MAX_SPAN_DAYS[bucket]
+
+    longest = date_to - dt.timedelta(days=max_days - 1)
+    response = await client.get(URL, params={"bucket": bucket, "date_from": longest, "date_to": date_to})
+    assert response.status_code == 200
+    assert response.json()["points"]
+
+    too_long = longest - dt.timedelta(days=1)
+    response = await client.get(URL, params={"bucket": bucket, "date_from": too_long, "date_to": date_to})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("params", [
+    {"bucket": "week", "date_from": "9999-12-20", "date_to": "9999-12-31"},
+    {"bucket": "day", "date_to": "9999-12-31"},
+    {"bucket": "week", "date_from": "0001-01-01", "date_to": "0001-01-10"},
+    {"bucket": "hour", "date_to": "0001-01-02"},
+])
+async def test_calendar_edges_do_not_overflow(client, params):
+    login(client, "admin")
+    response = await client.get(URL, params=params)
+    assert response.status_code == 200
+    assert response.json()["date_to"] <= rollups.LAST_DAY.isoformat()
+
+
+async def test_bad_bucket_and_reversed_range_are_rejected(client):
+    login(client, "admin")
+    assert (await client.get(URL, params={"bucket": "month"})).status_code == 400
+    reversed_range = {"bucket": "day", "date_from": "2026-02-01", "date_to": "2026-01-01"}
+    assert (await client.get(URL, params=reversed_range)).status_code == 400
+
+
+async def test_timeseries_rejects_too_long_span_directly(engine):
+    async with async_session() as db:
+        with pytest.raises(ValueError):
+            await rollups.timeseries(db, "hour", dt.date(2026, 1, 1), dt.date(2026, 3, 1))
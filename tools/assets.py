@@ -0,0 +1,176 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import time
+from typing import Optional
+
+import brotli
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+from settings import api_config
+
+STATIC_DIR = "static"
+# Копії з відбитком хешу в імені, gz/br-версії та маніфест (python -m tools.assets)
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+# Текстові формати, для яких є сенс у стисненні; зображення вже стиснені
+COMPRESSIBLE = (".css", ".js", ".mjs", ".json", ".map", ".svg", ".txt", ".xml", ".html", ".ico")
+MIN_COMPRESS_SIZE = 256
+# Як часто воркер перевіряє, чи не оновився маніфест (с)
+MANIFEST_CHECK_INTERVAL = 1.0
+
+IMMUTABLE = f"public, max-age={api_config.STATIC_IMMUTABLE_MAX_AGE}, immutable"
+REVALIDATE = "no-cache"
+
+
+def _relative(path: str) -> str:
+    return os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+
+
+# Файли з хешем вмісту в імені: їхній URL ніколи не вказує на інші байти
+IMMUTABLE_PREFIXES = (DIST_DIR + "/", _relative(api_config.DERIVED_IMAGES_DIR) + "/")
+
+
+def _compress(path: str, data: bytes) -> None:
+    """gz/br-сусіди файлу, якщо вони помітно менші за оригінал"""
+    variants = (
+        (".gz", lambda: gzip.compress(data, compresslevel=9, mtime=0)),
+        (".br", lambda: brotli.compress(data, quality=11)),
+    )
+    for suffix, compress in variants:
+        target = path + suffix
+        if os.path.exists(target):
+            continue
+        compressed = compress()
+        if len(compressed) < len(data) * 0.9:
+            with open(target, "wb") as file:
+                file.write(compressed)
+
+
+def build(static_dir: str = STATIC_DIR) -> dict:
+    """Копіює файли static/ у dist/ з хешем в імені, стискає текстові і пише маніфест.
+
+    Ідемпотентна: наявні копії не перезаписуються. Старі версії не
+    видаляються — на них можуть посилатися сторінки в кешах клієнтів.
+    """
+    dist = os.path.join(static_dir, DIST_DIR)
+    skip = {os.path.normpath(dist), os.path.normpath(api_config.DERIVED_IMAGES_DIR)}
+    manifest = {}
+
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.normpath(os.path.join(root, d)) not in skip)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            with open(source, "rb") as file:
+                data = file.read()
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            stem, ext = os.path.splitext(name)
+            logical = os.path.relpath(source, static_dir).replace(os.sep, "/")
+            target = os.path.join(dist, os.path.dirname(logical), f"{stem}.{digest}{ext}")
+
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(source, target)
+            if ext.lower() in COMPRESSIBLE and len(data) >= MIN_COMPRESS_SIZE:
+                _compress(target, data)
+            manifest[logical] = os.path.relpath(target, static_dir).replace(os.sep, "/")
+
+    os.makedirs(dist, exist_ok=True)
+    manifest_path = os.path.join(dist, MANIFEST_NAME)
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+class AssetManifest:
+    """Маніфест зібраних файлів; воркер перечитує його, коли змінюється mtime"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: dict = {}
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+
+    def entries(self) -> dict:
+        now = time.monotonic()
+        if now - self._checked_at >= MANIFEST_CHECK_INTERVAL:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                mtime = None
+            if mtime != self._mtime:
+                try:
+                    with open(self.path, encoding="utf-8") as file:
+                        self._entries = json.load(file)
+                except (OSError, ValueError):
+                    self._entries = {}
+                self._mtime = mtime
+        return self._entries
+
+    def url(self, path: Optional[str]) -> Optional[str]:
+        """"images/a.png" або "/static/images/a.png" -> URL копії з хешем (або вихідний)"""
+        if not path or "://" in path:
+            return path
+        logical = path.removeprefix("/static/").lstrip("/")
+        return f"/static/{self.entries().get(logical, logical)}"
+
+
+asset_manifest = AssetManifest(os.path.join(STATIC_DIR, DIST_DIR, MANIFEST_NAME))
+
+
+def asset_url(path: Optional[str]) -> Optional[str]:
+    """URL статичного файлу через маніфест (Jinja global)"""
+    return asset_manifest.url(path)
+
+
+def _accepted_encodings(headers: Headers) -> set[str]:
+    accepted = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles, що віддає готові .br/.gz-версії і довге кешування для файлів з хешем"""
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        relative = os.path.relpath(full_path, os.path.realpath(self.directory)).replace(os.sep, "/")
+        headers = {"Cache-Control": IMMUTABLE if relative.startswith(IMMUTABLE_PREFIXES) else REVALIDATE}
+        media_type = mimetypes.guess_type(str(full_path))[0] or "application/octet-stream"
+
+        path, encoding = str(full_path), None
+        if os.path.splitext(path)[1].lower() in COMPRESSIBLE:
+            headers["Vary"] = "Accept-Encoding"
+            accepted = _accepted_encodings(request_headers)
+            for name, suffix in (("br", ".br"), ("gzip", ".gz")):
+                if name in accepted and os.path.isfile(path + suffix):
+                    path, encoding = path + suffix, name
+                    break
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            stat_result = os.stat(path)
+        response = FileResponse(
+            path, status_code=status_code, stat_result=stat_result, headers=headers, media_type=media_type
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+if __name__ == "__main__":
+    manifest = build()
+    print(f"Зібрано файлів: {len(manifest)}")
@@ -1,14 +1,19 @@
+import logging
 import os
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 
 import jwt
 from fastapi import HTTPException, status
-from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
-from werkzeug.security import check_password_hash, generate_password_hash
 
 from models.models import User
-from settings import api_config, async_session
+from settings import api_config, read_session
+from tools.identity_cache import identity_cache
+from tools.loaders import identity_select
+
+logger = logging.getLogger(__name__)
 
 
 # openssl rand -hex 32
@@ -53,17 +58,56 @@ def decode_access_token(token: str):
         )
 
 
-async def authenticate_user(username: str, password: str):
-    async with async_session() as session:
-        # Шукаємо користувача за username або email
-        stmt = select(User).where(
-            (User.username == username) | (User.email == username)
-        )
-        result = await session.execute(stmt)
-        user = result.scalar_one_or_none()
-
-        if not user:
-            return None
-        if not check_password_hash(user.password, password):
-            return None
-        return user
\ No newline at end of file
+async def resolve_user(access_token: str | None, db: AsyncSession | None = None) -> Optional[dict]:
+    """Визначення користувача за токеном: підпис JWT, далі кеш або БД.
+
+    У режимі AUTH_CLAIMS_ONLY дані беруться з підписаних claims без звернення до БД.
+    Якщо `db` не передано, сесія відкривається лише при промаху кешу.
+    """
+    if not access_token:
+        return None
+
+    try:
+        payload = decode_access_token(access_token)
+        user_id = int(payload.get("sub"))
+    except (HTTPException, jwt.PyJWTError, TypeError, ValueError) as e:
+        # Прострочений або підроблений токен — звичайна ситуація, користувач анонімний
+        logger.debug("Rejected access token: %s", e)
+        return None
+
+    if api_config.AUTH_CLAIMS_ONLY:
+        return {
+            "id": user_id,
+            "username": payload.get("username"),
+            "email": payload.get("email"),
+            "is_admin": bool(payload.get("is_admin"))
+        }
+
+    # Спочатку перевіряємо кеш, щоб не звертатися до БД на кожен запит
+    user_data = identity_cache.get(user_id)
+    if user_data:
+        return user_data
+
+    try:
+        # Отримуємо лише колонки ідентичності, без каскаду selectin-зв'язків
+        stmt = identity_select().where(User.id == user_id)
+        if db is None:
+            async with read_session() as session:
+                user = (await session.execute(stmt)).one_or_none()
+        else:
+            user = (await db.execute(stmt)).one_or_none()
+    except SQLAlchemyError:
+        logger.warning("Failed to load user %s for access token", user_id, exc_info=True)
+        return None
+
+    if not user:
+        return None
+
+    user_data = {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "is_admin": user.is_admin
+    }
+    identity_cache.set(user_id, user_data)
+    return user_data
\ No newline at end of file
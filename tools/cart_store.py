@@ -0,0 +1,348 @@
+import asyncio
+import datetime as dt
+from abc import ABC, abstractmethod
+import json
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import delete, func, select, update
+
+from models.models import Cart, CartTotal, Product
+from settings import api_config, async_session, dialect_insert
+
+logger = logging.getLogger(__name__)
+
+
+def _cents(price: float) -> int:
+    # Суми кошика рахуються в копійках, щоб не накопичувати похибку float
+    return round(float(price) * 100)
+
+
+def _snapshot(product: Product) -> dict:
+    """Поля товару, що показуються в кошику (ціна — на момент додавання)"""
+    return {
+        "product_id": product.id,
+        "name": product.name,
+        "price": float(product.price),
+        "image_url": product.image_url,
+        "stock_quantity": product.stock_quantity,
+    }
+
+
+class CartStore(ABC):
+    """Кошики користувачів. Елемент кошика — dict з полями _snapshot() і quantity.
+
+    Кошик, який не змінювався ttl секунд, зникає. Операції add/remove/clear
+    атомарні в межах бекенда, тож кілька воркерів бачать той самий кошик.
+    """
+
+    backend = ""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+
+    @abstractmethod
+    async def items(self, user_id: int) -> list[dict]:
+        ...
+
+    @abstractmethod
+    async def add(self, user_id: int, product: Product, quantity: int) -> None:
+        ...
+
+    @abstractmethod
+    async def remove(self, user_id: int, product_id: int) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self, user_id: int) -> None:
+        ...
+
+    @abstractmethod
+    async def total(self, user_id: int) -> float:
+        ...
+
+    async def purge_expired(self) -> int:
+        """Видаляє прострочені кошики; повертає їх кількість"""
+        return 0
+
+    async def close(self) -> None:
+        pass
+
+    async def run(self, interval: float) -> None:
+        """Фонове прибирання прострочених кошиків (запускається з lifespan)"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.purge_expired()
+            except Exception as exc:
+                logger.warning("Cart purge failed: %r", exc)
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "ttl": self.ttl}
+
+
+class _MemoryCart:
+    __slots__ = ("items", "total_cents", "expires_at")
+
+    def __init__(self):
+        self.items: dict[int, dict] = {}
+        self.total_cents = 0
+        self.expires_at = 0.0
+
+
+class MemoryCartStore(CartStore):
+    """Кошики в пам'яті процесу: лише для одного воркера (розробка, тести)"""
+
+    backend = "memory"
+
+    def __init__(self, ttl: int):
+        super().__init__(ttl)
+        self._carts: dict[int, _MemoryCart] = {}
+
+    def _get(self, user_id: int) -> Optional[_MemoryCart]:
+        cart = self._carts.get(user_id)
+        if cart is not None and cart.expires_at < time.monotonic():
+            del self._carts[user_id]
+            return None
+        return cart
+
+    async def items(self, user_id: int) -> list[dict]:
+        cart = self._get(user_id)
+        return [dict(item) for item in cart.items.values()] if cart else []
+
+    async def add(self, user_id: int, product: Product, quantity: int) -> None:
+        cart = self._get(user_id) or self._carts.setdefault(user_id, _MemoryCart())
+        item = cart.items.get(product.id)
+        if item is None:
+            item = cart.items[product.id] = {**_snapshot(product), "quantity": 0}
+        item["quantity"] += quantity
+        cart.total_cents += _cents(item["price"]) * quantity
+        cart.expires_at = time.monotonic() + self.ttl
+
+    async def remove(self, user_id: int, product_id: int) -> None:
+        cart = self._get(user_id)
+        item = cart.items.pop(product_id, None) if cart else None
+        if item is not None:
+            cart.total_cents -= _cents(item["price"]) * item["quantity"]
+            cart.expires_at = time.monotonic() + self.ttl
+
+    async def clear(self, user_id: int) -> None:
+        self._carts.pop(user_id, None)
+
+    async def total(self, user_id: int) -> float:
+        cart = self._get(user_id)
+        return cart.total_cents / 100 if cart else 0.0
+
+    async def purge_expired(self) -> int:
+        now = time.monotonic()
+        expired = [user_id for user_id, cart in self._carts.items() if cart.expires_at < now]
+        for user_id in expired:
+            del self._carts[user_id]
+        return len(expired)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "carts": len(self._carts)}
+
+
+class DatabaseCartStore(CartStore):
+    """Кошики в таблиці carts: рядок на товар, додавання — один upsert.
+
+    Ціна фіксується в carts.price_cents під час додавання, а сума кошика
+    ведеться в cart_totals тими ж транзакціями, що змінюють carts, тож
+    total() — читання одного рядка за ключем. Назва та залишок беруться
+    з products під час читання.
+    """
+
+    backend = "db"
+
+    def _cutoff(self) -> dt.datetime:
+        return dt.datetime.now() - dt.timedelta(seconds=self.ttl)
+
+    @staticmethod
+    def _change_total(user_id: int, delta_cents: int, now: dt.datetime):
+        stmt = dialect_insert(CartTotal).values(user_id=user_id, total_cents=delta_cents, updated_at=now)
+        return stmt.on_conflict_do_update(
+            index_elements=[CartTotal.user_id],
+            set_={"total_cents": CartTotal.total_cents + stmt.excluded.total_cents, "updated_at": now},
+        )
+
+    async def _drop_expired(self, db, user_id: int) -> None:
+        # Прострочений кошик починається заново
+        cutoff = self._cutoff()
+        await db.execute(delete(Cart).where(Cart.user_id == user_id, Cart.updated_at < cutoff))
+        await db.execute(delete(CartTotal).where(CartTotal.user_id == user_id, CartTotal.updated_at < cutoff))
+
+    async def items(self, user_id: int) -> list[dict]:
+        stmt = (
+            select(Cart.quantity, Cart.price_cents, Product)
+            .join(Product, Product.id == Cart.product_id)
+            .where(Cart.user_id == user_id, Cart.updated_at >= self._cutoff())
+            .order_by(Cart.added_at, Cart.id)
+        )
+        async with async_session() as db:
+            rows = await db.execute(stmt)
+            return [
+                {**_snapshot(product), "price": price_cents / 100, "quantity": quantity}
+                for quantity, price_cents, product in rows
+            ]
+
+    async def add(self, user_id: int, product: Product, quantity: int) -> None:
+        now = dt.datetime.now()
+        stmt = dialect_insert(Cart).values(
+            user_id=user_id, product_id=product.id, quantity=quantity,
+            price_cents=_cents(product.price), added_at=now, updated_at=now
+        )
+        # Ціна вже доданого товару не змінюється, як і в інших бекендах
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Cart.user_id, Cart.product_id],
+            set_={"quantity": Cart.quantity + stmt.excluded.quantity, "updated_at": now},
+        ).returning(Cart.price_cents)
+        async with async_session() as db:
+            await self._drop_expired(db, user_id)
+            price_cents = (await db.execute(stmt)).scalar_one()
+            # TTL рахується для кошика цілком
+            await db.execute(update(Cart).where(Cart.user_id == user_id).values(updated_at=now))
+            await db.execute(self._change_total(user_id, price_cents * quantity, now))
+            await db.commit()
+
+    async def remove(self, user_id: int, product_id: int) -> None:
+        now = dt.datetime.now()
+        async with async_session() as db:
+            await self._drop_expired(db, user_id)
+            removed = (await db.execute(
+                delete(Cart)
+                .where(Cart.user_id == user_id, Cart.product_id == product_id)
+                .returning(Cart.quantity, Cart.price_cents)
+            )).one_or_none()
+            if removed is None:
+                await db.commit()
+                return
+            await db.execute(update(Cart).where(Cart.user_id == user_id).values(updated_at=now))
+            await db.execute(self._change_total(user_id, -removed.quantity * removed.price_cents, now))
+            await db.commit()
+
+    async def clear(self, user_id: int) -> None:
+        async with async_session() as db:
+            await db.execute(delete(Cart).where(Cart.user_id == user_id))
+            await db.execute(delete(CartTotal).where(CartTotal.user_id == user_id))
+            await db.commit()
+
+    async def total(self, user_id: int) -> float:
+        stmt = select(CartTotal.total_cents).where(
+            CartTotal.user_id == user_id, CartTotal.updated_at >= self._cutoff()
+        )
+        async with async_session() as db:
+            cents = (await db.execute(stmt)).scalar_one_or_none()
+            return (cents or 0) / 100
+
+    async def purge_expired(self) -> int:
+        cutoff = self._cutoff()
+        async with async_session() as db:
+            await db.execute(
+                delete(Cart).where((Cart.updated_at < cutoff) | Cart.updated_at.is_(None))
+            )
+            result = await db.execute(delete(CartTotal).where(CartTotal.updated_at < cutoff))
+            await db.commit()
+            return result.rowcount
+
+
+class RedisCartStore(CartStore):
+    """Кошики в Redis (або сумісному сервері): три ключі на кошик з спільним TTL.
+
+    {prefix}{user}:qty — хеш товар -> кількість, {prefix}{user}:items —
+    хеш товар -> JSON знімка товару, {prefix}{user}:total — сума в копійках,
+    тож total() — один GET. Зміни виконуються в MULTI/EXEC з WATCH.
+    """
+
+    backend = "redis"
+
+    def __init__(self, ttl: int, url: str, prefix: str):
+        super().__init__(ttl)
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis.asyncio as redis
+
+            self._client = redis.from_url(self.url, decode_responses=True)
+        return self._client
+
+    def _keys(self, user_id: int) -> tuple[str, str, str]:
+        base = f"{self.prefix}{user_id}"
+        return f"{base}:qty", f"{base}:items", f"{base}:total"
+
+    async def items(self, user_id: int) -> list[dict]:
+        qty_key, items_key, _ = self._keys(user_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            quantities, snapshots = await pipe.hgetall(qty_key).hgetall(items_key).execute()
+        items = []
+        for product_id, quantity in quantities.items():
+            if product_id in snapshots:
+                items.append({**json.loads(snapshots[product_id]), "quantity": int(quantity)})
+        return items
+
+    async def add(self, user_id: int, product: Product, quantity: int) -> None:
+        keys = self._keys(user_id)
+        qty_key, items_key, total_key = keys
+        snapshot = json.dumps(_snapshot(product), ensure_ascii=False)
+
+        async def add_item(pipe) -> None:
+            # Знімок не перезаписується: сума рахується за ціною, з якою товар уже лежить у кошику
+            stored = await pipe.hget(items_key, product.id) or snapshot
+            pipe.multi()
+            pipe.hincrby(qty_key, product.id, quantity)
+            pipe.hsetnx(items_key, product.id, snapshot)
+            pipe.incrby(total_key, _cents(json.loads(stored)["price"]) * quantity)
+            for key in keys:
+                pipe.expire(key, self.ttl)
+
+        # WATCH: паралельна зміна кошика перезапускає транзакцію
+        await self.client.transaction(add_item, qty_key, items_key)
+
+    async def remove(self, user_id: int, product_id: int) -> None:
+        keys = self._keys(user_id)
+        qty_key, items_key, total_key = keys
+
+        async def remove_item(pipe) -> None:
+            quantity, stored = await pipe.hget(qty_key, product_id), await pipe.hget(items_key, product_id)
+            pipe.multi()
+            pipe.hdel(qty_key, product_id)
+            pipe.hdel(items_key, product_id)
+            if quantity and stored:
+                pipe.decrby(total_key, _cents(json.loads(stored)["price"]) * int(quantity))
+            for key in keys:
+                pipe.expire(key, self.ttl)
+
+        await self.client.transaction(remove_item, qty_key, items_key)
+
+    async def clear(self, user_id: int) -> None:
+        await self.client.delete(*self._keys(user_id))
+
+    async def total(self, user_id: int) -> float:
+        cents = await self.client.get(self._keys(user_id)[2])
+        return int(cents or 0) / 100
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {**super().stats(), "prefix": self.prefix}
+
+
+def create_cart_store(backend: str) -> CartStore:
+    if backend == "memory":
+        return MemoryCartStore(api_config.CART_TTL)
+    if backend == "redis":
+        return RedisCartStore(api_config.CART_TTL, api_config.REDIS_URL, api_config.CART_REDIS_PREFIX)
+    if backend == "db":
+        return DatabaseCartStore(api_config.CART_TTL)
+    raise ValueError(f"Невідомий CART_BACKEND: {backend!r} (memory, db, redis)")
+
+
+cart_store = create_cart_store(api_config.CART_BACKEND)
@@ -0,0 +1,97 @@
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.models import Product, ProductCategory
+from tools.pagination import Page, paginate
+from tools.search import apply_search, highlight
+
+
+def price_param(value: float) -> str:
+    """Ціна для query-параметра без експоненти та зайвих нулів (1500.0 -> "1500")"""
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def catalog_filters(category, min_price, max_price, search) -> dict:
+    """Нормалізовані фільтри каталогу: однакові за змістом запити дають однаковий результат і ключ кешу"""
+    filters = {"category": None, "min_price": None, "max_price": None, "search": None}
+
+    # Невідома категорія ігнорується
+    if category and category != "None":
+        try:
+            filters["category"] = ProductCategory(category)
+        except ValueError:
+            pass
+
+    for name, value in (("min_price", min_price), ("max_price", max_price)):
+        if value and value != "None":
+            try:
+                filters[name] = float(value)
+            except ValueError:
+                pass
+
+    if search and search != "None":
+        filters["search"] = " ".join(search.split()) or None
+
+    return filters
+
+
+def filter_params(filters: dict) -> dict:
+    """Нормалізовані фільтри назад у query-параметри (без порожніх)"""
+    params = {
+        "category": filters["category"].value if filters["category"] else None,
+        "min_price": price_param(filters["min_price"]) if filters["min_price"] is not None else None,
+        "max_price": price_param(filters["max_price"]) if filters["max_price"] is not None else None,
+        "search": filters["search"],
+    }
+    return {name: value for name, value in params.items() if value is not None}
+
+
+async def catalog_page(
+    db: AsyncSession,
+    filters: dict,
+    cursor: Optional[str],
+    options: tuple = (),
+    page_size: Optional[int] = None,
+) -> tuple[Page, dict]:
+    """Сторінка товарів за фільтрами каталогу (HTML і JSON API).
+
+    Без пошуку — keyset за (created_at, id), з пошуком — за релевантністю.
+    Повертає сторінку з об'єктами Product і підсвічені назви/фрагменти
+    для знайдених товарів ({id: {"name", "snippet"}}).
+    """
+    stmt = select(Product).options(*options)
+
+    if filters["category"] is not None:
+        stmt = stmt.where(Product.category == filters["category"])
+    if filters["min_price"] is not None:
+        stmt = stmt.where(Product.price >= filters["min_price"])
+    if filters["max_price"] is not None:
+        stmt = stmt.where(Product.price <= filters["max_price"])
+
+    stmt, rank = apply_search(stmt, filters["search"])
+
+    highlights = {}
+    if rank is None:
+        page = await paginate(
+            db, stmt, (Product.created_at, Product.id), cursor,
+            key=lambda product: (product.created_at, product.id),
+            page_size=page_size,
+        )
+        return page, highlights
+
+    page = await paginate(
+        db, stmt, (rank, Product.id), cursor,
+        key=lambda row: (row.relevance, row.Product.id),
+        descending=False,
+        page_size=page_size,
+        scalars=False,
+    )
+    for row in page.items:
+        highlights[row.Product.id] = {
+            "name": highlight(row.name_hl),
+            "snippet": highlight(row.snippet),
+        }
+    page.items = [row.Product for row in page.items]
+    return page, highlights
@@ -0,0 +1,168 @@
+import asyncio
+import datetime as dt
+import logging
+from collections import defaultdict
+from typing import Iterable
+
+from sqlalchemy import case, delete, event, func, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models.models import AdminCounter, Order, OrderStatus, RepairRequest, RequestStatus, User
+from settings import async_session, dialect_insert, dispose_engines
+
+logger = logging.getLogger(__name__)
+
+TOTALS = ("users", "repairs", "repairs_new", "orders", "orders_new", "revenue")
+
+
+def day_key(name: str, day: dt.date) -> str:
+    """Лічильник за день: orders:2026-10-17, revenue:2026-10-17"""
+    return f"{name}:{day.isoformat()}"
+
+
+def _history(obj, name: str) -> tuple[list, list]:
+    history = inspect(obj).attrs[name].history
+    return list(history.deleted), list(history.added)
+
+
+def _deltas(session: Session) -> dict[str, float]:
+    """Зміни лічильників від рядків, записаних у цьому flush"""
+    deltas = defaultdict(float)
+
+    for sign, objects in ((1, session.new), (-1, session.deleted)):
+        for obj in objects:
+            # Лише завантажені значення: видалений рядок уже не перечитати
+            values = inspect(obj).dict
+            if isinstance(obj, User):
+                deltas["users"] += sign
+            elif isinstance(obj, RepairRequest):
+                deltas["repairs"] += sign
+                if values.get("status") == RequestStatus.NEW:
+                    deltas["repairs_new"] += sign
+            elif isinstance(obj, Order):
+                # created_at нового замовлення повертає сам INSERT (eager_defaults)
+                day = obj.created_at.date()
+                amount = values.get("total_amount") or 0
+                deltas["orders"] += sign
+                deltas["revenue"] += sign * amount
+                deltas[day_key("orders", day)] += sign
+                deltas[day_key("revenue", day)] += sign * amount
+                if values.get("status") == OrderStatus.NEW:
+                    deltas["orders_new"] += sign
+
+    for obj in session.dirty:
+        if isinstance(obj, RepairRequest):
+            new_name, new_value = "repairs_new", RequestStatus.NEW
+        elif isinstance(obj, Order):
+            new_name, new_value = "orders_new", OrderStatus.NEW
+        else:
+            continue
+        if obj in session.deleted:
+            continue
+        old, added = _history(obj, "status")
+        if added:
+            deltas[new_name] += (added[0] == new_value) - bool(old and old[0] == new_value)
+        if isinstance(obj, Order):
+            old, added = _history(obj, "total_amount")
+            if added and old:
+                difference = (added[0] or 0) - (old[0] or 0)
+                deltas["revenue"] += difference
+                deltas[day_key("revenue", obj.created_at.date())] += difference
+
+    return {name: value for name, value in deltas.items() if value}
+
+
+def _upsert(values: dict[str, float], replace: bool = False):
+    # Порядок імен однаковий у всіх транзакціях: паралельні оновлення не блокують одне одного навхрест
+    stmt = dialect_insert(AdminCounter).values([
+        {"name": name, "value": value} for name, value in sorted(values.items())
+    ])
+    value = stmt.excluded.value if replace else AdminCounter.value + stmt.excluded.value
+    return stmt.on_conflict_do_update(index_elements=[AdminCounter.name], set_={"value": value})
+
+
+# Видалений рядок після flush уже не перечитати: прострочені поля завантажуються до нього
+@event.listens_for(Session, "before_flush")
+def _load_deleted_rows(session: Session, flush_context, instances) -> None:
+    for obj in session.deleted:
+        if isinstance(obj, (Order, RepairRequest)) and inspect(obj).expired_attributes:
+            session.refresh(obj)
+
+
+# Лічильники пишуться тим самим з'єднанням у транзакції flush: відкат скасовує і їх
+@event.listens_for(Session, "after_flush")
+def _apply_counter_deltas(session: Session, flush_context) -> None:
+    deltas = _deltas(session)
+    if deltas:
+        session.connection().execute(_upsert(deltas))
+
+
+async def read(db: AsyncSession, names: Iterable[str]) -> dict[str, float]:
+    """Значення лічильників одним запитом за первинним ключем (відсутні — 0)"""
+    names = list(names)
+    rows = await db.execute(select(AdminCounter.name, AdminCounter.value).where(AdminCounter.name.in_(names)))
+    values = dict.fromkeys(names, 0)
+    values.update(rows.all())
+    return values
+
+
+async def reconcile(db: AsyncSession) -> dict[str, float]:
+    """Перераховує всі лічильники з таблиць (без коміту) і повертає нові значення"""
+    # Спершу запис: на SQLite він бере блокування бази, на PostgreSQL — рядки лічильників.
+    # Транзакції з дельтами чекають на коміт звіряння, тож їх зміни не губляться між
+    # агрегатами та записом абсолютних значень
+    await db.execute(_upsert(dict.fromkeys(TOTALS, 0)))
+
+    values = {"users": (await db.execute(select(func.count(User.id)))).scalar_one()}
+
+    repairs, repairs_new = (await db.execute(
+        select(func.count(RepairRequest.id), func.count(case((RepairRequest.status == RequestStatus.NEW, 1))))
+    )).one()
+    values.update(repairs=repairs, repairs_new=repairs_new)
+
+    orders, orders_new, revenue = (await db.execute(select(
+        func.count(Order.id),
+        func.count(case((Order.status == OrderStatus.NEW, 1))),
+        func.coalesce(func.sum(Order.total_amount), 0),
+    ))).one()
+    values.update(orders=orders, orders_new=orders_new, revenue=revenue)
+
+    day = func.date(Order.created_at)
+    rows = await db.execute(
+        select(day, func.count(Order.id), func.sum(Order.total_amount)).group_by(day)
+    )
+    for created, count, amount in rows:
+        if created is not None:
+            created = dt.date.fromisoformat(str(created))
+            values[day_key("orders", created)] = count
+            values[day_key("revenue", created)] = amount or 0
+
+    # Абсолютні значення через upsert: кілька воркерів можуть звіряти одночасно
+    await db.execute(_upsert(values, replace=True))
+    await db.execute(delete(AdminCounter).where(AdminCounter.name.not_in(values)))
+    return values
+
+
+async def run(interval: float) -> None:
+    """Звіряння при старті та кожні interval секунд (запускається з lifespan)"""
+    while True:
+        try:
+            async with async_session() as db:
+                await reconcile(db)
+                await db.commit()
+        except Exception as exc:
+            logger.warning("Admin counters reconcile failed: %r", exc)
+        await asyncio.sleep(interval)
+
+
+async def main():
+    async with async_session() as db:
+        values = await reconcile(db)
+        await db.commit()
+    await dispose_engines()
+    print(f"Лічильників: {len(values)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Iterable, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from models.models import Product, ProductCategory
+from settings import api_config, async_session
+
+logger = logging.getLogger(__name__)
+
+
+class _Snapshot:
+    """Дані індексу: атрибути кожного товару та відсортовані ціни по категоріях"""
+
+    def __init__(self):
+        self.products: dict[int, tuple[ProductCategory, float, bool]] = {}
+        self.prices: dict[ProductCategory, list[float]] = {category: [] for category in ProductCategory}
+        self.in_stock_prices: dict[ProductCategory, list[float]] = {category: [] for category in ProductCategory}
+
+    def remove(self, product_id: int) -> None:
+        old = self.products.pop(product_id, None)
+        if old is None:
+            return
+        category, price, in_stock = old
+        self._discard(self.prices[category], price)
+        if in_stock:
+            self._discard(self.in_stock_prices[category], price)
+
+    def upsert(self, product_id: int, category: ProductCategory, price: float, in_stock: bool) -> None:
+        # Новий товар до перечитування може мати default категорії рядком
+        category = ProductCategory(category)
+        self.remove(product_id)
+        self.products[product_id] = (category, price, in_stock)
+        insort(self.prices[category], price)
+        if in_stock:
+            insort(self.in_stock_prices[category], price)
+
+    @staticmethod
+    def _discard(prices: list[float], price: float) -> None:
+        index = bisect_left(prices, price)
+        if index < len(prices) and prices[index] == price:
+            del prices[index]
+
+
+def _count(prices: list[float], min_price: Optional[float], max_price: Optional[float]) -> int:
+    lo = 0 if min_price is None else bisect_left(prices, min_price)
+    hi = len(prices) if max_price is None else bisect_right(prices, max_price)
+    return max(0, hi - lo)
+
+
+def _in_range(price: float, min_price: Optional[float], max_price: Optional[float]) -> bool:
+    return (min_price is None or price >= min_price) and (max_price is None or price <= max_price)
+
+
+class FacetIndex:
+    """Лічильники фасетів каталогу без GROUP BY на кожен запит.
+
+    У пам'яті тримаються (категорія, ціна, в наявності) усіх товарів і
+    відсортовані списки цін по категоріях: кількість у діапазоні цін —
+    два bisect. Зміни товарів застосовуються після коміту (події Session),
+    а періодичне перебудування підхоплює записи в обхід ORM та інших процесів.
+    """
+
+    def __init__(self, price_buckets: list[float]):
+        self.price_buckets = sorted(price_buckets)
+        self._data = _Snapshot()
+        self._lock = threading.Lock()
+        self._journal: Optional[list] = None
+        self._loading: Optional[asyncio.Task] = None
+        self.loaded = False
+        self.rebuilds = 0
+        self.updates = 0
+
+    def _apply(self, data: _Snapshot, change: tuple) -> None:
+        if change[0] == "remove":
+            data.remove(change[1])
+        else:
+            data.upsert(*change[1:])
+
+    def apply(self, changes: Iterable[tuple]) -> None:
+        """Зміни ("upsert", id, category, price, in_stock) / ("remove", id)"""
+        with self._lock:
+            for change in changes:
+                self._apply(self._data, change)
+                if self._journal is not None:
+                    self._journal.append(change)
+                self.updates += 1
+
+    async def rebuild(self) -> None:
+        """Повне перебудування з БД; зміни, закомічені під час читання, програються поверх"""
+        with self._lock:
+            self._journal = []
+        try:
+            data = _Snapshot()
+            stmt = select(Product.id, Product.category, Product.price, Product.stock_quantity)
+            async with async_session() as db:
+                rows = await db.execute(stmt)
+                for product_id, category, price, stock_quantity in rows:
+                    data.products[product_id] = (category, price, stock_quantity > 0)
+            for product_id, (category, price, in_stock) in data.products.items():
+                data.prices[category].append(price)
+                if in_stock:
+                    data.in_stock_prices[category].append(price)
+            for prices in (*data.prices.values(), *data.in_stock_prices.values()):
+                prices.sort()
+
+            with self._lock:
+                for change in self._journal:
+                    self._apply(data, change)
+                self._data = data
+                self.loaded = True
+                self.rebuilds += 1
+        finally:
+            with self._lock:
+                self._journal = None
+
+    async def ensure_loaded(self) -> bool:
+        """Чекає першого завантаження; при помилці каталог показується без фасетів"""
+        if self.loaded:
+            return True
+        if self._loading is None or self._loading.done():
+            self._loading = asyncio.get_running_loop().create_task(self.rebuild())
+        try:
+            await asyncio.shield(self._loading)
+        except Exception as exc:
+            logger.warning("Facet index load failed: %r", exc)
+        return self.loaded
+
+    async def run(self, interval: float) -> None:
+        """Фонове перебудування (запускається з lifespan); перше — одразу при старті"""
+        while True:
+            if self._loading is None or self._loading.done():
+                self._loading = asyncio.get_running_loop().create_task(self.rebuild())
+            try:
+                await self._loading
+            except Exception as exc:
+                logger.warning("Facet index rebuild failed: %r", exc)
+            await asyncio.sleep(interval)
+
+    def category_counts(
+        self,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        ids: Optional[Iterable[int]] = None,
+    ) -> dict[ProductCategory, dict]:
+        """Кількість товарів (усього / в наявності) по категоріях з урахуванням ціни та пошуку.
+
+        ids — товари, знайдені пошуком (None — без пошуку).
+        """
+        with self._lock:
+            data = self._data
+            if ids is None:
+                return {
+                    category: {
+                        "total": _count(data.prices[category], min_price, max_price),
+                        "in_stock": _count(data.in_stock_prices[category], min_price, max_price),
+                    }
+                    for category in ProductCategory
+                }
+
+            counts = {category: {"total": 0, "in_stock": 0} for category in ProductCategory}
+            for product_id in ids:
+                entry = data.products.get(product_id)
+                if entry is None or not _in_range(entry[1], min_price, max_price):
+                    continue
+                counts[entry[0]]["total"] += 1
+                counts[entry[0]]["in_stock"] += entry[2]
+            return counts
+
+    def price_histogram(
+        self,
+        category: Optional[ProductCategory] = None,
+        ids: Optional[Iterable[int]] = None,
+    ) -> list[dict]:
+        """Кількість товарів у цінових діапазонах [від, до) для категорії та пошуку"""
+        edges = self.price_buckets
+        bounds = list(zip(edges, [*edges[1:], None]))
+        counts = [0] * len(bounds)
+
+        with self._lock:
+            data = self._data
+            if ids is None:
+                categories = [category] if category is not None else list(ProductCategory)
+                for item in categories:
+                    prices = data.prices[item]
+                    for index, (lo, hi) in enumerate(bounds):
+                        end = len(prices) if hi is None else bisect_left(prices, hi)
+                        counts[index] += max(0, end - bisect_left(prices, lo))
+            else:
+                for product_id in ids:
+                    entry = data.products.get(product_id)
+                    if entry is None or (category is not None and entry[0] != category):
+                        continue
+                    index = bisect_right(edges, entry[1]) - 1
+                    if index >= 0:
+                        counts[index] += 1
+
+        return [
+            {"min": lo, "max": hi, "count": count}
+            for (lo, hi), count in zip(bounds, counts)
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "products": len(self._data.products),
+                "rebuilds": self.rebuilds,
+                "updates": self.updates,
+            }
+
+
+facet_index = FacetIndex(price_buckets=api_config.FACET_PRICE_BUCKETS)
+
+
+def apply_on_commit(session: Session, changes: Iterable[tuple]) -> None:
+    """Зміни індексу після коміту сесії (для змін в обхід ORM, напр. bulk UPDATE)"""
+    session.info.setdefault("facet_changes", []).extend(changes)
+
+
+# Категорія, ціна та залишок товарів, змінених у flush; застосовуються після коміту
+@event.listens_for(Session, "after_flush")
+def _collect_facet_changes(session: Session, flush_context) -> None:
+    changes = []
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            changes.append(("remove", obj.id))
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, Product) and obj not in session.deleted:
+            changes.append(("upsert", obj.id, obj.category, obj.price, (obj.stock_quantity or 0) > 0))
+    if changes:
+        apply_on_commit(session, changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_facet_changes(session: Session) -> None:
+    changes = session.info.pop("facet_changes", None)
+    if changes:
+        facet_index.apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_facet_changes(session: Session) -> None:
+    session.info.pop("facet_changes", None)
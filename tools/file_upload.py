@@ -1,9 +1,16 @@
-from fastapi import UploadFile
+from fastapi import HTTPException, UploadFile, status
 from settings import api_config
+from typing import Optional
+import asyncio
+import hashlib
 import uuid
 import os
+import re
 import aiofiles
 
+CHUNK_SIZE = 1024 * 1024
+_EXTENSION = re.compile(r"^\.[a-z0-9]{1,10}$")
+
 
 async def generate_file_url(filename: str, dest_dir: str = api_config.STATIC_IMAGES_DIR) -> str:
     unique_filename = f"{uuid.uuid4().hex}_{filename}"
@@ -12,25 +19,72 @@ async def generate_file_url(filename: str, dest_dir: str = api_config.STATIC_IMA
     return file_path
 
 
-async def generate_repair_file_url(filename: str) -> str:
-    """Generate file URL for repair photos in static/repair/ directory"""
-    unique_filename = f"{uuid.uuid4().hex}_{filename}"
-    repair_dir = "static/repair"
-    os.makedirs(repair_dir, exist_ok=True)
-    file_system_path = os.path.join(repair_dir, unique_filename)
-    
-    # Save the file to the file system
-    # Return the URL path that will be used to access the file via FastAPI static mount
-    return f"/static/repair/{unique_filename}"
-
-
-async def save_file(file: UploadFile, file_path: str):   
-    # The file_path is the URL path like "/static/repair/filename"
-    # We need to convert it to the actual file system path by removing "/static/" and using "static/"
-    if file_path.startswith('/static/'):
-        actual_file_path = "static/" + file_path[8:]  # Remove "/static/" and prepend "static/"
-    else:
-        actual_file_path = file_path
-    async with aiofiles.open(actual_file_path, "wb") as buffer:
-        content = await file.read()
-        await buffer.write(content)
\ No newline at end of file
+def _extension(filename: Optional[str]) -> str:
+    """Lowercased extension of the client's filename, or "" if it looks unsafe"""
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if _EXTENSION.match(ext) else ""
+
+
+def _fsync_dir(directory: str) -> None:
+    # Makes the rename itself durable; directories can't be opened on Windows
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+async def save_file(
+    file: UploadFile,
+    dest_dir: str = api_config.STATIC_REPAIR_DIR,
+    max_bytes: int = api_config.UPLOAD_MAX_BYTES,
+) -> Optional[str]:
+    """Stream an upload to disk and return its /static URL (None for an empty upload).
+
+    The file is read in chunks while its SHA-256 is computed, written to a
+    temporary file, fsynced and renamed to <sha256><ext>. Identical uploads
+    share one file. Call it before committing the row that references the
+    URL, so the row never points to a missing file.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    tmp_path = os.path.join(dest_dir, f".{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        async with aiofiles.open(tmp_path, "wb") as buffer:
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Файл завеликий (максимум {max_bytes // (1024 * 1024)} МБ)",
+                    )
+                digest.update(chunk)
+                await buffer.write(chunk)
+            await buffer.flush()
+            await asyncio.to_thread(os.fsync, buffer.fileno())
+
+        if size == 0:
+            os.remove(tmp_path)
+            return None
+
+        filename = f"{digest.hexdigest()}{_extension(file.filename)}"
+        file_path = os.path.join(dest_dir, filename)
+        if os.path.exists(file_path):
+            # Same content is already stored
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, file_path)
+            await asyncio.to_thread(_fsync_dir, dest_dir)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return "/" + file_path.replace(os.sep, "/")
@@ -0,0 +1,166 @@
+import asyncio
+import datetime as dt
+import hashlib
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import Response
+
+from models.models import IdempotencyRecord
+from settings import api_config, async_session, dialect_insert
+
+logger = logging.getLogger(__name__)
+
+# Ключ приходить прихованим полем форми або заголовком (для API-клієнтів)
+FORM_FIELD = "idempotency_key"
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 200
+
+
+def new_key() -> str:
+    """Новий ключ для прихованого поля форми (Jinja global)"""
+    return uuid.uuid4().hex
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class IdempotencyKey:
+    id: str
+    fingerprint: str
+
+
+class IdempotencyStore:
+    """Збережені відповіді на POST-запити з ключем ідемпотентності (таблиця idempotency_records).
+
+    Повтор з тим самим ключем протягом ttl секунд отримує збережену відповідь
+    після одного запиту за первинним ключем. Запис займається (claim) у
+    транзакції самої операції і комітиться разом з нею: паралельний дубль
+    чекає на цей рядок і після коміту першого запиту віддає його відповідь,
+    а якщо операція відкотилася — ключ знову вільний.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.replayed = 0
+        self.expired = 0
+
+    async def key(self, request: Request, scope: str, user_id: int) -> Optional[IdempotencyKey]:
+        """Ключ запиту (None, якщо клієнт його не надіслав) та відбиток полів форми"""
+        form = await request.form()
+        raw = request.headers.get(HEADER) or form.get(FORM_FIELD)
+        if not isinstance(raw, str) or not raw.strip():
+            return None
+
+        fields = []
+        for name, value in sorted(form.multi_items(), key=lambda item: item[0]):
+            if name == FORM_FIELD:
+                continue
+            if not isinstance(value, str):
+                # Файли порівнюються за назвою та розміром, без повторного читання
+                value = f"file:{value.filename}:{value.size}"
+            fields.extend((name, value))
+        return IdempotencyKey(
+            id=_digest(scope, str(user_id), raw.strip()[:MAX_KEY_LENGTH]),
+            fingerprint=_digest(*fields),
+        )
+
+    def _response(self, record: IdempotencyRecord) -> Response:
+        self.replayed += 1
+        headers = {"Idempotent-Replayed": "true"}
+        if record.location:
+            headers["Location"] = record.location
+        return Response(status_code=record.status_code, headers=headers)
+
+    async def replay(self, db: AsyncSession, key: Optional[IdempotencyKey]) -> Optional[Response]:
+        """Збережена відповідь на цей ключ або None, якщо запит треба виконати"""
+        if key is None:
+            return None
+        record = (await db.execute(
+            select(IdempotencyRecord).where(
+                IdempotencyRecord.id == key.id, IdempotencyRecord.expires_at > dt.datetime.now()
+            )
+        )).scalar_one_or_none()
+        if record is None or record.status_code is None:
+            return None
+        if record.fingerprint != key.fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Ключ ідемпотентності вже використано для іншого запиту",
+            )
+        return self._response(record)
+
+    async def claim(self, db: AsyncSession, key: Optional[IdempotencyKey]) -> Optional[Response]:
+        """Займає ключ у поточній транзакції; якщо його вже виконав інший запит — відкат і його відповідь"""
+        if key is None:
+            return None
+        now = dt.datetime.now()
+        stmt = dialect_insert(IdempotencyRecord).values(
+            id=key.id, fingerprint=key.fingerprint, expires_at=now + dt.timedelta(seconds=self.ttl)
+        )
+        # Прострочений запис з тим самим ключем займається заново
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IdempotencyRecord.id],
+            set_={
+                "fingerprint": stmt.excluded.fingerprint,
+                "expires_at": stmt.excluded.expires_at,
+                "status_code": None,
+                "location": None,
+            },
+            where=IdempotencyRecord.expires_at <= now,
+        )
+        result = await db.execute(stmt)
+        if result.rowcount:
+            return None
+
+        await db.rollback()
+        replay = await self.replay(db, key)
+        if replay is None:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Запит уже обробляється")
+        return replay
+
+    async def remember(self, db: AsyncSession, key: Optional[IdempotencyKey], response: Response) -> None:
+        """Зберігає відповідь у записі ключа (без коміту: разом з результатом операції)"""
+        if key is None:
+            return
+        await db.execute(
+            update(IdempotencyRecord)
+            .where(IdempotencyRecord.id == key.id)
+            .values(status_code=response.status_code, location=response.headers.get("location"))
+        )
+
+    async def purge_expired(self) -> int:
+        async with async_session() as db:
+            result = await db.execute(
+                delete(IdempotencyRecord).where(IdempotencyRecord.expires_at <= dt.datetime.now())
+            )
+            await db.commit()
+        self.expired += result.rowcount
+        return result.rowcount
+
+    async def run(self, interval: float) -> None:
+        """Фонове видалення прострочених записів (запускається з lifespan)"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.purge_expired()
+            except Exception as exc:
+                logger.warning("Idempotency records purge failed: %r", exc)
+
+    def stats(self) -> dict:
+        return {"ttl": self.ttl, "replayed": self.replayed, "expired": self.expired}
+
+
+idempotency_store = IdempotencyStore(api_config.IDEMPOTENCY_TTL)
+
+
+def install(templates) -> None:
+    """Реєструє idempotency_key() у Jinja-середовищі модуля"""
+    templates.env.globals["idempotency_key"] = new_key
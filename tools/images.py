@@ -0,0 +1,227 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from markupsafe import Markup, escape
+from PIL import Image, ImageOps
+
+from settings import api_config
+from tools.assets import asset_url
+
+logger = logging.getLogger(__name__)
+
+# Каталоги з оригіналами, які обробляє backfill
+SOURCE_DIRS = (api_config.STATIC_IMAGES_DIR, api_config.STATIC_REPAIR_DIR)
+SOURCE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp")
+MANIFEST_NAME = "manifest.json"
+# Як часто воркер перевіряє, чи не оновив маніфест інший процес (с)
+MANIFEST_CHECK_INTERVAL = 1.0
+
+
+def url_to_path(url: Optional[str]) -> Optional[str]:
+    """/static/... -> шлях у файловій системі; None для зовнішніх та підозрілих URL"""
+    if not url or not url.startswith("/static/"):
+        return None
+    path = os.path.normpath(url.lstrip("/"))
+    if not path.startswith("static" + os.sep) or ".." in path.split(os.sep):
+        return None
+    return path
+
+
+def path_to_url(path: str) -> str:
+    return "/" + os.path.normpath(path).replace(os.sep, "/")
+
+
+class ImageDerivatives:
+    """Зменшені WebP-копії зображень з іменами за хешем вмісту оригіналу.
+
+    Маніфест (JSON у каталозі похідних) зіставляє URL оригіналу з хешем і
+    варіантами за шириною. Генерація ідемпотентна: якщо хеш оригіналу не
+    змінився і файли на місці, нічого не перераховується. Маніфест пишеться
+    атомарно (os.replace), а воркери перечитують його, коли змінюється mtime.
+    """
+
+    def __init__(self, directory: str, widths: list[int], quality: int):
+        self.directory = directory
+        self.widths = sorted(set(widths))
+        self.quality = quality
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self._manifest: dict = {}
+        self._manifest_mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.generated = 0
+
+    # --- маніфест ---
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def manifest(self) -> dict:
+        now = time.monotonic()
+        if now - self._checked_at < MANIFEST_CHECK_INTERVAL:
+            return self._manifest
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime
+        except OSError:
+            return self._manifest
+        if mtime != self._manifest_mtime:
+            self._manifest = self._read_manifest()
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def _save_entries(self, entries: dict) -> None:
+        """Зливає записи з актуальним маніфестом на диску і атомарно його замінює"""
+        with self._lock:
+            manifest = self._read_manifest()
+            manifest.update(entries)
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(manifest, file, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.manifest_path)
+            self._manifest = manifest
+            self._manifest_mtime = os.stat(self.manifest_path).st_mtime
+
+    # --- генерація ---
+
+    def _is_current(self, entry: Optional[dict], digest: str) -> bool:
+        if not entry or entry.get("source") != digest or entry.get("quality") != self.quality:
+            return False
+        return all(os.path.exists(url_to_path(url) or "") for url in entry["variants"].values())
+
+    def _render(self, path: str, digest: str) -> dict:
+        with Image.open(path) as original:
+            image = ImageOps.exif_transpose(original)
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+        # Менші ширини плюс WebP у розмірі оригіналу
+        widths = [width for width in self.widths if width < image.width] + [image.width]
+        variants = {}
+        os.makedirs(self.directory, exist_ok=True)
+        for width in widths:
+            target = os.path.join(self.directory, f"{digest}-{width}.webp")
+            if not os.path.exists(target):
+                height = max(1, round(image.height * width / image.width))
+                resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                tmp_path = f"{target}.{os.getpid()}.tmp"
+                resized.save(tmp_path, "WEBP", quality=self.quality, method=4)
+                os.replace(tmp_path, target)
+            variants[str(width)] = path_to_url(target)
+
+        return {
+            "source": digest,
+            "quality": self.quality,
+            "width": image.width,
+            "height": image.height,
+            "variants": variants,
+        }
+
+    def _process(self, url: str, force: bool = False) -> Optional[dict]:
+        path = url_to_path(url)
+        if path is None or not os.path.isfile(path):
+            return None
+        with open(path, "rb") as file:
+            digest = hashlib.sha256(file.read()).hexdigest()[:16]
+        entry = self._read_manifest().get(url)
+        if not force and self._is_current(entry, digest):
+            return None
+        return self._render(path, digest)
+
+    def generate(self, url: Optional[str], force: bool = False) -> bool:
+        """Створює похідні для одного зображення; True, якщо щось згенеровано"""
+        try:
+            entry = self._process(url, force)
+        except Exception as exc:
+            logger.warning("Image derivatives failed for %r: %r", url, exc)
+            return False
+        if entry is None:
+            return False
+        self._save_entries({url: entry})
+        self.generated += 1
+        return True
+
+    async def generate_async(self, url: Optional[str]) -> bool:
+        """generate() у потоці, щоб не блокувати event loop (для BackgroundTasks)"""
+        if url_to_path(url) is None:
+            return False
+        return await asyncio.to_thread(self.generate, url)
+
+    def backfill(self, directories=SOURCE_DIRS, force: bool = False) -> tuple[int, int]:
+        """Обробляє всі наявні оригінали; повертає (згенеровано, пропущено)"""
+        entries = {}
+        skipped = 0
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for name in sorted(os.listdir(directory)):
+                if not name.lower().endswith(SOURCE_EXTENSIONS):
+                    continue
+                url = path_to_url(os.path.join(directory, name))
+                try:
+                    entry = self._process(url, force)
+                except Exception as exc:
+                    logger.warning("Image derivatives failed for %r: %r", url, exc)
+                    entry = None
+                if entry is None:
+                    skipped += 1
+                else:
+                    entries[url] = entry
+        if entries:
+            self._save_entries(entries)
+            self.generated += len(entries)
+        return len(entries), skipped
+
+    # --- шаблони ---
+
+    def srcset(self, url: Optional[str]) -> str:
+        entry = self.manifest().get(url or "")
+        if not entry:
+            return ""
+        variants = sorted(entry["variants"].items(), key=lambda item: int(item[0]))
+        return ", ".join(f"{variant} {width}w" for width, variant in variants)
+
+    def img_attrs(self, url: Optional[str], sizes: str = "100vw") -> Markup:
+        """Атрибути src/srcset/sizes для <img>; без похідних — лише src"""
+        attrs = f'src="{escape(asset_url(url) or "")}"'
+        srcset = self.srcset(url)
+        if srcset:
+            attrs += f' srcset="{escape(srcset)}" sizes="{escape(sizes)}"'
+        return Markup(attrs)
+
+    def stats(self) -> dict:
+        return {
+            "images": len(self.manifest()),
+            "generated": self.generated,
+            "widths": self.widths,
+        }
+
+
+image_derivatives = ImageDerivatives(
+    directory=api_config.DERIVED_IMAGES_DIR,
+    widths=api_config.IMAGE_WIDTHS,
+    quality=api_config.IMAGE_WEBP_QUALITY,
+)
+
+
+def install(templates) -> None:
+    """Реєструє asset_url() та img_attrs() у Jinja-середовищі модуля"""
+    templates.env.globals["asset_url"] = asset_url
+    templates.env.globals["img_attrs"] = image_derivatives.img_attrs
+
+
+if __name__ == "__main__":
+    import sys
+
+    generated, skipped = image_derivatives.backfill(force="--force" in sys.argv)
+    print(f"Згенеровано: {generated}, без змін: {skipped}")
@@ -0,0 +1,46 @@
+from sqlalchemy import Select, func, select
+from sqlalchemy.orm import load_only, raiseload, selectinload
+
+from models.models import RepairRequest, User
+
+# Колонки, яких достатньо для автентифікації та списків користувачів.
+# Зв'язки User оголошені з lazy="selectin", тому select(User) без опцій
+# тягне ще чотири SELECT-и (і далі каскадом зв'язки RepairRequest).
+IDENTITY_COLUMNS = (User.id, User.username, User.email, User.is_admin)
+
+
+def identity_select() -> Select:
+    """Проєкція лише колонок ідентичності (без ORM-об'єкта та зв'язків)"""
+    return select(*IDENTITY_COLUMNS)
+
+
+def user_select(*eager) -> Select:
+    """select(User) без каскаду selectin.
+
+    Зв'язки, потрібні конкретному маршруту, передаються явно в `eager`,
+    решта позначені raiseload, щоб випадкове звернення було помилкою,
+    а не прихованим запитом.
+    """
+    return select(User).options(
+        *(selectinload(relationship) for relationship in eager),
+        raiseload("*"),
+    )
+
+
+def load_identity(relationship):
+    """selectinload зв'язку на User лише з колонками ідентичності"""
+    return selectinload(relationship).options(
+        load_only(*IDENTITY_COLUMNS),
+        raiseload("*"),
+    )
+
+
+def users_with_repairs_count() -> Select:
+    """Список користувачів з кількістю заявок через підзапит замість завантаження зв'язку"""
+    repairs_count = (
+        select(func.count(RepairRequest.id))
+        .where(RepairRequest.user_id == User.id)
+        .correlate(User)
+        .scalar_subquery()
+    )
+    return select(*IDENTITY_COLUMNS, repairs_count.label("repairs_count"))
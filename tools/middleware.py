@@ -0,0 +1,20 @@
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from tools.auth import resolve_user
+
+
+class AuthStateMiddleware:
+    """Визначає поточного користувача один раз на запит і зберігає в request.state.current_user"""
+
+    def __init__(self, app: ASGIApp, skip_prefixes: tuple[str, ...] = ("/static",)):
+        self.app = app
+        self.skip_prefixes = skip_prefixes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and not scope["path"].startswith(self.skip_prefixes):
+            connection = HTTPConnection(scope)
+            access_token = connection.cookies.get("access_token")
+            connection.state.current_user = await resolve_user(access_token)
+
+        await self.app(scope, receive, send)
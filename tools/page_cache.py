@@ -0,0 +1,301 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Hashable, Iterable, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models.models import Product
+from settings import api_config
+
+logger = logging.getLogger(__name__)
+
+# Рендер сторінки: повертає тіло відповіді та теги, за якими її інвалідовувати
+Renderer = Callable[[], Awaitable[tuple[bytes, Iterable[str]]]]
+
+
+@dataclass
+class _Entry:
+    body: bytes
+    tags: frozenset
+    fresh_until: float
+    stale_until: float
+
+
+class PageCache:
+    """LRU кеш відрендерених сторінок з лімітом пам'яті, тегами та stale-while-revalidate.
+
+    Свіжий запис віддається одразу; прострочений, але в межах stale_ttl —
+    теж одразу, а перерендер запускається у фоні. Інвалідація за тегом
+    видаляє записи повністю: після зміни товару стара сторінка не віддається.
+
+    Кеш — пам'ять одного процесу. Якщо інвалідації не доходять від інших
+    воркерів (див. InvalidationChannel), max_age обмежує ttl + stale_ttl:
+    стільки секунд інший воркер може віддавати сторінку до зміни.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, stale_ttl: float, max_age: Optional[float] = None):
+        if max_age is not None:
+            ttl = min(ttl, max_age)
+            stale_ttl = max(0, min(stale_ttl, max_age - ttl))
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._items: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._tags: dict[str, set] = {}
+        self._lock = threading.Lock()
+        self._pending: dict[Hashable, asyncio.Task] = {}
+        self._invalidations = 0
+        self.size_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidated = 0
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._items.pop(key, None)
+        if entry is None:
+            return
+        self.size_bytes -= len(entry.body)
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _lookup(self, key: Hashable) -> tuple[bytes | None, str]:
+        with self._lock:
+            entry = self._items.get(key)
+            now = time.monotonic()
+            if entry is None or entry.stale_until < now:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None, "MISS"
+            self._items.move_to_end(key)
+            if entry.fresh_until >= now:
+                self.hits += 1
+                return entry.body, "HIT"
+            self.stale_hits += 1
+            return entry.body, "STALE"
+
+    def set(self, key: Hashable, body: bytes, tags: Iterable[str]) -> None:
+        if self.max_bytes <= 0 or self.ttl <= 0 or len(body) > self.max_bytes:
+            return
+        now = time.monotonic()
+        entry = _Entry(body, frozenset(tags), now + self.ttl, now + self.ttl + self.stale_ttl)
+        with self._lock:
+            self._remove(key)
+            self._items[key] = entry
+            self.size_bytes += len(body)
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self.size_bytes > self.max_bytes:
+                oldest = next(iter(self._items))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_tags(self, *tags: str) -> None:
+        """Видаляє всі записи з будь-яким із тегів"""
+        with self._lock:
+            self._invalidations += 1
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidated += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._invalidations += 1
+            self._items.clear()
+            self._tags.clear()
+            self.size_bytes = 0
+
+    def _render(self, key: Hashable, render: Renderer) -> asyncio.Task:
+        """Один рендер на ключ: паралельні промахи чекають ту саму задачу"""
+        task = self._pending.get(key)
+        if task is not None:
+            return task
+
+        async def run() -> bytes:
+            started = self._invalidations
+            body, tags = await render()
+            # Інвалідація під час рендеру могла зачепити дані сторінки:
+            # результат віддаємо, але в кеш не кладемо
+            if started == self._invalidations:
+                self.set(key, body, tags)
+            return body
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._pending[key] = task
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return task
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._pending.get(key) is task:
+            del self._pending[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Page cache render failed for %r: %r", key, task.exception())
+
+    async def get_or_render(self, key: Hashable, render: Renderer) -> tuple[bytes, str]:
+        """Тіло сторінки і стан кешу: HIT, STALE (фоновий перерендер) або MISS"""
+        body, state = self._lookup(key)
+        if state == "HIT":
+            return body, state
+        if state == "STALE":
+            self._render(key, render)
+            return body, state
+        # shield: скасування одного запиту не зупиняє рендер для інших
+        return await asyncio.shield(self._render(key, render)), state
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._items),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidated": self.invalidated,
+                "rendering": len(self._pending),
+                "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+class InvalidationChannel:
+    """Розсилка інвалідацій тегів між воркерами через Redis pub/sub.
+
+    Воркер, що закомітив зміну, скидає свій кеш одразу й публікує теги;
+    run() (з lifespan) отримує теги від усіх воркерів. Після (пере)підключення
+    підписки кеш очищується: повідомлення, надіслані без підписки, втрачено.
+    Без каналу publish() і run() нічого не роблять.
+    """
+
+    def __init__(self, cache: PageCache, url: str, channel: str):
+        self.cache = cache
+        self.url = url
+        self.channel = channel
+        self._client = None
+        self._publishing: set[asyncio.Task] = set()
+        self.published = 0
+        self.received = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis.asyncio as redis
+
+            self._client = redis.from_url(self.url, decode_responses=True)
+        return self._client
+
+    def publish(self, tags: Iterable[str]) -> None:
+        """Публікує теги у фоні (викликається з after_commit, тож без await)"""
+        if not self.channel:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Синхронні скрипти без циклу подій: воркери скинуть кеш за max_age
+            return
+        task = loop.create_task(self._publish(sorted(tags)))
+        self._publishing.add(task)
+        task.add_done_callback(self._publishing.discard)
+
+    async def _publish(self, tags: list[str]) -> None:
+        try:
+            await self.client.publish(self.channel, json.dumps(tags))
+            self.published += 1
+        except Exception as exc:
+            logger.warning("Page cache invalidation publish failed for %r: %r", tags, exc)
+
+    async def run(self, retry_interval: float = 1.0) -> None:
+        """Підписка на канал (запускається з lifespan)"""
+        if not self.channel:
+            return
+        while True:
+            try:
+                async with self.client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    self.cache.clear()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.received += 1
+                            self.cache.invalidate_tags(*json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Page cache invalidation channel failed: %r", exc)
+            await asyncio.sleep(retry_interval)
+
+    async def close(self) -> None:
+        if self._publishing:
+            await asyncio.gather(*self._publishing, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {"channel": self.channel or None, "published": self.published, "received": self.received}
+
+
+page_cache = PageCache(
+    max_bytes=api_config.PAGE_CACHE_MAX_BYTES,
+    ttl=api_config.PAGE_CACHE_TTL,
+    stale_ttl=api_config.PAGE_CACHE_STALE_TTL,
+    max_age=None if api_config.PAGE_CACHE_CHANNEL else api_config.PAGE_CACHE_MAX_AGE,
+)
+page_cache_channel = InvalidationChannel(page_cache, api_config.REDIS_URL, api_config.PAGE_CACHE_CHANNEL)
+
+
+# Зміна цих колонок може перемістити товар між фільтрами/сторінками каталогу,
+# тому скидає всі сторінки; решта (залишок, фото) — лише сторінки з цим товаром
+_LISTING_COLUMNS = ("name", "description", "price", "category", "created_at")
+
+
+def invalidate_on_commit(session: Session, *tags: str) -> None:
+    """Інвалідація тегів після коміту сесії (для змін в обхід ORM, напр. bulk UPDATE)"""
+    session.info.setdefault("page_cache_tags", set()).update(tags)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_product_tags(session: Session, flush_context) -> None:
+    tags = set()
+    for obj in (*session.new, *session.deleted):
+        if isinstance(obj, Product):
+            tags.add("catalog")
+    for obj in session.dirty:
+        if not isinstance(obj, Product) or not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        if any(state.attrs[name].history.has_changes() for name in _LISTING_COLUMNS):
+            tags.add("catalog")
+        else:
+            tags.add(f"product:{obj.id}")
+    if tags:
+        invalidate_on_commit(session, *tags)
+
+
+# Інвалідація лише після коміту: до нього перерендер побачив би старі дані
+@event.listens_for(Session, "after_commit")
+def _invalidate_product_pages(session: Session) -> None:
+    tags = session.info.pop("page_cache_tags", None)
+    if tags:
+        page_cache.invalidate_tags(*tags)
+        page_cache_channel.publish(tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_product_tags(session: Session) -> None:
+    session.info.pop("page_cache_tags", None)
@@ -0,0 +1,137 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional, Sequence
+
+from sqlalchemy import Select, and_, literal, not_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from settings import api_config
+
+
+@dataclass
+class Page:
+    """Одна сторінка результатів, курсор, яким її отримано (None для першої),
+    і курсор наступної (None, якщо сторінка остання)"""
+    items: list
+    next_cursor: Optional[str] = None
+    cursor: Optional[str] = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Значення ключа останнього рядка сторінки -> непрозорий рядок для URL"""
+    payload = [{"dt": value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[list]:
+    """Розбирає курсор; порожній, зіпсований або чужий курсор означає першу сторінку"""
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(payload, list) or len(payload) != size:
+        return None
+
+    values = []
+    for value in payload:
+        if isinstance(value, dict):
+            try:
+                value = datetime.fromisoformat(value["dt"])
+            except (KeyError, TypeError, ValueError):
+                return None
+        elif not isinstance(value, (int, float, str)):
+            return None
+        values.append(value)
+    return values
+
+
+def _spellings(column, value) -> list:
+    """Зв'язані значення, якими межа курсора може бути записана в колонці (за зростанням)"""
+    bound = literal(value, column.type)
+    # SQLite зберігає DateTime рядком: SQLAlchemy пише "...:SS.ffffff", а
+    # default=func.now() (CURRENT_TIMESTAMP) — "...:SS" без дробової частини.
+    # Для значення без мікросекунд у колонці можуть бути обидва записи
+    if isinstance(value, datetime) and not value.microsecond and api_config.is_sqlite():
+        return [literal(str(value)), bound]
+    return [bound]
+
+
+def _after(columns: Sequence, values: Sequence, descending: bool):
+    """Умова "рядок після курсора" з урахуванням обох записів дати в SQLite"""
+    spellings = [_spellings(column, value) for column, value in zip(columns, values)]
+    # Основне порівняння кортежів (його використовує індекс) — з крайнім записом межі
+    key = tuple_(*columns)
+    bound = tuple_(*(options[-1] if descending else options[0] for options in spellings))
+    condition = key < bound if descending else key > bound
+
+    # Другий запис тієї ж дати порівняння кортежів вважає вже іншим значенням:
+    # такі рядки відсіюються за рештою ключа
+    for position, options in enumerate(spellings):
+        if len(options) == 1:
+            continue
+        same = [
+            column.in_(earlier) if len(earlier) > 1 else column == earlier[0]
+            for column, earlier in zip(columns[:position], spellings[:position])
+        ]
+        same.append(columns[position] == (options[0] if descending else options[-1]))
+        if position + 1 < len(columns):
+            same.append(not_(_after(columns[position + 1:], values[position + 1:], descending)))
+        condition = and_(condition, not_(and_(*same)))
+    return condition
+
+
+def keyset(
+    stmt: Select,
+    columns: Sequence,
+    cursor: Optional[str],
+    descending: bool = True,
+    page_size: Optional[int] = None,
+) -> Select:
+    """Сортування за ключем `columns`, умова "після курсора" і LIMIT page_size + 1.
+
+    Останній стовпець ключа має бути унікальним (зазвичай id), інакше
+    рядки з однаковим ключем на межі сторінок загубляться.
+    """
+    page_size = page_size or api_config.PAGE_SIZE
+    values = decode_cursor(cursor, len(columns))
+    if values is not None:
+        stmt = stmt.where(_after(columns, values, descending))
+
+    order = [column.desc() if descending else column.asc() for column in columns]
+    return stmt.order_by(*order).limit(page_size + 1)
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt: Select,
+    columns: Sequence,
+    cursor: Optional[str],
+    key: Callable[[object], Sequence],
+    descending: bool = True,
+    page_size: Optional[int] = None,
+    scalars: bool = True,
+) -> Page:
+    """Виконує keyset-запит і повертає сторінку.
+
+    `key` дістає значення `columns` з елемента результату (ORM-об'єкта або
+    рядка при scalars=False) для курсора наступної сторінки.
+    """
+    page_size = page_size or api_config.PAGE_SIZE
+    if decode_cursor(cursor, len(columns)) is None:
+        cursor = None
+    result = await db.execute(keyset(stmt, columns, cursor, descending, page_size))
+    rows = list(result.scalars().all() if scalars else result.all())
+
+    if len(rows) <= page_size:
+        return Page(rows, cursor=cursor)
+    rows = rows[:page_size]
+    return Page(rows, encode_cursor(key(rows[-1])), cursor)
@@ -0,0 +1,88 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from settings import api_config
+
+
+class PasswordHasher:
+    """Хешування паролів у пулі процесів, щоб PBKDF2/scrypt не блокували event loop.
+
+    Кількість одночасних операцій обмежена семафором; запити понад ліміт
+    чекають у черзі, глибина якої видна в stats().
+    """
+
+    def __init__(self, method: str, workers: int, concurrency: int):
+        self.method = method
+        # Повні параметри методу (напр. "pbkdf2" -> "pbkdf2:sha256:1000000"),
+        # як вони записуються в префікс хешу
+        self.method_prefix = generate_password_hash("", method).split("$", 1)[0]
+        self.workers = workers
+        self.concurrency = concurrency
+        self._executor: ProcessPoolExecutor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.rehashed = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(generate_password_hash, password, self.method)
+
+    async def verify(self, pwhash: str, password: str) -> bool:
+        return await self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """Чи збережений хеш створено з іншими параметрами, ніж налаштовані"""
+        return pwhash.split("$", 1)[0] != self.method_prefix
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "method": self.method,
+            "workers": self.workers,
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "completed": self.completed,
+            "rehashed": self.rehashed,
+        }
+
+
+password_hasher = PasswordHasher(
+    method=api_config.PASSWORD_HASH_METHOD,
+    workers=api_config.PASSWORD_HASH_WORKERS,
+    concurrency=api_config.PASSWORD_HASH_CONCURRENCY,
+)
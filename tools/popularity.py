@@ -0,0 +1,177 @@
+import asyncio
+import datetime as dt
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+from sqlalchemy import func, select
+
+from models.models import Order, OrderItem, OrderStatus, Product, ProductCategory, ProductView
+from settings import api_config, async_session, dialect_insert
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PopularProduct:
+    """Знімок полів товару для картки на головній"""
+    id: int
+    name: str
+    price: float
+    category: ProductCategory
+    image_url: str | None
+    stock_quantity: int
+
+
+def _as_date(value) -> dt.date:
+    # func.date() повертає рядок у SQLite і date у PostgreSQL
+    return value if isinstance(value, dt.date) else dt.date.fromisoformat(str(value))
+
+
+class PopularityFeed:
+    """Рейтинг популярних товарів, що тримається в пам'яті кожного воркера.
+
+    Бал товару — продані одиниці плюс перегляди з вагою view_weight, кожен
+    день зважений як 0.5 ** (вік / half_life_days). Фонова задача періодично
+    записує накопичені перегляди і перераховує рейтинг, тож головна сторінка
+    не робить жодного додаткового запиту.
+    """
+
+    def __init__(self, limit: int, half_life_days: float, window_days: int, view_weight: float):
+        self.limit = limit
+        self.half_life_days = half_life_days
+        self.window_days = window_days
+        self.view_weight = view_weight
+        self._products: tuple[PopularProduct, ...] = ()
+        self._views: Counter = Counter()
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.refreshes = 0
+        self.views_flushed = 0
+
+    @property
+    def products(self) -> tuple[PopularProduct, ...]:
+        return self._products
+
+    def record_view(self, product_id: int) -> None:
+        """Перегляд сторінки товару (лише лічильник у пам'яті)"""
+        with self._lock:
+            self._views[product_id] += 1
+
+    async def flush_views(self) -> None:
+        """Записує накопичені перегляди за сьогодні одним upsert"""
+        with self._lock:
+            views, self._views = self._views, Counter()
+        if not views:
+            return
+
+        try:
+            async with async_session() as db:
+                # Товар могли видалити, поки перегляди чекали запису
+                existing = await db.execute(select(Product.id).where(Product.id.in_(views)))
+                rows = [
+                    {"product_id": product_id, "day": dt.date.today(), "views": views[product_id]}
+                    for product_id in existing.scalars()
+                ]
+                if rows:
+                    stmt = dialect_insert(ProductView).values(rows)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[ProductView.product_id, ProductView.day],
+                        set_={"views": ProductView.views + stmt.excluded.views},
+                    )
+                    await db.execute(stmt)
+                    await db.commit()
+        except Exception:
+            # Повертаємо перегляди, щоб записати їх наступного разу
+            with self._lock:
+                self._views.update(views)
+            raise
+        self.views_flushed += sum(row["views"] for row in rows)
+
+    def _weight(self, day: dt.date, today: dt.date) -> float:
+        return 0.5 ** (max(0, (today - day).days) / self.half_life_days)
+
+    async def refresh(self) -> None:
+        """Перераховує рейтинг з продажів і переглядів за вікно window_days"""
+        today = dt.date.today()
+        since = today - dt.timedelta(days=self.window_days)
+        scores: Counter = Counter()
+
+        async with async_session() as db:
+            sales_day = func.date(Order.created_at)
+            sales = await db.execute(
+                select(OrderItem.product_id, sales_day, func.sum(OrderItem.quantity))
+                .join(Order, Order.id == OrderItem.order_id)
+                .where(
+                    Order.created_at >= dt.datetime.combine(since, dt.time()),
+                    Order.status != OrderStatus.CANCELLED,
+                )
+                .group_by(OrderItem.product_id, sales_day)
+            )
+            for product_id, day, quantity in sales:
+                scores[product_id] += quantity * self._weight(_as_date(day), today)
+
+            views = await db.execute(
+                select(ProductView.product_id, ProductView.day, ProductView.views)
+                .where(ProductView.day >= since)
+            )
+            for product_id, day, count in views:
+                scores[product_id] += count * self.view_weight * self._weight(day, today)
+
+            ranked = [product_id for product_id, _ in scores.most_common(self.limit)]
+            columns = (
+                Product.id, Product.name, Product.price, Product.category,
+                Product.image_url, Product.stock_quantity,
+            )
+            rows = {}
+            if ranked:
+                result = await db.execute(select(*columns).where(Product.id.in_(ranked)))
+                rows = {row.id: row for row in result}
+
+            # Поки продажів і переглядів мало, решту займають найновіші товари
+            products = [rows[product_id] for product_id in ranked if product_id in rows]
+            if len(products) < self.limit:
+                newest = await db.execute(
+                    select(*columns)
+                    .where(Product.id.not_in([row.id for row in products]))
+                    .order_by(Product.created_at.desc(), Product.id.desc())
+                    .limit(self.limit - len(products))
+                )
+                products.extend(newest)
+
+        self._products = tuple(PopularProduct(*row) for row in products)
+        self.loaded = True
+        self.refreshes += 1
+
+    async def run(self, interval: float) -> None:
+        """Фоновий цикл (запускається з lifespan): запис переглядів і перерахунок"""
+        while True:
+            try:
+                await self.flush_views()
+            except Exception as exc:
+                logger.warning("Product views flush failed: %r", exc)
+            try:
+                await self.refresh()
+            except Exception as exc:
+                logger.warning("Popular products refresh failed: %r", exc)
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = sum(self._views.values())
+        return {
+            "loaded": self.loaded,
+            "products": len(self._products),
+            "refreshes": self.refreshes,
+            "views_pending": pending,
+            "views_flushed": self.views_flushed,
+        }
+
+
+popularity_feed = PopularityFeed(
+    limit=api_config.POPULAR_LIMIT,
+    half_life_days=api_config.POPULAR_HALF_LIFE_DAYS,
+    window_days=api_config.POPULAR_WINDOW_DAYS,
+    view_weight=api_config.POPULAR_VIEW_WEIGHT,
+)
@@ -0,0 +1,93 @@
+import asyncio
+from itertools import permutations
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from models.models import OrderItem, Product, ProductRecommendation
+from settings import api_config, async_session, dialect_insert, dispose_engines
+
+
+async def record_order(db: AsyncSession, product_ids: Iterable[int]) -> None:
+    """Додає замовлення до пар "купували разом" (у транзакції замовлення, без коміту)"""
+    product_ids = sorted(set(product_ids))
+    if len(product_ids) < 2 or len(product_ids) > api_config.RECOMMENDATIONS_MAX_ORDER_PRODUCTS:
+        return
+
+    rows = [
+        {"product_id": product_id, "recommended_id": recommended_id, "score": 1}
+        for product_id, recommended_id in permutations(product_ids, 2)
+    ]
+    stmt = dialect_insert(ProductRecommendation).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProductRecommendation.product_id, ProductRecommendation.recommended_id],
+        set_={
+            "score": ProductRecommendation.score + stmt.excluded.score,
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
+
+
+async def rebuild(db: AsyncSession) -> None:
+    """Перераховує всі пари з order_items (після імпорту даних або змін в обхід checkout)"""
+    eligible = (
+        select(OrderItem.order_id)
+        .group_by(OrderItem.order_id)
+        .having(func.count(OrderItem.product_id.distinct()) <= api_config.RECOMMENDATIONS_MAX_ORDER_PRODUCTS)
+    )
+    first, second = aliased(OrderItem), aliased(OrderItem)
+    pairs = (
+        select(first.product_id, second.product_id, func.count(first.order_id.distinct()), func.now())
+        .join(second, and_(second.order_id == first.order_id, second.product_id != first.product_id))
+        .where(first.order_id.in_(eligible))
+        .group_by(first.product_id, second.product_id)
+    )
+
+    await db.execute(delete(ProductRecommendation))
+    await db.execute(
+        insert(ProductRecommendation).from_select(
+            ["product_id", "recommended_id", "score", "updated_at"], pairs
+        )
+    )
+
+
+async def similar_products(db: AsyncSession, product: Product, limit: Optional[int] = None) -> list[Product]:
+    """Топ-N товарів, які купували разом з `product`; нестачу добирає з тієї ж категорії"""
+    limit = limit or api_config.RECOMMENDATIONS_LIMIT
+
+    stmt = (
+        select(Product)
+        .join(ProductRecommendation, ProductRecommendation.recommended_id == Product.id)
+        .where(ProductRecommendation.product_id == product.id)
+        .order_by(ProductRecommendation.score.desc(), ProductRecommendation.recommended_id.desc())
+        .limit(limit)
+    )
+    products = list((await db.execute(stmt)).scalars().all())
+
+    # Нові товари та товари без спільних покупок
+    if len(products) < limit:
+        exclude = {product.id, *(item.id for item in products)}
+        fallback = (
+            select(Product)
+            .where(Product.category == product.category, Product.id.not_in(exclude))
+            .order_by(Product.created_at.desc())
+            .limit(limit - len(products))
+        )
+        products.extend((await db.execute(fallback)).scalars().all())
+
+    return products
+
+
+async def main():
+    async with async_session() as db:
+        await rebuild(db)
+        await db.commit()
+    await dispose_engines()
+    print("Рекомендації перебудовано")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,288 @@
+import asyncio
+import datetime as dt
+import logging
+import sys
+from typing import Optional
+
+from sqlalchemy import Date, DateTime, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.models import (
+    DailyCustomerSales, DailyOrderStatus, DailyProductSales, HourlyMetric, Order, OrderItem, Product,
+    RepairRequest, RollupState, User,
+)
+from settings import api_config, async_session, dialect_insert, dispose_engines
+
+logger = logging.getLogger(__name__)
+
+STATE_NAME = "orders"
+HOURLY_STATE_NAME = "hourly"
+ROLLUPS = (DailyProductSales, DailyCustomerSales, DailyOrderStatus)
+
+# Інтервали графіків; погодинний ряд обмежений, щоб відповідь лишалася малою
+BUCKETS = ("hour", "day", "week")
+# Найбільший діапазон (днів) для кожного кроку: ряд будується в пам'яті з нулями в пропусках
+MAX_SPAN_DAYS = {"hour": 31, "day": 3 * 366, "week": 10 * 366}
+# Останній день, для якого межа ряду та крок тижня не виходять за date.max
+LAST_DAY = dt.date.max - dt.timedelta(weeks=1, days=1)
+
+
+def _order_day():
+    return func.date(Order.created_at, type_=Date)
+
+
+def _hour(column):
+    """Початок години (SQLite зберігає дати рядками, у PostgreSQL є date_trunc)"""
+    if api_config.is_sqlite():
+        return func.strftime("%Y-%m-%d %H:00:00", column, type_=DateTime)
+    return func.date_trunc("hour", column, type_=DateTime)
+
+
+def _rollup_selects(days: Optional[list[dt.date]]):
+    """INSERT ... SELECT для трьох зведень за дні days (None — за всю історію)"""
+    day = _order_day()
+    product_sales = (
+        select(day, OrderItem.product_id, func.sum(OrderItem.quantity), func.sum(OrderItem.quantity * OrderItem.price))
+        .join(Order, Order.id == OrderItem.order_id)
+        .group_by(day, OrderItem.product_id)
+    )
+    customer_sales = (
+        select(day, Order.user_id, func.count(Order.id), func.sum(Order.total_amount))
+        .group_by(day, Order.user_id)
+    )
+    order_status = (
+        select(day, Order.status, func.count(Order.id), func.sum(Order.total_amount))
+        .group_by(day, Order.status)
+    )
+    selects = [product_sales, customer_sales, order_status]
+    if days is not None:
+        # Діапазон за created_at обмежує перебір, точний набір днів — за date()
+        start = dt.datetime.combine(min(days), dt.time.min)
+        end = dt.datetime.combine(max(days) + dt.timedelta(days=1), dt.time.min)
+        selects = [
+            stmt.where(Order.created_at >= start, Order.created_at < end, day.in_(days)) for stmt in selects
+        ]
+    return zip(ROLLUPS, (
+        ("day", "product_id", "quantity", "revenue"),
+        ("day", "user_id", "orders", "revenue"),
+        ("day", "status", "orders", "revenue"),
+    ), selects)
+
+
+async def _state(db: AsyncSession, name: str) -> RollupState:
+    await db.execute(dialect_insert(RollupState).values(name=name).on_conflict_do_nothing())
+    # Один оновлювач за раз (у PostgreSQL — блокування рядка, SQLite і так пише послідовно)
+    return (await db.execute(
+        select(RollupState).where(RollupState.name == name).with_for_update()
+    )).scalar_one()
+
+
+async def refresh(db: AsyncSession, full: bool = False) -> int:
+    """Оновлює зведення за дні замовлень, змінених після high-water mark (без коміту).
+
+    Дні перераховуються повністю з orders/order_items, тож повторна обробка
+    безпечна: перекриття ROLLUP_OVERLAP секунд ловить транзакції, що
+    закомітилися пізніше за свій updated_at. Повертає кількість днів
+    (для full — усіх днів з замовленнями).
+    """
+    state = await _state(db, STATE_NAME)
+    day = _order_day()
+
+    if full or state.high_water is None:
+        days = None
+        high_water = (await db.execute(select(func.max(Order.updated_at)))).scalar()
+        for model in ROLLUPS:
+            await db.execute(delete(model))
+    else:
+        since = state.high_water - dt.timedelta(seconds=api_config.ROLLUP_OVERLAP)
+        changed = select(day, Order.updated_at).where(Order.updated_at >= since)
+        rows = (await db.execute(changed)).all()
+        days = sorted({row[0] for row in rows if row[0] is not None})
+        high_water = max([state.high_water, *(row[1] for row in rows)])
+        if days:
+            for model in ROLLUPS:
+                await db.execute(delete(model).where(model.day.in_(days)))
+
+    if days is None or days:
+        for model, columns, stmt in _rollup_selects(days):
+            await db.execute(insert(model).from_select(columns, stmt))
+
+    state.high_water = high_water
+    state.refreshed_at = dt.datetime.now()
+    if days is None:
+        return (await db.execute(select(func.count(day.distinct())))).scalar_one()
+    return len(days)
+
+
+async def refresh_hourly(db: AsyncSession, full: bool = False) -> int:
+    """Перераховує погодинні метрики від high-water mark за created_at (без коміту).
+
+    Кількість і сума замовлення не залежать від статусу, тож досить нових
+    рядків: години, починаючи з high-water mark мінус ROLLUP_OVERLAP,
+    видаляються і записуються заново. Повертає кількість записаних годин.
+    """
+    state = await _state(db, HOURLY_STATE_NAME)
+    since = None
+    if not full and state.high_water is not None:
+        since = state.high_water - dt.timedelta(seconds=api_config.ROLLUP_OVERLAP)
+        since = since.replace(minute=0, second=0, microsecond=0)
+
+    sources = (
+        (Order, {"orders": func.count(Order.id), "revenue": func.coalesce(func.sum(Order.total_amount), 0)}),
+        (RepairRequest, {"repairs": func.count(RepairRequest.id)}),
+    )
+    buckets = {}
+    high_water = state.high_water
+    for model, columns in sources:
+        hour = _hour(model.created_at)
+        stmt = select(hour, *columns.values()).group_by(hour)
+        if since is not None:
+            # Із запасом у годину: SQLite порівнює дати як рядки, а формати з БД і з Python різні
+            stmt = stmt.where(model.created_at >= since - dt.timedelta(hours=1))
+        for start, *values in await db.execute(stmt):
+            if start is None or (since is not None and start < since):
+                continue
+            bucket = buckets.setdefault(start, {"hour": start, "orders": 0, "revenue": 0.0, "repairs": 0})
+            bucket.update(zip(columns, values))
+        latest = (await db.execute(select(func.max(model.created_at)))).scalar()
+        high_water = max(filter(None, (high_water, latest)), default=None)
+
+    stmt = delete(HourlyMetric)
+    if since is not None:
+        stmt = stmt.where(HourlyMetric.hour >= since)
+    await db.execute(stmt)
+    if buckets:
+        await db.execute(insert(HourlyMetric), list(buckets.values()))
+
+    state.high_water = high_water
+    state.refreshed_at = dt.datetime.now()
+    return len(buckets)
+
+
+def _bucket_start(hour: dt.datetime, bucket: str):
+    if bucket == "hour":
+        return hour
+    day = hour.date()
+    return day if bucket == "day" else day - dt.timedelta(days=day.weekday())
+
+
+async def timeseries(db: AsyncSession, bucket: str, date_from: dt.date, date_to: dt.date) -> list[dict]:
+    """Ряд замовлень, доходу й заявок за hour/day/week (тиждень — з понеділка), з нулями в пропусках.
+
+    Один запит по первинному ключу hourly_metrics: рік — до 8760 рядків.
+    """
+    if (date_to - date_from).days >= MAX_SPAN_DAYS[bucket]:
+        raise ValueError(f"{bucket}: не більше {MAX_SPAN_DAYS[bucket]} днів")
+    date_to = min(date_to, LAST_DAY)
+    start = dt.datetime.combine(date_from, dt.time.min)
+    end = dt.datetime.combine(date_to + dt.timedelta(days=1), dt.time.min)
+    rows = await db.execute(
+        select(HourlyMetric.hour, HourlyMetric.orders, HourlyMetric.revenue, HourlyMetric.repairs)
+        .where(HourlyMetric.hour >= start, HourlyMetric.hour < end)
+        .order_by(HourlyMetric.hour)
+    )
+
+    points = {}
+    step = {"hour": dt.timedelta(hours=1), "day": dt.timedelta(days=1), "week": dt.timedelta(weeks=1)}[bucket]
+    key = _bucket_start(start, bucket)
+    while key < (end if bucket == "hour" else end.date()):
+        points[key] = {"t": key.isoformat(), "orders": 0, "revenue": 0.0, "repairs": 0}
+        key += step
+
+    for hour, orders, revenue, repairs in rows:
+        point = points[_bucket_start(hour, bucket)]
+        point["orders"] += orders
+        point["revenue"] += revenue
+        point["repairs"] += repairs
+    for point in points.values():
+        point["revenue"] = round(point["revenue"], 2)
+    return list(points.values())
+
+
+async def sales_summary(
+    db: AsyncSession, date_from: Optional[dt.date] = None, date_to: Optional[dt.date] = None, limit: int = 5
+) -> dict:
+    """Підсумки за діапазон днів (включно) зі зведених таблиць"""
+
+    def in_range(stmt, model):
+        if date_from is not None:
+            stmt = stmt.where(model.day >= date_from)
+        if date_to is not None:
+            stmt = stmt.where(model.day <= date_to)
+        return stmt
+
+    orders_by_status = (await db.execute(in_range(
+        select(
+            DailyOrderStatus.status,
+            func.sum(DailyOrderStatus.orders).label("count"),
+            func.sum(DailyOrderStatus.revenue).label("revenue"),
+        ).group_by(DailyOrderStatus.status),
+        DailyOrderStatus,
+    ))).all()
+
+    product_revenue = func.sum(DailyProductSales.revenue)
+    top_products = (await db.execute(in_range(
+        select(
+            Product.name,
+            func.sum(DailyProductSales.quantity).label("sold_quantity"),
+            product_revenue.label("revenue"),
+        )
+        .join(Product, Product.id == DailyProductSales.product_id)
+        .group_by(Product.id, Product.name)
+        .order_by(product_revenue.desc())
+        .limit(limit),
+        DailyProductSales,
+    ))).all()
+
+    customer_spent = func.sum(DailyCustomerSales.revenue)
+    top_customers = (await db.execute(in_range(
+        select(
+            User.username,
+            func.sum(DailyCustomerSales.orders).label("orders_count"),
+            customer_spent.label("total_spent"),
+        )
+        .join(User, User.id == DailyCustomerSales.user_id)
+        .group_by(User.id, User.username)
+        .order_by(customer_spent.desc())
+        .limit(limit),
+        DailyCustomerSales,
+    ))).all()
+
+    refreshed_at = (await db.execute(
+        select(RollupState.refreshed_at).where(RollupState.name == STATE_NAME)
+    )).scalar()
+
+    return {
+        "total_orders": sum(row.count for row in orders_by_status),
+        "total_revenue": sum(row.revenue or 0 for row in orders_by_status),
+        "orders_by_status": orders_by_status,
+        "top_products": top_products,
+        "top_customers": top_customers,
+        "refreshed_at": refreshed_at,
+    }
+
+
+async def run(interval: float) -> None:
+    """Фонове інкрементальне оновлення зведень (запускається з lifespan)"""
+    while True:
+        try:
+            async with async_session() as db:
+                await refresh(db)
+                await refresh_hourly(db)
+                await db.commit()
+        except Exception as exc:
+            logger.warning("Sales rollups refresh failed: %r", exc)
+        await asyncio.sleep(interval)
+
+
+async def main(full: bool = False):
+    async with async_session() as db:
+        days = await refresh(db, full=full)
+        hours = await refresh_hourly(db, full=full)
+        await db.commit()
+    await dispose_engines()
+    print(f"Оновлено днів: {days}, годин: {hours}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(full="--full" in sys.argv))
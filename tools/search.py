@@ -0,0 +1,114 @@
+import re
+from typing import Optional
+
+from markupsafe import Markup, escape
+from sqlalchemy import ColumnElement, Select, column, func, literal_column, select, table
+
+from models.models import Product
+from settings import api_config
+
+# Маркери підсвічування: керуючі символи, яких не буває в назвах/описах,
+# тому текст можна спершу екранувати, а потім замінити маркери на <mark>
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+# Апострофи (', ’, ʼ) розділяють токени і в індексі, і в запиті:
+# "комп'ютер" шукається як фраза "комп ютер", незалежно від варіанта апострофа
+_WORD_PART = re.compile(r"[^\W_ʼ]+")
+MAX_TERMS = 8
+
+# Таблиця FTS5 (SQLite) створюється міграцією, в моделях її немає
+products_fts = table("products_fts", column("rowid"))
+_fts = literal_column("products_fts")
+
+# Документ для PostgreSQL: той самий вираз, що й у GIN-індексі ix_products_search.
+# Конфігурація 'simple' — без стемінгу (словника для української в PostgreSQL немає)
+PG_CONFIG = "simple"
+PG_DOCUMENT_SQL = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+
+def search_terms(search: Optional[str]) -> list[list[str]]:
+    """Розбиває рядок пошуку на слова, кожне слово — на частини між апострофами"""
+    if not search:
+        return []
+    terms = []
+    for word in search.split():
+        parts = [part.lower() for part in _WORD_PART.findall(word)]
+        if parts:
+            terms.append(parts)
+    return terms[:MAX_TERMS]
+
+
+def fts5_query(terms: list[list[str]]) -> str:
+    """MATCH-вираз FTS5: кожне слово — префіксна фраза, слова поєднуються через AND"""
+    return " ".join('"' + " ".join(parts) + '"*' for parts in terms)
+
+
+def tsquery(terms: list[list[str]]) -> str:
+    """Вираз to_tsquery для PostgreSQL з префіксним пошуком останньої частини слова"""
+    phrases = []
+    for parts in terms:
+        lexemes = [f"'{part}'" for part in parts]
+        lexemes[-1] += ":*"
+        phrases.append("(" + " <-> ".join(lexemes) + ")")
+    return " & ".join(phrases)
+
+
+def apply_search(stmt: Select, search: Optional[str]) -> tuple[Select, Optional[ColumnElement]]:
+    """Додає до select(Product) повнотекстовий фільтр і колонки name_hl / snippet
+    з маркерами підсвічування.
+
+    Повертає (stmt, rank): rank — вираз релевантності (менше = краще), за яким
+    разом з Product.id сортуються й розбиваються на сторінки результати.
+    Порожній запит не змінює stmt і повертає rank = None.
+    """
+    terms = search_terms(search)
+    if not terms:
+        return stmt, None
+
+    if api_config.is_sqlite():
+        # Назва важить більше за опис
+        rank = func.bm25(_fts, 10.0, 1.0)
+        stmt = (
+            stmt.join(products_fts, products_fts.c.rowid == Product.id)
+            .where(_fts.op("MATCH")(fts5_query(terms)))
+            .add_columns(
+                func.highlight(_fts, 0, MARK_START, MARK_END).label("name_hl"),
+                func.snippet(_fts, 1, MARK_START, MARK_END, "…", 24).label("snippet"),
+            )
+        )
+    else:
+        document = literal_column(PG_DOCUMENT_SQL)
+        query = func.to_tsquery(PG_CONFIG, tsquery(terms))
+        options = f"StartSel={MARK_START}, StopSel={MARK_END}"
+        rank = -func.ts_rank_cd(document, query)
+        stmt = (
+            stmt.where(document.op("@@")(query))
+            .add_columns(
+                func.ts_headline(PG_CONFIG, Product.name, query, options + ", HighlightAll=true").label("name_hl"),
+                func.ts_headline(PG_CONFIG, func.coalesce(Product.description, ""), query,
+                                 options + ", MaxWords=24, MinWords=8").label("snippet"),
+            )
+        )
+
+    return stmt.add_columns(rank.label("relevance")), rank
+
+
+def search_ids_select(search: Optional[str]) -> Optional[Select]:
+    """select id усіх товарів, що відповідають пошуку (для фасетів); None без пошуку"""
+    terms = search_terms(search)
+    if not terms:
+        return None
+    if api_config.is_sqlite():
+        return select(products_fts.c.rowid).where(_fts.op("MATCH")(fts5_query(terms)))
+    query = func.to_tsquery(PG_CONFIG, tsquery(terms))
+    return select(Product.id).where(literal_column(PG_DOCUMENT_SQL).op("@@")(query))
+
+
+def highlight(text: Optional[str]) -> Markup:
+    """Екранує текст і перетворює маркери підсвічування на <mark>"""
+    if not text:
+        return Markup("")
+    return Markup(
+        str(escape(text)).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+    )
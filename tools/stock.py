@@ -0,0 +1,168 @@
+import asyncio
+import datetime as dt
+import logging
+from typing import Iterable, Mapping, Optional
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.models import Product, StockReservation
+from settings import api_config, async_session, dialect_insert
+from tools import facets, page_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _reserved_by_others(holder: Optional[int], now: dt.datetime):
+    """Сума живих утримань рядка Product інших користувачів (корельований підзапит)"""
+    stmt = select(func.coalesce(func.sum(StockReservation.quantity), 0)).where(
+        StockReservation.product_id == Product.id, StockReservation.expires_at > now
+    )
+    if holder is not None:
+        stmt = stmt.where(StockReservation.user_id != holder)
+    return stmt.scalar_subquery()
+
+
+async def decrement_stock(
+    db: AsyncSession, quantities: Mapping[int, int], holder: Optional[int] = None
+) -> set[int]:
+    """Списує залишки одним умовним UPDATE ... WHERE stock_quantity - утримання >= q.
+
+    Повертає id товарів, яких не вистачило; тоді жоден рядок не вважається
+    списаним і транзакцію треба відкотити. Умова перевіряється самою БД під
+    блокуванням рядка, тож паралельні покупці не продадуть більше, ніж є.
+    Живі утримання інших користувачів (не holder) недоступні для списання.
+    Кеш сторінок і фасети оновлюються після коміту сесії.
+    """
+    if not quantities:
+        return set()
+
+    quantity = case(dict(quantities), value=Product.id)
+    reserved = _reserved_by_others(holder, dt.datetime.now())
+    stmt = (
+        update(Product)
+        .where(Product.id.in_(quantities), Product.stock_quantity - reserved >= quantity)
+        .values(
+            stock_quantity=Product.stock_quantity - quantity,
+            # Bulk UPDATE обходить version_id_col, тому версія збільшується явно
+            version=Product.version + 1,
+        )
+        .returning(Product.id, Product.category, Product.price, Product.stock_quantity)
+        .execution_options(synchronize_session=False)
+    )
+    rows = (await db.execute(stmt)).all()
+
+    missing = set(quantities) - {row.id for row in rows}
+    if missing:
+        return missing
+
+    session = db.sync_session
+    page_cache.invalidate_on_commit(session, *(f"product:{row.id}" for row in rows))
+    facets.apply_on_commit(session, [
+        ("upsert", row.id, row.category, row.price, row.stock_quantity > 0) for row in rows
+    ])
+    return missing
+
+
+class StockReservations:
+    """Тимчасові утримання товарів з кошиків (таблиця stock_reservations).
+
+    Утримання — абсолютна кількість товару в кошику користувача, що живе
+    ttl секунд від останнього hold(). Доступно = stock_quantity мінус живі
+    утримання; сума рахується по індексу (product_id, expires_at, quantity),
+    тож прострочені рядки не враховуються ще до того, як їх видалить sweeper.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.expired = 0
+
+    async def reserved(
+        self, db: AsyncSession, product_ids: Iterable[int], exclude_user: Optional[int] = None
+    ) -> dict[int, int]:
+        """Сума живих утримань по товарах (без утримань exclude_user)"""
+        product_ids = set(product_ids)
+        if not product_ids:
+            return {}
+        stmt = (
+            select(StockReservation.product_id, func.sum(StockReservation.quantity))
+            .where(
+                StockReservation.product_id.in_(product_ids),
+                StockReservation.expires_at > dt.datetime.now(),
+            )
+            .group_by(StockReservation.product_id)
+        )
+        if exclude_user is not None:
+            stmt = stmt.where(StockReservation.user_id != exclude_user)
+        return {product_id: int(total) for product_id, total in await db.execute(stmt)}
+
+    async def available(self, db: AsyncSession, product: Product, user_id: Optional[int] = None) -> int:
+        """Скільки одиниць товару може утримати user_id (для сторінки товару)"""
+        reserved = await self.reserved(db, [product.id], exclude_user=user_id)
+        return max(0, product.stock_quantity - reserved.get(product.id, 0))
+
+    async def hold(self, db: AsyncSession, user_id: int, quantities: Mapping[int, int]) -> set[int]:
+        """Встановлює утримання користувача і подовжує їх на ttl (без коміту).
+
+        Повертає id товарів, яких не вистачає з урахуванням чужих утримань;
+        тоді транзакцію треба відкотити.
+        """
+        if not quantities:
+            return set()
+
+        expires_at = dt.datetime.now() + dt.timedelta(seconds=self.ttl)
+        stmt = dialect_insert(StockReservation).values([
+            {"user_id": user_id, "product_id": product_id, "quantity": quantity, "expires_at": expires_at}
+            for product_id, quantity in quantities.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StockReservation.user_id, StockReservation.product_id],
+            set_={"quantity": stmt.excluded.quantity, "expires_at": stmt.excluded.expires_at},
+        )
+        # Спочатку запис: SQLite бере блокування на запис одразу, без підвищення з читання
+        await db.execute(stmt)
+
+        # Паралельні hold() і checkout того ж товару чекають на блокування рядка products
+        stock = dict((await db.execute(
+            select(Product.id, Product.stock_quantity)
+            .where(Product.id.in_(quantities))
+            .order_by(Product.id)
+            .with_for_update()
+        )).all())
+        reserved = await self.reserved(db, stock)
+        return {
+            product_id for product_id in quantities
+            if product_id not in stock or stock[product_id] < reserved.get(product_id, 0)
+        }
+
+    async def release(self, db: AsyncSession, user_id: int, product_ids: Optional[Iterable[int]] = None) -> None:
+        """Знімає утримання користувача (усі або для product_ids), без коміту"""
+        stmt = delete(StockReservation).where(StockReservation.user_id == user_id)
+        if product_ids is not None:
+            stmt = stmt.where(StockReservation.product_id.in_(set(product_ids)))
+        await db.execute(stmt)
+
+    async def purge_expired(self) -> int:
+        """Видаляє прострочені утримання одним DELETE; повертає їх кількість"""
+        async with async_session() as db:
+            result = await db.execute(
+                delete(StockReservation).where(StockReservation.expires_at <= dt.datetime.now())
+            )
+            await db.commit()
+        self.expired += result.rowcount
+        return result.rowcount
+
+    async def run(self, interval: float) -> None:
+        """Фоновий sweeper (запускається з lifespan)"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.purge_expired()
+            except Exception as exc:
+                logger.warning("Stock reservations sweep failed: %r", exc)
+
+    def stats(self) -> dict:
+        return {"ttl": self.ttl, "expired": self.expired}
+
+
+stock_reservations = StockReservations(api_config.RESERVATION_TTL)